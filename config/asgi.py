@@ -3,14 +3,30 @@ ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Запросы маршрутизируются по config/asgi_urls.py: горячие эндпоинты чтения
+обслуживаются асинхронными представлениями (config/asyncviews.py).
+Запуск: uvicorn config.asgi:application (см. README, «ASGI»).
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
-application = get_asgi_application()
+
+class APIHandler(ASGIHandler):
+    """ASGIHandler с URL-конфигурацией ASGI_URLCONF вместо ROOT_URLCONF."""
+
+    async def get_response_async(self, request):
+        request.urlconf = settings.ASGI_URLCONF
+        return await super().get_response_async(request)
+
+
+django.setup(set_prefix=False)
+application = APIHandler()
@@ -0,0 +1,46 @@
+"""
+URL-конфигурация ASGI-приложения (config/asgi.py).
+
+Маршруты те же, что в config/urls.py, но список, карточка и публичная лента
+привычек и профиль users/user/ обслуживаются асинхронными представлениями
+(config/asyncviews.py): GET выполняется в цикле событий, остальные методы —
+синхронными представлениями DRF.
+"""
+
+from django.urls import include, path
+
+from config import urls
+from config.asyncviews import with_async_views
+from habits import urls as habits_urls
+from users import urls as users_urls
+
+HABITS_ASYNC_ROUTES = {"habit-list", "habit-detail", "habit-public"}
+USERS_ASYNC_ROUTES = {"user_detail"}
+
+urlpatterns = [
+    path(
+        "habits/",
+        include(
+            (
+                with_async_views(habits_urls.router.urls, HABITS_ASYNC_ROUTES),
+                habits_urls.app_name,
+            ),
+            namespace="habits",
+        ),
+    ),
+    path(
+        "users/",
+        include(
+            (
+                with_async_views(users_urls.urlpatterns, USERS_ASYNC_ROUTES),
+                users_urls.app_name,
+            ),
+            namespace="users",
+        ),
+    ),
+    *(
+        pattern
+        for pattern in urls.urlpatterns
+        if getattr(pattern, "namespace", None) not in ("habits", "users")
+    ),
+]
@@ -0,0 +1,183 @@
+"""
+Асинхронные представления для эндпоинтов чтения под ASGI.
+
+async_view() оборачивает представление DRF (функцию из роутера или as_view())
+в корутину. Если у класса представления есть асинхронный вариант действия —
+метод с префиксом «a» (alist для list, aget для get у APIView), — запрос
+обрабатывается в цикле событий: согласование формата, аутентификация, права,
+обработка исключений и рендеринг JSON те же, что у DRF, а база и кэш читаются
+асинхронным API Django (aget, acount, async for, cache.aget). Остальные методы
+и действия, а также запросы не в JSON (Browsable API) выполняет исходное
+синхронное представление через sync_to_async, поэтому ответы не отличаются
+от WSGI.
+
+Маршруты с такими представлениями собраны в config/asgi_urls.py.
+"""
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.http import Http404, HttpResponse
+from django.shortcuts import aget_object_or_404
+from django.urls import URLPattern
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+
+def async_view(view):
+    """
+    Асинхронная обёртка представления DRF.
+
+    Args:
+        view (callable): представление DRF (атрибуты cls, initkwargs и,
+            у ViewSet, actions).
+
+    Returns:
+        callable: асинхронное представление с теми же атрибутами.
+    """
+    sync_view = sync_to_async(view)
+
+    async def wrapper(request, *args, **kwargs):
+        handler = _async_handler(view, request.method)
+        if handler is None:
+            return await sync_view(request, *args, **kwargs)
+        instance = _make_view(view, request, args, kwargs)
+        drf_request = instance.request
+        try:
+            renderer, media_type = instance.perform_content_negotiation(drf_request)
+        except exceptions.APIException:
+            renderer = None
+        if not isinstance(renderer, JSONRenderer):
+            # Browsable API и ошибки согласования формата — как в синхронном представлении
+            return await sync_view(request, *args, **kwargs)
+        drf_request.accepted_renderer = renderer
+        drf_request.accepted_media_type = media_type
+
+        try:
+            version, scheme = instance.determine_version(drf_request, *args, **kwargs)
+            drf_request.version, drf_request.versioning_scheme = version, scheme
+            await authenticate(drf_request)
+            instance.check_permissions(drf_request)
+            instance.check_throttles(drf_request)
+            response = await getattr(instance, handler)(drf_request, *args, **kwargs)
+        except Exception as exc:
+            response = instance.handle_exception(exc)
+
+        response = instance.finalize_response(drf_request, response, *args, **kwargs)
+        if isinstance(response, Response):
+            # JSON рендерится здесь: иначе Django вызвал бы render() в отдельном потоке
+            response.render()
+            response = HttpResponse(
+                response.content, status=response.status_code, headers=response.headers
+            )
+        return response
+
+    # По cls и actions QueryBudgetMiddleware находит бюджет запросов
+    for name in ("cls", "initkwargs", "actions"):
+        if hasattr(view, name):
+            setattr(wrapper, name, getattr(view, name))
+    wrapper.csrf_exempt = True
+    return wrapper
+
+
+def with_async_views(patterns, names):
+    """
+    Копия списка маршрутов, в которой маршруты с именами names обслуживаются
+    async_view (порядок и шаблоны маршрутов не меняются).
+
+    Args:
+        patterns (list): маршруты (URLPattern и URLResolver).
+        names (set[str]): имена маршрутов.
+
+    Returns:
+        list: маршруты.
+    """
+    return [
+        (
+            URLPattern(
+                pattern.pattern,
+                async_view(pattern.callback),
+                pattern.default_args,
+                pattern.name,
+            )
+            if isinstance(pattern, URLPattern) and pattern.name in names
+            else pattern
+        )
+        for pattern in patterns
+    ]
+
+
+def _async_handler(view, method):
+    method = "get" if method == "HEAD" else method.lower()
+    actions = getattr(view, "actions", None)
+    action = actions.get(method) if actions else method
+    if action is None or not hasattr(view.cls, f"a{action}"):
+        return None
+    return f"a{action}"
+
+
+def _make_view(view, request, args, kwargs):
+    # То же, что делают as_view() и APIView.dispatch до вызова initial()
+    instance = view.cls(**view.initkwargs)
+    actions = getattr(view, "actions", None)
+    if actions:
+        if "get" in actions and "head" not in actions:
+            actions = {**actions, "head": actions["get"]}
+        instance.action_map = actions
+        for method, action in actions.items():
+            setattr(instance, method, getattr(instance, action))
+    instance.setup(request, *args, **kwargs)
+    instance.request = instance.initialize_request(request, *args, **kwargs)
+    instance.headers = instance.default_response_headers
+    instance.format_kwarg = instance.get_format_suffix(**kwargs)
+    return instance
+
+
+async def authenticate(request):
+    """
+    Асинхронный вариант Request._authenticate.
+
+    Аутентификаторы с методом aauthenticate вызываются напрямую, остальные —
+    через sync_to_async.
+
+    Args:
+        request (Request): запрос DRF.
+    """
+    for authenticator in request.authenticators:
+        aauthenticate = getattr(authenticator, "aauthenticate", None)
+        if aauthenticate is None:
+            aauthenticate = sync_to_async(authenticator.authenticate)
+        try:
+            user_auth = await aauthenticate(request)
+        except exceptions.APIException:
+            request._not_authenticated()
+            raise
+        if user_auth is not None:
+            request._authenticator = authenticator
+            request.user, request.auth = user_auth
+            return
+    request._not_authenticated()
+
+
+async def aget_object(view):
+    """
+    Асинхронный вариант GenericAPIView.get_object.
+
+    Args:
+        view (GenericAPIView): представление.
+
+    Returns:
+        Model: объект представления.
+
+    Raises:
+        Http404: объекта нет или значение поиска неверного типа.
+    """
+    queryset = view.filter_queryset(view.get_queryset())
+    lookup_url_kwarg = view.lookup_url_kwarg or view.lookup_field
+    filter_kwargs = {view.lookup_field: view.kwargs[lookup_url_kwarg]}
+    try:
+        obj = await aget_object_or_404(queryset, **filter_kwargs)
+    except (TypeError, ValueError, ValidationError):
+        raise Http404
+    view.check_object_permissions(view.request, obj)
+    return obj
@@ -1,16 +1,13 @@
-# flake8: noqa: E402
-
-from __future__ import absolute_import, unicode_literals
-
-import eventlet
-
-eventlet.monkey_patch()
-
-
 import os
 
 from celery import Celery
 
+# Зелёные потоки нужны только воркеру Celery: команда celery сама выполняет
+# eventlet.monkey_patch() при запуске с -P eventlet, до импорта приложения.
+# Веб-процессы, тесты и manage.py не патчатся: eventlet ломает asyncio
+# и асинхронный ORM (см. config/asyncviews.py).
+# Этот модуль загружается лениво (config.celery_app, импорт tasks.py).
+
 # Установка переменной окружения для настроек проекта
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
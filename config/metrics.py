@@ -0,0 +1,419 @@
+"""
+Метрики приложения в текстовом формате Prometheus.
+
+Значения хранятся в Redis (по хешу на метрику), поэтому метрики воркеров
+Celery, планировщика и всех процессов gunicorn суммируются и видны
+в эндпоинте /metrics веб-процесса. Для тестов есть локальное хранилище
+в памяти процесса (METRICS_BACKEND = "local").
+
+Приращения копятся в памяти процесса и записываются в хранилище фоновым
+потоком раз в METRICS_FLUSH_INTERVAL секунд одним pipeline, а не при
+каждом запросе. После ошибки записи хранилище не трогается
+METRICS_RETRY_INTERVAL секунд, накопленное дожидается следующей попытки.
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+import redis
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+LAG_BUCKETS = (1, 2, 5, 10, 15, 30, 60, 120, 300, 600)
+
+
+class LocalBackend:
+    """Хранилище метрик в памяти текущего процесса."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.data = defaultdict(dict)
+
+    def increment(self, updates):
+        with self.lock:
+            for key, field, amount in updates:
+                self.data[key][field] = self.data[key].get(field, 0) + amount
+
+    def read(self, keys):
+        with self.lock:
+            return [dict(self.data.get(key, {})) for key in keys]
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
+class RedisBackend:
+    """Хранилище метрик в Redis, общее для всех процессов."""
+
+    def __init__(self, url):
+        self.client = redis.Redis.from_url(
+            url, socket_timeout=0.2, socket_connect_timeout=0.2
+        )
+
+    def increment(self, updates):
+        pipe = self.client.pipeline(transaction=False)
+        for key, field, amount in updates:
+            pipe.hincrbyfloat(key, field, amount)
+        pipe.execute()
+
+    def read(self, keys):
+        pipe = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipe.hgetall(key)
+        return [
+            {field.decode(): float(value) for field, value in values.items()}
+            for values in pipe.execute()
+        ]
+
+    def clear(self):
+        self.client.delete(*[metric.key for metric in REGISTRY])
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if settings.METRICS_BACKEND == "local":
+                    _backend = LocalBackend()
+                else:
+                    _backend = RedisBackend(settings.METRICS_REDIS_URL)
+    return _backend
+
+
+# Незаписанные приращения процесса: (ключ, поле) -> значение
+_pending = defaultdict(float)
+_pending_lock = threading.Lock()
+_flusher_pid = None
+_retry_at = 0.0
+
+
+def _write(updates):
+    interval = settings.METRICS_FLUSH_INTERVAL
+    if not interval:
+        _send(updates)
+        return
+    with _pending_lock:
+        for key, field, amount in updates:
+            _pending[key, field] += amount
+    if _flusher_pid != os.getpid():
+        _start_flusher(interval)
+
+
+def _send(updates):
+    global _retry_at
+    if time.monotonic() < _retry_at:
+        return False
+    # Метрики не должны ломать обработку запросов и задач
+    try:
+        get_backend().increment(updates)
+        return True
+    except Exception:
+        _retry_at = time.monotonic() + settings.METRICS_RETRY_INTERVAL
+        logger.warning("Metrics backend error", exc_info=True)
+        return False
+
+
+def flush():
+    """
+    Записывает накопленные приращения метрик процесса в хранилище.
+
+    Если запись не удалась, приращения остаются до следующей попытки.
+
+    Returns:
+        bool: True, если всё накопленное записано.
+    """
+    with _pending_lock:
+        if not _pending:
+            return True
+        updates = [(key, field, amount) for (key, field), amount in _pending.items()]
+        _pending.clear()
+    if _send(updates):
+        return True
+    with _pending_lock:
+        for key, field, amount in updates:
+            _pending[key, field] += amount
+    return False
+
+
+def _start_flusher(interval):
+    global _flusher_pid
+    with _pending_lock:
+        if _flusher_pid == os.getpid():
+            return
+        _flusher_pid = os.getpid()
+
+    def run():
+        while True:
+            time.sleep(interval)
+            flush()
+
+    threading.Thread(target=run, name="metrics-flush", daemon=True).start()
+
+
+def _reset_after_fork():
+    # Накопленное родителем запишет родитель
+    global _pending_lock
+    _pending_lock = threading.Lock()
+    _pending.clear()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+atexit.register(flush)
+
+
+REGISTRY = []
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.key = f"metrics:{name}"
+        REGISTRY.append(self)
+
+    def _labels_field(self, labels):
+        return json.dumps([str(labels[name]) for name in self.labelnames])
+
+    def _format_labels(self, values, extra=()):
+        pairs = list(zip(self.labelnames, values)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in pairs) + "}"
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        _write([(self.key, self._labels_field(labels), amount)])
+
+    def render(self, data):
+        for field, value in sorted(data.items()):
+            yield f"{self.name}{self._format_labels(json.loads(field))} {_number(value)}"
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        field = self._labels_field(labels)
+        index = bisect_left(self.buckets, value)
+        le = str(self.buckets[index]) if index < len(self.buckets) else "+Inf"
+        _write(
+            [
+                (self.key, f"{field}|bucket|{le}", 1),
+                (self.key, f"{field}|sum", value),
+                (self.key, f"{field}|count", 1),
+            ]
+        )
+
+    def render(self, data):
+        series = defaultdict(dict)
+        for field, value in data.items():
+            labels, kind = field.split("|", 1)
+            series[labels][kind] = value
+        for labels, values in sorted(series.items()):
+            label_values = json.loads(labels)
+            cumulative = 0
+            for le in [str(b) for b in self.buckets] + ["+Inf"]:
+                cumulative += values.get(f"bucket|{le}", 0)
+                label_str = self._format_labels(label_values, [("le", le)])
+                yield f"{self.name}_bucket{label_str} {_number(cumulative)}"
+            label_str = self._format_labels(label_values)
+            yield f"{self.name}_sum{label_str} {_number(values.get('sum', 0))}"
+            yield f"{self.name}_count{label_str} {_number(values.get('count', 0))}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value):
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+# Планировщик напоминаний
+REMINDER_TICK_DURATION = Histogram(
+    "habits_reminder_tick_duration_seconds",
+    "Длительность сканирования наступивших напоминаний",
+)
+REMINDER_TICK_ROWS = Counter(
+    "habits_reminder_tick_rows_total",
+    "Количество привычек, захваченных при сканировании напоминаний",
+)
+REMINDERS_ENQUEUED = Counter(
+    "habits_reminders_enqueued_total",
+    "Количество напоминаний, поставленных в очередь",
+)
+REMINDER_LAG = Histogram(
+    "habits_reminder_lag_seconds",
+    "Опоздание отправки напоминания относительно next_remind_at",
+    buckets=LAG_BUCKETS,
+)
+REMINDERS_STALE = Counter(
+    "habits_reminders_stale_total",
+    "Напоминания, отброшенные из-за изменения или удаления привычки",
+)
+
+# Telegram Bot API
+TELEGRAM_REQUEST_DURATION = Histogram(
+    "telegram_request_duration_seconds",
+    "Длительность запросов к Telegram Bot API",
+)
+TELEGRAM_REQUESTS = Counter(
+    "telegram_requests_total",
+    "Запросы к Telegram Bot API по коду ответа",
+    ["status"],
+)
+
+# HTTP API
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Длительность обработки HTTP-запросов по представлениям",
+    ["view", "method", "status"],
+)
+
+
+def _collect_reminder_backlog():
+    """Наступившие, но ещё не отправленные напоминания (отставание планировщика)."""
+    from django.db.models import Count, Min
+
+    from habits.models import Habit
+
+    now_dt = timezone.now()
+    backlog = Habit.objects.filter(next_remind_at__lte=now_dt).aggregate(
+        count=Count("id"), oldest=Min("next_remind_at")
+    )
+    age = (now_dt - backlog["oldest"]).total_seconds() if backlog["oldest"] else 0
+    yield "# HELP habits_reminder_backlog Наступившие неотправленные напоминания"
+    yield "# TYPE habits_reminder_backlog gauge"
+    yield f"habits_reminder_backlog {backlog['count']}"
+    yield "# HELP habits_reminder_backlog_age_seconds Возраст самого старого из них"
+    yield "# TYPE habits_reminder_backlog_age_seconds gauge"
+    yield f"habits_reminder_backlog_age_seconds {_number(age)}"
+
+
+def _collect_queue_depth():
+    """Длина очередей Celery в брокере Redis."""
+    if not settings.METRICS_QUEUES:
+        return
+    client = redis.Redis.from_url(
+        settings.CELERY_BROKER_URL, socket_timeout=0.2, socket_connect_timeout=0.2
+    )
+    pipe = client.pipeline(transaction=False)
+    for queue in settings.METRICS_QUEUES:
+        pipe.llen(queue)
+    depths = pipe.execute()
+    yield "# HELP celery_queue_length Количество задач в очереди Celery"
+    yield "# TYPE celery_queue_length gauge"
+    for queue, depth in zip(settings.METRICS_QUEUES, depths):
+        yield f'celery_queue_length{{queue="{queue}"}} {depth}'
+
+
+COLLECTORS = [_collect_reminder_backlog, _collect_queue_depth]
+
+
+def render():
+    """
+    Формирует текст всех метрик в формате Prometheus.
+
+    Returns:
+        str: содержимое ответа /metrics.
+    """
+    flush()
+    lines = []
+    for metric, data in zip(REGISTRY, get_backend().read([m.key for m in REGISTRY])):
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        lines.extend(metric.render(data))
+    for collector in COLLECTORS:
+        try:
+            lines.extend(collector())
+        except Exception:
+            logger.warning("Metrics collector %r failed", collector, exc_info=True)
+    return "\n".join(lines) + "\n"
+
+
+def metrics_view(request):
+    """
+    Отдаёт метрики Prometheus.
+
+    Если задан METRICS_TOKEN, требуется заголовок Authorization: Bearer <token>.
+    """
+    token = settings.METRICS_TOKEN
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return HttpResponseForbidden()
+    return HttpResponse(render(), content_type=CONTENT_TYPE)
+
+
+class MetricsMiddleware:
+    """
+    Замеряет длительность обработки запросов по имени маршрута
+    (например, habits:habit-list, users:user-detail, users:login).
+
+    Работает и в асинхронной цепочке middleware (ASGI): запись в Redis
+    (при METRICS_FLUSH_INTERVAL = 0) выполняется в пуле потоков, не блокируя
+    цикл событий.
+    """
+
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self.observe(request, response, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        await sync_to_async(self.observe, thread_sensitive=False)(
+            request, response, time.perf_counter() - started
+        )
+        return response
+
+    @staticmethod
+    def observe(request, response, duration):
+        match = getattr(request, "resolver_match", None)
+        if match is not None and match.view_name != "metrics":
+            HTTP_REQUEST_DURATION.observe(
+                duration,
+                view=match.view_name,
+                method=request.method,
+                status=response.status_code,
+            )
@@ -0,0 +1,8 @@
+"""
+Бэкенд PostgreSQL (psycopg2) с пулом соединений в каждом процессе.
+
+Встроенный пул Django работает только с psycopg 3, поэтому здесь свой:
+соединения не закрываются в конце запроса или задачи Celery, а возвращаются
+в пул процесса (config.pooled_postgresql.pool.ConnectionPool). Настройки пула
+задаются ключом POOL в DATABASES (см. config/settings.py, DB_POOL_ROLE).
+"""
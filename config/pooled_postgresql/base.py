@@ -0,0 +1,51 @@
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+
+from config.pooled_postgresql.pool import get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    DatabaseWrapper PostgreSQL, который берёт соединения из пула процесса.
+
+    Django закрывает соединение в конце запроса или задачи (CONN_MAX_AGE = 0),
+    а _close() возвращает его в пул. Соединение, закрытое внутри atomic(),
+    в пул не возвращается: Django продолжает на него ссылаться.
+    """
+
+    @property
+    def pool(self):
+        # Встроенный пул psycopg 3 не используется
+        return None
+
+    @property
+    def connection_pool(self):
+        settings_dict = self.settings_dict
+        key = (
+            self.alias,
+            settings_dict["NAME"],
+            settings_dict["HOST"],
+            settings_dict["PORT"],
+            settings_dict["USER"],
+        )
+        return get_pool(key, connect=None, **settings_dict.get("POOL", {}))
+
+    def get_new_connection(self, conn_params):
+        connect = super().get_new_connection
+        connection = self.connection_pool.getconn(lambda: connect(conn_params))
+        # Родительский метод задаёт isolation_level только новым соединениям
+        self.isolation_level = IsolationLevel(
+            self.settings_dict["OPTIONS"].get(
+                "isolation_level", IsolationLevel.READ_COMMITTED
+            )
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        with self.wrap_database_errors:
+            if self.in_atomic_block:
+                self.connection_pool.discard(self.connection)
+            else:
+                self.connection_pool.putconn(self.connection)
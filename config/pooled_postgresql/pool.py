@@ -0,0 +1,322 @@
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+import psycopg2
+from psycopg2 import extensions
+
+from config import metrics
+
+DB_POOL_WAIT = metrics.Histogram(
+    "db_pool_wait_seconds",
+    "Ожидание свободного соединения в пуле (только когда пул был занят)",
+    ["role"],
+)
+DB_POOL_TIMEOUTS = metrics.Counter(
+    "db_pool_timeouts_total",
+    "Запросы соединения, не дождавшиеся свободного места в пуле",
+    ["role"],
+)
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    """Свободное соединение не появилось за timeout секунд."""
+
+
+def make_semaphore(value):
+    """
+    Семафор, который понимает текущая модель конкурентности.
+
+    В процессе, пропатченном eventlet или gevent, ожидание должно
+    переключать гринлеты, а не блокировать поток целиком.
+
+    Args:
+        value (int): начальное значение семафора.
+
+    Returns:
+        BoundedSemaphore: семафор eventlet, gevent или threading.
+    """
+    eventlet_patcher = sys.modules.get("eventlet.patcher")
+    if eventlet_patcher is not None and eventlet_patcher.is_monkey_patched("thread"):
+        from eventlet.semaphore import BoundedSemaphore
+
+        return BoundedSemaphore(value)
+    gevent_monkey = sys.modules.get("gevent.monkey")
+    if gevent_monkey is not None and gevent_monkey.is_module_patched("threading"):
+        from gevent.lock import BoundedSemaphore
+
+        return BoundedSemaphore(value)
+    return threading.BoundedSemaphore(value)
+
+
+class ConnectionPool:
+    """
+    Пул соединений psycopg2 одного процесса.
+
+    Одновременно выдаётся не больше max_size соединений; остальные ждут
+    на семафоре (гринлеты eventlet/gevent — не блокируя поток) не дольше
+    timeout секунд. Свободные соединения переиспользуются в порядке LIFO,
+    поэтому лишние простаивают и закрываются по idle_timeout. Соединение
+    старше max_lifetime закрывается при возврате. Перед выдачей соединения,
+    простоявшего дольше check_interval, выполняется SELECT 1.
+
+    Args:
+        connect (callable): открывает новое соединение.
+        max_size (int): максимум одновременно выданных соединений.
+        timeout (float): сколько ждать свободного соединения, секунды.
+        idle_timeout (float): сколько хранить неиспользуемое соединение.
+        max_lifetime (float): максимальный возраст соединения.
+        check_interval (float | None): простой, после которого соединение
+            проверяется перед выдачей (None — не проверять).
+        role (str): роль процесса для метрик ("web", "worker").
+    """
+
+    def __init__(
+        self,
+        connect,
+        max_size=10,
+        timeout=30,
+        idle_timeout=600,
+        max_lifetime=3600,
+        check_interval=30,
+        role="web",
+    ):
+        self.connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        self.check_interval = check_interval
+        self.role = role
+        self.pid = os.getpid()
+        self._slots = make_semaphore(max_size)
+        self._lock = threading.Lock()
+        # (соединение, время открытия, время возврата в пул)
+        self._idle = deque()
+        self._opened_at = {}
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "timeouts": 0,
+            "opened": 0,
+            "closed": 0,
+            "check_failures": 0,
+            "in_use": 0,
+            "max_in_use": 0,
+        }
+
+    def getconn(self, connect=None):
+        """
+        Выдаёт соединение: свободное из пула или новое.
+
+        Args:
+            connect (callable | None): открывает новое соединение вместо self.connect.
+
+        Returns:
+            connection: соединение psycopg2.
+
+        Raises:
+            PoolTimeout: свободное место в пуле не появилось за timeout секунд.
+        """
+        waited = 0.0
+        if not self._slots.acquire(blocking=False):
+            started = time.monotonic()
+            acquired = self._slots.acquire(timeout=self.timeout)
+            waited = time.monotonic() - started
+            if not acquired:
+                self._count(timeouts=1)
+                DB_POOL_TIMEOUTS.inc(role=self.role)
+                raise PoolTimeout(
+                    f"Нет свободного соединения в пуле ({self.max_size}) "
+                    f"за {self.timeout} с"
+                )
+            DB_POOL_WAIT.observe(waited, role=self.role)
+        try:
+            connection = self._take_idle() or self._open(connect or self.connect)
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            stats = self._stats
+            stats["checkouts"] += 1
+            stats["in_use"] += 1
+            stats["max_in_use"] = max(stats["max_in_use"], stats["in_use"])
+            if waited:
+                stats["waits"] += 1
+                stats["wait_seconds_total"] += waited
+                stats["wait_seconds_max"] = max(stats["wait_seconds_max"], waited)
+        return connection
+
+    def putconn(self, connection):
+        """
+        Возвращает соединение в пул.
+
+        Незавершённая транзакция откатывается; сломанное, слишком старое
+        или лишнее соединение закрывается.
+
+        Args:
+            connection (connection): выданное пулом соединение.
+        """
+        try:
+            now = time.monotonic()
+            opened_at = self._opened_at.get(id(connection), now)
+            if now - opened_at < self.max_lifetime and self._reset(connection):
+                with self._lock:
+                    if len(self._idle) < self.max_size:
+                        self._idle.append((connection, opened_at, now))
+                        connection = None
+            if connection is not None:
+                self._close(connection)
+        finally:
+            self._count(in_use=-1)
+            self._slots.release()
+
+    def discard(self, connection):
+        """Закрывает выданное соединение, не возвращая его в пул."""
+        try:
+            self._close(connection)
+        finally:
+            self._count(in_use=-1)
+            self._slots.release()
+
+    def close(self):
+        """Закрывает все свободные соединения пула."""
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for connection, _, _ in idle:
+            self._close(connection)
+
+    def stats(self):
+        """
+        Статистика пула текущего процесса.
+
+        Returns:
+            dict: выдачи, ожидания (количество, суммарное и максимальное время),
+            таймауты, открытые и закрытые соединения, неудачные проверки,
+            занятые и свободные соединения, max_size и saturation
+            (доля занятых соединений).
+        """
+        with self._lock:
+            stats = dict(self._stats, idle=len(self._idle), max_size=self.max_size)
+        stats["saturation"] = stats["in_use"] / self.max_size
+        return stats
+
+    def _take_idle(self):
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                connection, opened_at, returned_at = self._idle.pop()
+                # Самые старые свободные соединения лежат в начале очереди
+                now = time.monotonic()
+                stale = []
+                while self._idle and now - self._idle[0][2] > self.idle_timeout:
+                    stale.append(self._idle.popleft()[0])
+            for old in stale:
+                self._close(old)
+            if now - returned_at > self.idle_timeout or connection.closed:
+                self._close(connection)
+                continue
+            if self.check_interval is not None and (
+                now - returned_at > self.check_interval
+            ):
+                if not self._check(connection):
+                    self._count(check_failures=1)
+                    self._close(connection)
+                    continue
+            return connection
+
+    def _open(self, connect):
+        connection = connect()
+        self._opened_at[id(connection)] = time.monotonic()
+        self._count(opened=1)
+        return connection
+
+    def _close(self, connection):
+        self._opened_at.pop(id(connection), None)
+        self._count(closed=1)
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _check(connection):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            if not connection.autocommit:
+                connection.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    @staticmethod
+    def _reset(connection):
+        """Готовит соединение к следующей выдаче; False — соединение не годится."""
+        if connection.closed:
+            return False
+        status = connection.info.transaction_status
+        if status == extensions.TRANSACTION_STATUS_IDLE:
+            return True
+        if status in (
+            extensions.TRANSACTION_STATUS_INTRANS,
+            extensions.TRANSACTION_STATUS_INERROR,
+        ):
+            try:
+                connection.rollback()
+                return True
+            except psycopg2.Error:
+                return False
+        # Запрос ещё выполняется или связь с сервером потеряна
+        return False
+
+    def _count(self, **changes):
+        with self._lock:
+            for name, value in changes.items():
+                self._stats[name] += value
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(key, **options):
+    """
+    Пул соединений процесса для настроек базы key.
+
+    После fork (gunicorn, prefork-воркеры Celery) пул создаётся заново:
+    соединения родительского процесса дочернему не достаются.
+
+    Args:
+        key (tuple): параметры подключения, по которым различаются пулы.
+        **options: параметры ConnectionPool.
+
+    Returns:
+        ConnectionPool: пул соединений.
+    """
+    pool = _pools.get(key)
+    if pool is None or pool.pid != os.getpid():
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None or pool.pid != os.getpid():
+                pool = _pools[key] = ConnectionPool(**options)
+    return pool
+
+
+def pool_stats():
+    """
+    Статистика всех пулов текущего процесса.
+
+    Returns:
+        dict[str, dict]: статистика по имени базы.
+    """
+    return {
+        f"{key[0]}:{key[1]}": pool.stats()
+        for key, pool in list(_pools.items())
+        if pool.pid == os.getpid()
+    }
@@ -0,0 +1,188 @@
+"""
+Бюджет SQL-запросов на HTTP-запрос и поиск N+1 (для разработки и тестов).
+
+QueryBudgetMiddleware записывает SQL каждого запроса, отмечает повторяющиеся
+«формы» запросов (одинаковый SQL с разными параметрами — типичный N+1)
+и сравнивает количество запросов с бюджетом, объявленным у представления:
+
+    class HabitViewSet(viewsets.ModelViewSet):
+        query_budgets = {"list": 3, "retrieve": 2}
+
+Ключ — действие ViewSet или HTTP-метод в нижнем регистре для APIView.
+Ответы Browsable API (text/html) с бюджетом не сравниваются.
+В строгом режиме (QUERY_BUDGET_STRICT, включён в тестах) превышение бюджета
+вызывает QueryBudgetExceeded, и тест падает. Middleware подключается только
+при QUERY_BUDGET_ENABLED, в продакшене он не работает.
+"""
+
+import logging
+import re
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+# Служебные команды транзакций в бюджет не входят
+IGNORED_SQL = re.compile(r"^\s*(SAVEPOINT|RELEASE SAVEPOINT|ROLLBACK TO SAVEPOINT)\b")
+IN_LIST = re.compile(r"\bIN \((?:\s*%s\s*,)*\s*%s\s*\)")
+VALUES_LIST = re.compile(r"(\((?:\s*%s\s*,?)+\))(?:\s*,\s*\1)+")
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Представление выполнило больше SQL-запросов, чем объявлено в бюджете."""
+
+
+def query_shape(sql):
+    """
+    Форма запроса: SQL без различий в длине списков IN (...) и VALUES.
+
+    Args:
+        sql (str): SQL с плейсхолдерами %s.
+
+    Returns:
+        str: нормализованный SQL.
+    """
+    sql = VALUES_LIST.sub(r"\1, ...", sql)
+    return IN_LIST.sub("IN (...)", sql)
+
+
+class QueryRecorder:
+    """Записывает SQL, выполненный через connection (обёртка execute_wrapper)."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if not IGNORED_SQL.match(sql):
+            self.queries.append(sql)
+        return execute(sql, params, many, context)
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    def repeated(self, threshold):
+        """
+        Формы запросов, выполненные не меньше threshold раз.
+
+        Returns:
+            dict[str, int]: количество выполнений по формам.
+        """
+        shapes = Counter(query_shape(sql) for sql in self.queries)
+        return {shape: n for shape, n in shapes.items() if n >= threshold}
+
+
+def view_budget(view_func, method):
+    """
+    Бюджет запросов представления для HTTP-метода.
+
+    Returns:
+        tuple[str, int] | None: имя действия и бюджет или None, если бюджет не объявлен.
+    """
+    view_class = getattr(view_func, "cls", None)
+    budgets = getattr(view_class, "query_budgets", None)
+    if not budgets:
+        return None
+    actions = getattr(view_func, "actions", None) or {}
+    action = actions.get(method.lower(), method.lower())
+    if action not in budgets:
+        return None
+    return action, budgets[action]
+
+
+# Запись SQL текущего HTTP-запроса в асинхронной цепочке middleware
+_recorder = ContextVar("query_budget_recorder", default=None)
+
+
+def _record_current(execute, sql, params, many, context):
+    """
+    Общая обёртка execute_wrapper: передаёт SQL записи текущего запроса.
+
+    Асинхронный ORM выполняет запросы одновременных запросов на одном
+    соединении, поэтому запись выбирается по контексту (ContextVar), а не
+    по списку обёрток соединения.
+    """
+    recorder = _recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def _install_record_current():
+    if _record_current not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_current)
+
+
+class QueryBudgetMiddleware:
+    """
+    Считает SQL-запросы каждого HTTP-запроса, сообщает о повторяющихся
+    формах запросов и проверяет бюджет представления.
+
+    Количество запросов отдаётся в заголовке X-Query-Count.
+    """
+
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        if not settings.QUERY_BUDGET_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        request._query_budget = None
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        return self.check(request, response, recorder)
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+        request._query_budget = None
+        # Асинхронный ORM выполняет запросы через sync_to_async со своим
+        # соединением, а не с тем, что видно в цикле событий
+        await sync_to_async(_install_record_current)()
+        token = _recorder.set(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        return self.check(request, response, recorder)
+
+    def check(self, request, response, recorder):
+        response["X-Query-Count"] = str(recorder.count)
+
+        repeated = recorder.repeated(settings.QUERY_BUDGET_REPEAT_THRESHOLD)
+        for shape, n in repeated.items():
+            logger.warning(
+                "Possible N+1 in %s %s: %d x %s", request.method, request.path, n, shape
+            )
+
+        # Browsable API (HTML) дополнительно читает пользователя и варианты
+        # полей форм; бюджеты объявлены для ответов API
+        html = response.get("Content-Type", "").startswith("text/html")
+        if request._query_budget is not None and not html:
+            action, budget = request._query_budget
+            if recorder.count > budget:
+                message = (
+                    f"{request.method} {request.path} ({action}): "
+                    f"{recorder.count} SQL-запросов при бюджете {budget}"
+                )
+                if settings.QUERY_BUDGET_STRICT:
+                    raise QueryBudgetExceeded(
+                        message + "\n" + "\n".join(recorder.queries)
+                    )
+                logger.warning("Query budget exceeded: %s", message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._query_budget = view_budget(view_func, request.method)
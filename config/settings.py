@@ -36,6 +36,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "config.metrics.MetricsMiddleware",
+    "config.querybudget.QueryBudgetMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -44,9 +46,12 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "users.activity.ActivityMiddleware",
 ]
 
 ROOT_URLCONF = "config.urls"
+# Маршруты ASGI-приложения (config/asgi.py): часть эндпоинтов асинхронные
+ASGI_URLCONF = "config.asgi_urls"
 
 TEMPLATES = [
     {
@@ -66,15 +71,44 @@ TEMPLATES = [
 WSGI_APPLICATION = "config.wsgi.application"
 
 
+# Пул соединений с PostgreSQL в каждом процессе (config.pooled_postgresql),
+# включается DB_POOL_ENABLED=True. Размер пула и ожидание свободного соединения
+# задаются по роли процесса: web (gunicorn) или worker (celery -P eventlet,
+# beat, планировщик напоминаний)
+DB_POOL_ENABLED = os.getenv("DB_POOL_ENABLED", "False") == "True"
+DB_POOL_ROLE = os.getenv("DB_POOL_ROLE", "web")
+DB_POOL_ROLES = {
+    "web": {"max_size": 4, "timeout": 10},
+    "worker": {"max_size": 20, "timeout": 30},
+}
+DB_POOL = {
+    **DB_POOL_ROLES[DB_POOL_ROLE],
+    # Соединение, простоявшее дольше check_interval секунд, проверяется перед выдачей
+    "check_interval": 30,
+    "idle_timeout": 10 * 60,
+    "max_lifetime": 60 * 60,
+    "role": DB_POOL_ROLE,
+}
+if os.getenv("DB_POOL_MAX_SIZE"):
+    DB_POOL["max_size"] = int(os.getenv("DB_POOL_MAX_SIZE"))
+if os.getenv("DB_POOL_TIMEOUT"):
+    DB_POOL["timeout"] = float(os.getenv("DB_POOL_TIMEOUT"))
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql_psycopg2",
+        "ENGINE": (
+            "config.pooled_postgresql"
+            if DB_POOL_ENABLED
+            else "django.db.backends.postgresql_psycopg2"
+        ),
         "NAME": os.getenv("POSTGRES_DB", "habittracker"),
         "USER": os.getenv("POSTGRES_USER", "postgres"),
         "PASSWORD": os.getenv("POSTGRES_PASSWORD", "12345"),
         "HOST": os.getenv("HOST", "db"),
         "PORT": os.getenv("PORT", "5432"),
+        # С пулом соединение в конце запроса возвращается в пул, а не закрывается
         "CONN_MAX_AGE": 0,
+        "POOL": DB_POOL,
     }
 }
 
@@ -118,9 +152,7 @@ AUTH_USER_MODEL = "users.User"
 
 REST_FRAMEWORK = {
     "DEFAULT_FILTER_BACKENDS": ["django_filters.rest_framework.DjangoFilterBackend"],
-    "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
-    ),
+    "DEFAULT_AUTHENTICATION_CLASSES": ("users.authentication.CachedJWTAuthentication",),
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
@@ -132,8 +164,15 @@ REST_FRAMEWORK = {
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=5),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
+    "TOKEN_REFRESH_SERIALIZER": "users.authentication.CachedTokenRefreshSerializer",
 }
 
+# Кэш пользователей для JWT-аутентификации (users.cache): время жизни записи
+# в Redis и в памяти процесса (секунды) и размер кэша в памяти процесса
+AUTH_USER_CACHE_TIMEOUT = 60
+AUTH_USER_LOCAL_TIMEOUT = 5
+AUTH_USER_LOCAL_CACHE_SIZE = 10000
+
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60
@@ -145,16 +184,44 @@ CELERY_RESULT_BACKEND = REDIS_URL
 
 CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
 
+# Способ запуска напоминаний: "beat" — задача check_and_send_reminders раз в минуту,
+# "wheel" — посекундный планировщик (manage.py run_reminder_scheduler)
+REMINDER_SCHEDULER = os.getenv("REMINDER_SCHEDULER", "beat")
+
 CELERY_BEAT_SCHEDULE = {
-    "check-and-send-reminders-every-minute": {
-        "task": "habits.tasks.check_and_send_reminders",
-        "schedule": crontab(),
+    # Сводки статистики выполнения привычек (habits.stats)
+    "rollup-habit-stats-nightly": {
+        "task": "habits.tasks.rollup_habit_stats",
+        "schedule": crontab(hour=3, minute=30),
     },
 }
 
+if REMINDER_SCHEDULER == "beat":
+    CELERY_BEAT_SCHEDULE["check-and-send-reminders-every-minute"] = {
+        "task": "habits.tasks.check_and_send_reminders",
+        "schedule": crontab(),
+    }
+
+# Количество привычек в одном сообщении брокеру и в одном UPDATE при отправке напоминаний
+REMINDER_BATCH_SIZE = int(os.getenv("REMINDER_BATCH_SIZE", "500"))
+# Для пользователей со сводкой напоминаний: на сколько секунд вперёд захватывать
+# напоминания в одно сообщение (0 — только наступившие в текущий тик)
+REMINDER_DIGEST_WINDOW = int(os.getenv("REMINDER_DIGEST_WINDOW", "0"))
+# Сколько воркеров параллельно сканируют наступившие напоминания в каждый тик
+REMINDER_SCAN_WORKERS = int(os.getenv("REMINDER_SCAN_WORKERS", "1"))
+
 
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
-TELEGRAM_BOT_URL = "https://api.telegram.org/bot"
+TELEGRAM_BOT_URL = os.getenv("TELEGRAM_BOT_URL", "https://api.telegram.org/bot")
+# Размер пула keep-alive соединений и число параллельных отправок в одном воркере
+TELEGRAM_POOL_SIZE = int(os.getenv("TELEGRAM_POOL_SIZE", "20"))
+TELEGRAM_CONCURRENCY = int(os.getenv("TELEGRAM_CONCURRENCY", "10"))
+# Таймауты (подключение, чтение) в секундах
+TELEGRAM_TIMEOUT = (3.05, 10)
+# Ограничения Telegram: сообщений в секунду всего и в один чат
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))
+TELEGRAM_PER_CHAT_RATE = float(os.getenv("TELEGRAM_PER_CHAT_RATE", "1"))
+TELEGRAM_MAX_RETRIES = 3
 
 
 CORS_ALLOWED_ORIGINS = [
@@ -182,6 +249,54 @@ CACHES = {
     }
 }
 
+# Максимальное количество привычек в одном пакетном запросе /habits/batch/
+HABIT_BATCH_MAX_SIZE = 100
+# Строк за одно чтение серверного курсора при выгрузке привычек
+HABIT_EXPORT_CHUNK_SIZE = 2000
+# Импорт привычек: строк в пачке валидации и записи, сколько отклонённых строк
+# хранить в отчёте, до какого размера файл импортируется прямо в запросе
+# (больше — задачей Celery) и максимальный размер файла
+HABIT_IMPORT_BATCH_SIZE = 1000
+HABIT_IMPORT_MAX_REJECTS = 1000
+HABIT_IMPORT_SYNC_MAX_BYTES = 256 * 1024
+HABIT_IMPORT_MAX_BYTES = 100 * 1024 * 1024
+# Каталог загруженных файлов импорта, общий для web и celery_worker
+HABIT_IMPORT_DIR = os.getenv("HABIT_IMPORT_DIR", os.path.join(BASE_DIR, "imports"))
+
+# Публичная лента привычек: сколько хранить страницу в Redis (кэш сбрасывается
+# при изменении публичных привычек) и сколько секунд её могут кэшировать nginx/CDN
+PUBLIC_FEED_CACHE_TIMEOUT = 300
+PUBLIC_FEED_MAX_AGE = int(os.getenv("PUBLIC_FEED_MAX_AGE", 5))
+
+# Подсчёт SQL-запросов на HTTP-запрос и поиск N+1 (config/querybudget.py):
+# включается в разработке, в строгом режиме превышение бюджета — ошибка
+QUERY_BUDGET_ENABLED = DEBUG
+QUERY_BUDGET_STRICT = False
+QUERY_BUDGET_REPEAT_THRESHOLD = 3
+
+# Метрики Prometheus (/metrics): общее хранилище в Redis для всех процессов
+METRICS_BACKEND = os.getenv("METRICS_BACKEND", "redis")
+METRICS_REDIS_URL = os.getenv("METRICS_REDIS_URL", REDIS_URL.replace("/0", "/2"))
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+METRICS_QUEUES = ["celery"]
+# Запись накопленных метрик в Redis раз в столько секунд (0 — на каждое
+# событие) и пауза после ошибки записи
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", 5))
+METRICS_RETRY_INTERVAL = float(os.getenv("METRICS_RETRY_INTERVAL", 30))
+
+# Активность пользователей (users.activity): хранилище ("redis" или "local"),
+# как часто процесс записывает активность одного пользователя (секунды)
+# и как часто она переносится в users_user
+ACTIVITY_BACKEND = os.getenv("ACTIVITY_BACKEND", "redis")
+ACTIVITY_REDIS_URL = os.getenv("ACTIVITY_REDIS_URL", REDIS_URL)
+ACTIVITY_RESOLUTION = 60
+ACTIVITY_LOCAL_CACHE_SIZE = 10000
+ACTIVITY_FLUSH_INTERVAL = 60
+CELERY_BEAT_SCHEDULE["flush-user-activity"] = {
+    "task": "users.tasks.flush_user_activity",
+    "schedule": ACTIVITY_FLUSH_INTERVAL,
+}
+
 if "test" in sys.argv:
     DATABASES = {
         "default": {
@@ -189,3 +304,14 @@ if "test" in sys.argv:
             "NAME": BASE_DIR / "test_db_sqlite3",
         }
     }
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+    METRICS_BACKEND = "local"
+    METRICS_FLUSH_INTERVAL = 0
+    ACTIVITY_BACKEND = "local"
+    METRICS_QUEUES = []
+    QUERY_BUDGET_ENABLED = True
+    QUERY_BUDGET_STRICT = True
@@ -6,6 +6,8 @@ from drf_spectacular.views import (
     SpectacularSwaggerView,
 )
 
+from config.metrics import metrics_view
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("habits/", include("habits.urls", namespace="habits")),
@@ -15,4 +17,6 @@ urlpatterns = [
     path("swagger/", SpectacularSwaggerView.as_view(url_name="schema"), name="swagger"),
     # Альтернативно: Redoc UI
     path("redoc/", SpectacularRedocView.as_view(url_name="schema"), name="redoc"),
+    # Метрики Prometheus
+    path("metrics", metrics_view, name="metrics"),
 ]
@@ -1,23 +1,16 @@
-# flake8: noqa: E402
+"""
+WSGI config for config project.
 
-import eventlet
+It exposes the WSGI callable as a module-level variable named ``application``.
 
-eventlet.monkey_patch()
+For more information on this file, see
+https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
+"""
 
 import os
 
-
 from django.core.wsgi import get_wsgi_application
 
-
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
-application = get_wsgi_application()
 
-"""
-WSGI config for config project.
-
-It exposes the WSGI callable as a module-level variable named ``application``.
-
-For more information on this file, see
-https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
-"""
+application = get_wsgi_application()
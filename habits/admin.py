@@ -20,11 +20,20 @@ class HabitAdmin(admin.ModelAdmin):
         "remind_at",
         "repeat",
         "last_reminded_at",
+        "next_remind_at",
+        "current_streak",
+        "longest_streak",
     ]
     list_filter = ["is_pleasant", "is_public", "periodicity", "user"]
     search_fields = ["action", "reward", "user__email", "place"]
     ordering = ["user", "time"]
-    readonly_fields = ["id"]
+    readonly_fields = [
+        "id",
+        "next_remind_at",
+        "current_streak",
+        "longest_streak",
+        "last_completed_on",
+    ]
 
     fieldsets = (
         (None, {"fields": ("user", "action", "time", "place", "periodicity")}),
@@ -40,6 +49,10 @@ class HabitAdmin(admin.ModelAdmin):
                     "remind_at",
                     "repeat",
                     "last_reminded_at",
+                    "next_remind_at",
+                    "current_streak",
+                    "longest_streak",
+                    "last_completed_on",
                 )
             },
         ),
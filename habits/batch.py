@@ -0,0 +1,250 @@
+"""
+Пакетные операции с привычками (HabitViewSet.batch).
+
+Вся пачка валидируется за один проход (правила HabitSerializer.validate
+и Habit.clean) и записывается в одной транзакции через bulk_create,
+bulk_update или один DELETE. Если хотя бы один элемент невалиден, ничего
+не записывается, а ошибки возвращаются списком по позициям элементов.
+
+bulk_create и bulk_update не вызывают Habit.save() и сигналы, поэтому
+next_remind_at, version и updated_at выставляются здесь, а кэши
+(версии для напоминаний, отметка изменений пользователя, публичная лента)
+обновляются явно.
+"""
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+from habits.cache import (
+    invalidate_public_feed,
+    remember_habit_versions,
+    touch_user_habits,
+)
+from habits.models import Habit
+from habits.serializers import HabitBatchSerializer
+
+
+def _check_items(items):
+    if not isinstance(items, list) or not items:
+        raise serializers.ValidationError(
+            {api_settings.NON_FIELD_ERRORS_KEY: ["Ожидается непустой список."]}
+        )
+    if len(items) > settings.HABIT_BATCH_MAX_SIZE:
+        raise serializers.ValidationError(
+            {
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    f"Не больше {settings.HABIT_BATCH_MAX_SIZE} элементов за запрос."
+                ]
+            }
+        )
+
+
+def _to_int(value):
+    if isinstance(value, bool):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _int_ids(values):
+    return {i for i in map(_to_int, values) if i is not None}
+
+
+def serializer_context(request, items):
+    """Контекст сериализаторов с приятными привычками всей пачки (один запрос)."""
+    related_ids = _int_ids(
+        item.get("related_habit") for item in items if isinstance(item, dict)
+    )
+    related = Habit.objects.filter(is_pleasant=True).in_bulk(related_ids)
+    return {"request": request, "related_habits": related}
+
+
+def validate_item(serializer, habit):
+    """
+    Валидирует элемент пачки и применяет данные к объекту привычки.
+
+    Правила те же, что при сохранении через API: HabitSerializer.validate
+    и Habit.clean.
+
+    Args:
+        serializer (HabitBatchSerializer): сериализатор элемента.
+        habit (Habit): объект, к которому применяются данные.
+
+    Returns:
+        dict: ошибки элемента (пустой словарь, если ошибок нет).
+    """
+    if not serializer.is_valid():
+        return serializer.errors
+    for field, value in serializer.validated_data.items():
+        setattr(habit, field, value)
+    try:
+        habit.clean()
+    except DjangoValidationError as e:
+        return {api_settings.NON_FIELD_ERRORS_KEY: e.messages}
+    return {}
+
+
+def _validate(serializers_list, habits):
+    """
+    Валидирует элементы пачки и применяет данные к объектам привычек.
+
+    Args:
+        serializers_list (list[HabitBatchSerializer | dict]): сериализаторы
+            элементов (словарь — уже найденная ошибка элемента).
+        habits (list[Habit | None]): объекты, к которым применяются данные.
+
+    Raises:
+        serializers.ValidationError: список ошибок по позициям, если есть ошибки.
+    """
+    errors = [
+        serializer if isinstance(serializer, dict) else validate_item(serializer, habit)
+        for serializer, habit in zip(serializers_list, habits)
+    ]
+    if any(errors):
+        raise serializers.ValidationError(errors)
+
+
+def _publish(habits, user_ids, public_changed):
+    """Обновляет кэши, которые при обычном сохранении обновляют сигналы."""
+    versions = {habit.pk: habit.version for habit in habits}
+    transaction.on_commit(lambda: remember_habit_versions(versions))
+    transaction.on_commit(lambda: touch_user_habits(*user_ids))
+    if public_changed:
+        transaction.on_commit(invalidate_public_feed)
+
+
+def batch_create(request, items):
+    """
+    Создаёт пачку привычек текущего пользователя.
+
+    Args:
+        request (Request): запрос DRF.
+        items (list[dict]): данные привычек.
+
+    Returns:
+        list[Habit]: созданные привычки.
+    """
+    _check_items(items)
+    context = serializer_context(request, items)
+    serializers_list = [
+        HabitBatchSerializer(data=item, context=context) for item in items
+    ]
+    habits = [Habit(user=request.user) for _ in items]
+    _validate(serializers_list, habits)
+
+    for habit in habits:
+        habit.next_remind_at = habit.compute_next_remind_at()
+    with transaction.atomic():
+        Habit.objects.bulk_create(habits)
+        _publish(habits, [request.user.id], any(h.is_public for h in habits))
+    return habits
+
+
+def batch_update(request, items):
+    """
+    Частично обновляет пачку привычек текущего пользователя.
+
+    Args:
+        request (Request): запрос DRF.
+        items (list[dict]): данные привычек, у каждой обязателен id.
+
+    Returns:
+        list[Habit]: обновлённые привычки.
+    """
+    _check_items(items)
+    context = serializer_context(request, items)
+    ids = _int_ids(item.get("id") for item in items if isinstance(item, dict))
+
+    with transaction.atomic():
+        existing = (
+            Habit.objects.select_for_update(of=("self",))
+            .select_related("user")
+            .filter(user=request.user)
+            .in_bulk(ids)
+        )
+        serializers_list, habits, seen = [], [], set()
+        for item in items:
+            habit_id = _to_int(item.get("id")) if isinstance(item, dict) else None
+            habit = existing.get(habit_id)
+            if habit is None or habit.pk in seen:
+                message = "Привычка не найдена." if habit is None else "Повторяется."
+                serializers_list.append({"id": [message]})
+            else:
+                seen.add(habit.pk)
+                serializers_list.append(
+                    HabitBatchSerializer(
+                        habit, data=item, partial=True, context=context
+                    )
+                )
+            habits.append(habit)
+        was_public = any(habit.is_public for habit in existing.values())
+        _validate(serializers_list, habits)
+
+        fields = {"next_remind_at", "version", "updated_at"}
+        for serializer in serializers_list:
+            fields.update(serializer.validated_data)
+        fields.discard("user")
+        now = timezone.now()
+        for habit in habits:
+            habit.next_remind_at = habit.compute_next_remind_at()
+            habit.version += 1
+            habit.updated_at = now
+        Habit.objects.bulk_update(habits, sorted(fields))
+        _publish(
+            habits,
+            [request.user.id],
+            was_public or any(habit.is_public for habit in habits),
+        )
+    return habits
+
+
+def batch_delete(request, ids):
+    """
+    Удаляет пачку привычек текущего пользователя.
+
+    Удаление идёт через QuerySet.delete(), поэтому сигналы удаления
+    (версии для напоминаний, кэши) отрабатывают как при обычном удалении.
+    Владельцы привычек, ссылающихся на удаляемые приятные, собираются
+    одним запросом.
+
+    Args:
+        request (Request): запрос DRF.
+        ids (list[int]): идентификаторы привычек.
+
+    Returns:
+        int: количество удалённых привычек.
+    """
+    _check_items(ids)
+    with transaction.atomic():
+        existing = set(
+            Habit.objects.select_for_update(of=("self",))
+            .filter(user=request.user, id__in=_int_ids(ids))
+            .values_list("id", flat=True)
+        )
+        errors, seen = [], set()
+        for value in ids:
+            habit_id = _to_int(value)
+            if habit_id not in existing:
+                errors.append({"id": ["Привычка не найдена."]})
+            elif habit_id in seen:
+                errors.append({"id": ["Повторяется."]})
+            else:
+                errors.append({})
+            seen.add(habit_id)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        related_user_ids = set(
+            Habit.objects.filter(related_habit__in=existing)
+            .exclude(id__in=existing)
+            .values_list("user_id", flat=True)
+        )
+        Habit.objects.filter(id__in=existing).delete()
+        if related_user_ids:
+            transaction.on_commit(lambda: touch_user_habits(*related_user_ids))
+    return len(existing)
@@ -0,0 +1,219 @@
+import hashlib
+import json
+import time
+
+from django.core.cache import cache
+
+# Сколько хранить версию привычки в кэше: заведомо дольше, чем напоминание
+# может пролежать в очереди Celery
+HABIT_VERSION_TIMEOUT = 24 * 60 * 60
+
+# Версия-«надгробие» для удалённых привычек (настоящие версии начинаются с 1)
+DELETED_VERSION = 0
+
+
+def habit_version_key(habit_id):
+    return f"habits:version:{habit_id}"
+
+
+def remember_habit_version(habit_id, version):
+    """
+    Сохраняет в кэше актуальную версию привычки.
+
+    Args:
+        habit_id (int): идентификатор привычки.
+        version (int): версия привычки (DELETED_VERSION для удалённой).
+    """
+    cache.set(habit_version_key(habit_id), version, HABIT_VERSION_TIMEOUT)
+
+
+def remember_habit_versions(versions):
+    """
+    Сохраняет в кэше версии нескольких привычек одним обращением.
+
+    Args:
+        versions (dict[int, int]): версии по идентификаторам привычек.
+    """
+    cache.set_many(
+        {
+            habit_version_key(habit_id): version
+            for habit_id, version in versions.items()
+        },
+        HABIT_VERSION_TIMEOUT,
+    )
+
+
+def stale_habit_ids(versions):
+    """
+    Определяет привычки, изменённые или удалённые после формирования напоминания.
+
+    Проверка выполняется одним обращением к кэшу, без запросов к базе.
+    Привычки без версии в кэше считаются актуальными.
+
+    Args:
+        versions (dict[int, int]): версии привычек на момент формирования напоминания.
+
+    Returns:
+        set[int]: идентификаторы устаревших привычек.
+    """
+    keys = {habit_version_key(habit_id): habit_id for habit_id in versions}
+    current = cache.get_many(keys)
+    return {
+        keys[key] for key, version in current.items() if version != versions[keys[key]]
+    }
+
+
+# Кэш публичной ленты привычек. Ключи страниц содержат номер поколения:
+# любое изменение публичной привычки увеличивает его, и старые страницы
+# перестают читаться (а затем истекают по таймауту)
+PUBLIC_FEED_GENERATION_KEY = "habits:public:generation"
+PUBLIC_FEED_SURROGATE_KEY = "habits-public"
+
+# Параметры запроса, от которых зависит страница ленты
+PUBLIC_FEED_PARAMS = ("page", "page_size", "cursor", "pagination", "ordering")
+
+
+def public_feed_generation():
+    """
+    Возвращает текущее поколение публичной ленты.
+
+    Начальное значение берётся из текущего времени, чтобы после вытеснения
+    ключа из Redis поколение не совпало с одним из прежних.
+
+    Returns:
+        int: номер поколения.
+    """
+    generation = cache.get(PUBLIC_FEED_GENERATION_KEY)
+    if generation is None:
+        cache.add(PUBLIC_FEED_GENERATION_KEY, time.time_ns() // 1000, None)
+        generation = cache.get(PUBLIC_FEED_GENERATION_KEY)
+    return generation
+
+
+async def apublic_feed_generation():
+    """Асинхронный вариант public_feed_generation."""
+    generation = await cache.aget(PUBLIC_FEED_GENERATION_KEY)
+    if generation is None:
+        await cache.aadd(PUBLIC_FEED_GENERATION_KEY, time.time_ns() // 1000, None)
+        generation = await cache.aget(PUBLIC_FEED_GENERATION_KEY)
+    return generation
+
+
+def invalidate_public_feed():
+    """Сбрасывает все закэшированные страницы публичной ленты."""
+    try:
+        cache.incr(PUBLIC_FEED_GENERATION_KEY)
+    except ValueError:
+        public_feed_generation()
+
+
+def public_feed_key(request):
+    """
+    Ключ кэша страницы публичной ленты.
+
+    Args:
+        request (Request): запрос DRF.
+
+    Returns:
+        str: ключ кэша.
+    """
+    return f"habits:public:{public_feed_generation()}:{_public_feed_digest(request)}"
+
+
+async def apublic_feed_key(request):
+    """Асинхронный вариант public_feed_key."""
+    generation = await apublic_feed_generation()
+    return f"habits:public:{generation}:{_public_feed_digest(request)}"
+
+
+def _public_feed_digest(request):
+    params = [(name, request.query_params.get(name)) for name in PUBLIC_FEED_PARAMS]
+    # Ссылки next/previous абсолютные, поэтому хост тоже входит в ключ
+    return hashlib.sha1(json.dumps([request.get_host(), params]).encode()).hexdigest()
+
+
+# Отметка последнего изменения привычек пользователя (time.time_ns()),
+# из неё строятся ETag и Last-Modified списка и карточек привычек
+USER_HABITS_MARKER_TIMEOUT = 30 * 24 * 60 * 60
+
+
+def user_habits_key(user_id):
+    return f"habits:user-changed:{user_id}"
+
+
+def user_habits_marker(user_id):
+    """
+    Возвращает отметку последнего изменения привычек пользователя.
+
+    Если отметки нет (ещё не было изменений или она вытеснена из кэша),
+    создаётся новая: клиенты просто получат полный ответ один лишний раз.
+
+    Args:
+        user_id (int): идентификатор пользователя.
+
+    Returns:
+        int: отметка времени в наносекундах.
+    """
+    key = user_habits_key(user_id)
+    marker = cache.get(key)
+    if marker is None:
+        cache.add(key, time.time_ns(), USER_HABITS_MARKER_TIMEOUT)
+        marker = cache.get(key)
+    return marker
+
+
+async def auser_habits_marker(user_id):
+    """Асинхронный вариант user_habits_marker."""
+    key = user_habits_key(user_id)
+    marker = await cache.aget(key)
+    if marker is None:
+        await cache.aadd(key, time.time_ns(), USER_HABITS_MARKER_TIMEOUT)
+        marker = await cache.aget(key)
+    return marker
+
+
+def touch_user_habits(*user_ids):
+    """
+    Обновляет отметку изменения привычек пользователей.
+
+    Args:
+        *user_ids (int): идентификаторы пользователей.
+    """
+    marker = time.time_ns()
+    cache.set_many(
+        {user_habits_key(user_id): marker for user_id in user_ids},
+        USER_HABITS_MARKER_TIMEOUT,
+    )
+
+
+# Состояние фонового импорта привычек (habits.importer): его читает
+# HabitViewSet.import_status, пока задача Celery обрабатывает файл
+IMPORT_STATUS_TIMEOUT = 24 * 60 * 60
+
+
+def import_status_key(import_id):
+    return f"habits:import:{import_id}"
+
+
+def get_import_status(import_id):
+    """
+    Возвращает состояние импорта.
+
+    Args:
+        import_id (str): идентификатор импорта.
+
+    Returns:
+        dict | None: состояние (user_id, state и счётчики отчёта) или None.
+    """
+    return cache.get(import_status_key(import_id))
+
+
+def set_import_status(import_id, status):
+    """
+    Сохраняет состояние импорта.
+
+    Args:
+        import_id (str): идентификатор импорта.
+        status (dict): состояние (user_id, state и счётчики отчёта).
+    """
+    cache.set(import_status_key(import_id), status, IMPORT_STATUS_TIMEOUT)
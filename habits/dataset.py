@@ -0,0 +1,177 @@
+"""
+Генератор синтетических данных для нагрузочных замеров.
+
+Создаёт пользователей, их привычки и Telegram-профили массовыми вставками
+(bulk_create пачками), с распределениями, похожими на рабочие данные:
+часовые пояса, утренние и вечерние привычки, доля повторяющихся, публичных
+и приятных привычек, напоминания в прошлом (наступившие) и в будущем.
+При одинаковом seed данные получаются одинаковыми.
+"""
+
+import random
+from datetime import time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+
+from habits import recurrence
+from habits.models import Habit
+from users.models import UserTelegram
+
+DATASET_CHUNK_SIZE = 5000
+
+TIME_ZONES = {
+    "Europe/Moscow": 50,
+    "Asia/Yekaterinburg": 10,
+    "Asia/Novosibirsk": 8,
+    "Europe/Samara": 6,
+    "Europe/Kaliningrad": 4,
+    "Asia/Vladivostok": 4,
+    "Europe/Berlin": 6,
+    "America/New_York": 4,
+    "UTC": 8,
+}
+REPEATS = {"daily": 60, "weekly": 25, "none": 15}
+# Привычки чаще всего выполняются утром и вечером
+HOURS = {6: 8, 7: 16, 8: 14, 9: 8, 12: 6, 13: 4, 18: 8, 19: 10, 20: 12, 21: 10, 22: 4}
+ACTIONS = ["Зарядка", "Пробежка", "Чтение", "Медитация", "Стакан воды", "Прогулка"]
+PLEASANT_ACTIONS = ["Кофе", "Сериал", "Ванна", "Любимая музыка"]
+PLACES = ["дом", "парк", "офис", "спортзал", "кухня"]
+REWARDS = ["Десерт", "Игра", "Прогулка с собакой"]
+
+PUBLIC_SHARE = 0.2
+PLEASANT_SHARE = 0.15
+REWARD_SHARE = 0.3
+RELATED_SHARE = 0.3
+REMINDER_SHARE = 0.85
+# Доля привычек с уже отправлявшимися напоминаниями (остальные ждут первого)
+REMINDED_SHARE = 0.6
+DIGEST_SHARE = 0.1
+
+
+def _choice(rng, weights):
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def _chunks(objects, size):
+    for start in range(0, len(objects), size):
+        yield objects[start : start + size]
+
+
+def dataset_users(prefix):
+    """
+    Пользователи, созданные generate_dataset с префиксом prefix.
+
+    Returns:
+        QuerySet: выборка пользователей.
+    """
+    return get_user_model().objects.filter(email__startswith=f"{prefix}-")
+
+
+def _habit(rng, user, now, **fields):
+    remind_at = last_reminded_at = None
+    repeat = _choice(rng, REPEATS)
+    if rng.random() < REMINDER_SHARE:
+        if rng.random() < REMINDED_SHARE:
+            remind_at = now - timedelta(days=rng.randint(1, 60))
+            last_reminded_at = now - timedelta(seconds=rng.randint(0, 8 * 86400))
+        else:
+            remind_at = now + timedelta(seconds=rng.randint(-3600, 7 * 86400))
+    return Habit(
+        user=user,
+        time=time(_choice(rng, HOURS), rng.choice((0, 15, 30, 45))),
+        place=rng.choice(PLACES),
+        periodicity=1 if rng.random() < 0.7 else rng.randint(2, 7),
+        duration=rng.choice((30, 60, 90, 120)),
+        is_public=rng.random() < PUBLIC_SHARE,
+        remind_at=remind_at,
+        repeat=repeat,
+        last_reminded_at=last_reminded_at,
+        # Пока напоминание не отправлялось, следующее совпадает с remind_at;
+        # остальные пересчитываются массово после вставки
+        next_remind_at=remind_at if last_reminded_at is None else None,
+        **fields,
+    )
+
+
+def generate_dataset(
+    users,
+    habits_per_user,
+    telegram_share=0.9,
+    seed=0,
+    prefix="bench",
+    chunk_size=DATASET_CHUNK_SIZE,
+):
+    """
+    Создаёт синтетических пользователей, привычки и Telegram-профили.
+
+    Args:
+        users (int): количество пользователей.
+        habits_per_user (int): привычек у каждого пользователя.
+        telegram_share (float): доля пользователей с Telegram-профилем.
+        seed (int): зерно генератора случайных чисел.
+        prefix (str): префикс email (по нему данные можно найти и удалить).
+        chunk_size (int): строк в одном INSERT.
+
+    Returns:
+        dict[str, int]: количество созданных пользователей, привычек и профилей.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    password = make_password(None)
+    User = get_user_model()
+
+    created_users = []
+    for chunk in _chunks(range(users), chunk_size):
+        created_users += User.objects.bulk_create(
+            User(
+                email=f"{prefix}-{seed}-{i}@example.com",
+                password=password,
+                time_zone=_choice(rng, TIME_ZONES),
+                reminder_digest=rng.random() < DIGEST_SHARE,
+            )
+            for i in chunk
+        )
+
+    profiles = [
+        UserTelegram(user=user, chat_id=f"{prefix}{seed}-{user.pk}")
+        for user in created_users
+        if rng.random() < telegram_share
+    ]
+    UserTelegram.objects.bulk_create(profiles, batch_size=chunk_size)
+
+    # Сначала приятные привычки: на них ссылаются полезные привычки того же пользователя
+    pleasant, useful_counts = {}, {}
+    pleasant_habits = []
+    for user in created_users:
+        count = sum(rng.random() < PLEASANT_SHARE for _ in range(habits_per_user))
+        useful_counts[user.pk] = habits_per_user - count
+        for _ in range(count):
+            habit = _habit(
+                rng, user, now, action=rng.choice(PLEASANT_ACTIONS), is_pleasant=True
+            )
+            pleasant.setdefault(user.pk, []).append(habit)
+            pleasant_habits.append(habit)
+    Habit.objects.bulk_create(pleasant_habits, batch_size=chunk_size)
+
+    useful_habits = []
+    for user in created_users:
+        for _ in range(useful_counts[user.pk]):
+            fields = {"action": rng.choice(ACTIONS)}
+            if pleasant.get(user.pk) and rng.random() < RELATED_SHARE:
+                fields["related_habit"] = rng.choice(pleasant[user.pk])
+            elif rng.random() < REWARD_SHARE:
+                fields["reward"] = rng.choice(REWARDS)
+            useful_habits.append(_habit(rng, user, now, **fields))
+    Habit.objects.bulk_create(useful_habits, batch_size=chunk_size)
+
+    recurrence.recompute_next_remind_at(
+        Habit.objects.filter(user__email__startswith=f"{prefix}-{seed}-"),
+        chunk_size=chunk_size * 10,
+    )
+    return {
+        "users": len(created_users),
+        "habits": len(pleasant_habits) + len(useful_habits),
+        "telegram_profiles": len(profiles),
+    }
@@ -0,0 +1,117 @@
+"""
+Потоковая выгрузка привычек (HabitViewSet.export) в NDJSON и CSV.
+
+Строки читаются через QuerySet.iterator(chunk_size=...) — на PostgreSQL это
+серверный курсор, — кодируются habit_row_encoder (те же поля и значения,
+что у HabitSerializer) и отдаются StreamingHttpResponse порциями по мере
+чтения. Память не зависит от количества привычек, а первые байты уходят
+клиенту сразу после первой порции строк.
+"""
+
+import csv
+import json
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+
+from habits.models import Habit
+from habits.serializers import habit_row_encoder
+
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson; charset=utf-8", "habits.ndjson"),
+    "csv": ("text/csv; charset=utf-8", "habits.csv"),
+}
+
+
+def export_rows(user_ids, chunk_size=None):
+    """
+    Строки привычек пользователей в порядке (user_id, id), без загрузки всей выборки.
+
+    Args:
+        user_ids (Iterable[int]): пользователи, чьи привычки выгружаются.
+        chunk_size (int | None): строк за одно чтение из курсора.
+
+    Returns:
+        Iterator[dict]: привычки в формате HabitSerializer.
+    """
+    rows = (
+        Habit.objects.filter(user_id__in=user_ids)
+        .order_by("user_id", "id")
+        .values(*habit_row_encoder.lookups)
+        .iterator(chunk_size=chunk_size or settings.HABIT_EXPORT_CHUNK_SIZE)
+    )
+    return map(habit_row_encoder.encode, rows)
+
+
+def _batched(lines, size):
+    # Одна порция ответа на size строк вместо отдельной записи на строку
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= size:
+            yield "".join(batch).encode()
+            batch = []
+    if batch:
+        yield "".join(batch).encode()
+
+
+def ndjson_lines(rows):
+    """
+    Строки NDJSON: по одному JSON-объекту на строку.
+
+    Args:
+        rows (Iterable[dict]): привычки.
+
+    Yields:
+        str: строка с переводом строки в конце.
+    """
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+class _Echo:
+    """Псевдофайл для csv.writer: write() возвращает записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    """
+    Строки CSV с заголовком из полей HabitSerializer.
+
+    Args:
+        rows (Iterable[dict]): привычки.
+
+    Yields:
+        str: строка CSV.
+    """
+    writer = csv.writer(_Echo())
+    yield writer.writerow(habit_row_encoder.fields)
+    for row in rows:
+        yield writer.writerow(row.values())
+
+
+def export_response(user_ids, export_format):
+    """
+    Потоковый ответ с привычками пользователей.
+
+    Args:
+        user_ids (Iterable[int]): пользователи, чьи привычки выгружаются.
+        export_format (str): "ndjson" или "csv".
+
+    Returns:
+        StreamingHttpResponse: ответ с вложением.
+    """
+    content_type, filename = EXPORT_FORMATS[export_format]
+    lines = ndjson_lines if export_format == "ndjson" else csv_lines
+    chunk_size = settings.HABIT_EXPORT_CHUNK_SIZE
+    response = StreamingHttpResponse(
+        _batched(lines(export_rows(user_ids, chunk_size)), chunk_size),
+        content_type=content_type,
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    response["Cache-Control"] = "private, no-store"
+    # nginx не должен копить ответ целиком перед отправкой клиенту
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -0,0 +1,225 @@
+"""
+Массовый импорт привычек из CSV и NDJSON (HabitViewSet.import_file,
+команда import_habits и задача Celery import_habits_file).
+
+Файл читается потоково, строки валидируются пачками по HABIT_IMPORT_BATCH_SIZE
+по тем же правилам, что и при создании через API (HabitSerializer.validate
+и Habit.clean), а приятные привычки, на которые ссылаются строки пачки,
+загружаются одним запросом. Валидные строки пачки записываются одной
+командой COPY (PostgreSQL) или bulk_create (остальные базы), невалидные
+попадают в отчёт с номером строки и ошибками. Каждая пачка записывается
+в своей транзакции, поэтому уже загруженные пачки не откатываются,
+если импорт прервётся.
+"""
+
+import csv
+import io
+import json
+from itertools import islice
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.settings import api_settings
+
+from habits.batch import serializer_context, validate_item
+from habits.cache import invalidate_public_feed, touch_user_habits
+from habits.models import Habit
+from habits.serializers import HabitBatchSerializer
+
+IMPORT_FORMATS = ("ndjson", "csv")
+IMPORT_EXTENSIONS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+
+
+def import_format_for(filename, requested=None):
+    """
+    Формат импорта: явно указанный или по расширению файла.
+
+    Returns:
+        str | None: "ndjson", "csv" или None, если формат не определён.
+    """
+    if requested:
+        return requested if requested in IMPORT_FORMATS else None
+    for extension, import_format in IMPORT_EXTENSIONS.items():
+        if filename.lower().endswith(extension):
+            return import_format
+    return None
+
+
+def import_storage():
+    """Хранилище загруженных файлов, общее для web и воркеров Celery."""
+    return FileSystemStorage(location=settings.HABIT_IMPORT_DIR)
+
+
+def _error(message):
+    return {api_settings.NON_FIELD_ERRORS_KEY: [message]}
+
+
+def _ndjson_rows(text):
+    for line_number, line in enumerate(text, 1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError:
+            yield line_number, None, _error("Некорректный JSON.")
+            continue
+        if not isinstance(data, dict):
+            yield line_number, None, _error("Ожидается объект JSON.")
+            continue
+        yield line_number, data, None
+
+
+def _csv_rows(text):
+    reader = csv.DictReader(text)
+    for row in reader:
+        # Пустые ячейки — незаполненные поля (значения по умолчанию)
+        data = {key: value for key, value in row.items() if key and value}
+        yield reader.line_num, data, None
+
+
+def parse_rows(stream, import_format):
+    """
+    Потоково разбирает файл импорта.
+
+    Ошибка кодировки или структуры CSV завершает разбор строкой с ошибкой.
+
+    Args:
+        stream (file): бинарный файл в UTF-8.
+        import_format (str): "ndjson" или "csv".
+
+    Yields:
+        tuple[int, dict | None, dict | None]: номер строки, данные привычки
+        и ошибки строки (если её не удалось разобрать).
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    rows = _ndjson_rows(text) if import_format == "ndjson" else _csv_rows(text)
+    line_number = 0
+    try:
+        for line_number, data, error in rows:
+            yield line_number, data, error
+    except (UnicodeDecodeError, csv.Error) as e:
+        yield line_number + 1, None, _error(f"Файл не удалось разобрать: {e}")
+    finally:
+        # Файл закрывает вызывающий код
+        text.detach()
+
+
+def validate_rows(user, rows):
+    """
+    Валидирует пачку строк как создание привычек пользователем user.
+
+    Args:
+        user (User): владелец импортируемых привычек.
+        rows (list[tuple]): строки из parse_rows.
+
+    Returns:
+        tuple[list[Habit], list[dict]]: валидные привычки и отклонённые строки.
+    """
+    # CurrentUserDefault берёт пользователя из context["request"]
+    context = serializer_context(
+        SimpleNamespace(user=user), [data for _, data, _ in rows if data is not None]
+    )
+    habits, rejects = [], []
+    for line_number, data, error in rows:
+        habit = Habit(user=user)
+        if error is None:
+            serializer = HabitBatchSerializer(data=data, context=context)
+            error = validate_item(serializer, habit)
+        if error:
+            rejects.append({"line": line_number, "errors": error})
+        else:
+            habits.append(habit)
+    return habits, rejects
+
+
+def _copy_value(value):
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def _copy_habits(habits):
+    """Записывает привычки одной командой COPY ... FROM STDIN (PostgreSQL)."""
+    fields = [field for field in Habit._meta.concrete_fields if not field.primary_key]
+    buffer = io.StringIO()
+    for habit in habits:
+        values = (
+            field.get_db_prep_save(getattr(habit, field.attname), connection)
+            for field in fields
+        )
+        buffer.write("\t".join(map(_copy_value, values)) + "\n")
+    buffer.seek(0)
+    quote = connection.ops.quote_name
+    columns = ", ".join(quote(field.column) for field in fields)
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {quote(Habit._meta.db_table)} ({columns}) FROM STDIN", buffer
+        )
+
+
+def load_habits(habits):
+    """
+    Записывает новые привычки без вызова Habit.save() и сигналов.
+
+    Args:
+        habits (list[Habit]): провалидированные привычки.
+    """
+    now = timezone.now()
+    for habit in habits:
+        habit.next_remind_at = habit.compute_next_remind_at()
+        habit.updated_at = now
+    if connection.vendor == "postgresql":
+        _copy_habits(habits)
+    else:
+        Habit.objects.bulk_create(habits, batch_size=settings.HABIT_IMPORT_BATCH_SIZE)
+
+
+def import_habits(user, stream, import_format, progress=None, max_rejects=None):
+    """
+    Импортирует привычки пользователя из файла.
+
+    Args:
+        user (User): владелец импортируемых привычек.
+        stream (file): бинарный файл в UTF-8.
+        import_format (str): "ndjson" или "csv".
+        progress (callable | None): вызывается с отчётом после каждой пачки.
+        max_rejects (int | None): сколько отклонённых строк хранить в отчёте
+            (по умолчанию HABIT_IMPORT_MAX_REJECTS).
+
+    Returns:
+        dict: отчёт — processed, imported, rejected и rejects (строки с ошибками).
+    """
+    if max_rejects is None:
+        max_rejects = settings.HABIT_IMPORT_MAX_REJECTS
+    report = {"processed": 0, "imported": 0, "rejected": 0, "rejects": []}
+    public = False
+    rows = parse_rows(stream, import_format)
+    while batch := list(islice(rows, settings.HABIT_IMPORT_BATCH_SIZE)):
+        habits, rejects = validate_rows(user, batch)
+        if habits:
+            with transaction.atomic():
+                load_habits(habits)
+        public = public or any(habit.is_public for habit in habits)
+        report["processed"] += len(batch)
+        report["imported"] += len(habits)
+        report["rejected"] += len(rejects)
+        report["rejects"] += rejects[: max_rejects - len(report["rejects"])]
+        if progress is not None:
+            progress(report)
+
+    if report["imported"]:
+        transaction.on_commit(lambda: touch_user_habits(user.id))
+        if public:
+            transaction.on_commit(invalidate_public_feed)
+    return report
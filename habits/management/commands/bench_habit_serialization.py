@@ -0,0 +1,75 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from habits.models import Habit
+from habits.serializers import HabitSerializer, habit_row_encoder
+
+
+class Command(BaseCommand):
+    """
+    Сравнивает HabitSerializer и быстрый путь чтения (values() + habit_row_encoder)
+    на страницах разного размера: выборка из базы, сериализация и JSON.
+
+    Привычки создаются во временной транзакции, которая откатывается в конце.
+    """
+
+    help = "Замеряет сериализацию списков привычек на страницах разного размера"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[5, 100, 1000])
+        parser.add_argument(
+            "--repeat", type=int, default=20, help="Сколько раз повторять замер"
+        )
+
+    def handle(self, *args, **options):
+        sizes = options["sizes"]
+        with transaction.atomic():
+            user = get_user_model().objects.create(email="bench-serialization@mail.com")
+            Habit.objects.bulk_create(
+                Habit(
+                    user=user,
+                    action=f"Привычка {i}",
+                    time=f"{i % 24:02d}:{i % 60:02d}",
+                    place="дом",
+                    periodicity=i % 7 + 1,
+                    reward="Кофе" if i % 2 else None,
+                    duration=60,
+                    is_public=True,
+                )
+                for i in range(max(sizes))
+            )
+            queryset = Habit.objects.filter(user=user).order_by("id")
+            for size in sizes:
+                self.bench(queryset, size, options["repeat"])
+            transaction.set_rollback(True)
+
+    def bench(self, queryset, size, repeat):
+        renderer = JSONRenderer()
+
+        def serializer_path():
+            page = list(queryset[:size])
+            return renderer.render(HabitSerializer(page, many=True).data)
+
+        def fast_path():
+            page = queryset.values(*habit_row_encoder.lookups)[:size]
+            return renderer.render(habit_row_encoder.encode_many(page))
+
+        if serializer_path() != fast_path():
+            raise CommandError("Быстрый путь отдаёт не то же, что HabitSerializer")
+        slow = self.per_row(serializer_path, size, repeat)
+        fast = self.per_row(fast_path, size, repeat)
+        self.stdout.write(
+            f"page_size={size}: HabitSerializer {slow:.1f} мкс/строка, "
+            f"быстрый путь {fast:.1f} мкс/строка, ускорение x{slow / fast:.1f}"
+        )
+
+    @staticmethod
+    def per_row(func, size, repeat):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        return (time.perf_counter() - started) / repeat / size * 1e6
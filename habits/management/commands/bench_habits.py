@@ -0,0 +1,283 @@
+import json
+import math
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from io import StringIO
+from itertools import cycle
+from pathlib import Path
+from unittest.mock import patch
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from config.querybudget import QueryRecorder
+from habits.cache import invalidate_public_feed
+from habits.dataset import dataset_users, generate_dataset
+from habits.models import Habit
+from habits.serializers import HabitSerializer
+from habits.tasks import check_and_send_reminders, send_reminder
+from habits.telegram import TelegramSender
+from habits.telegram_stub import StubBotAPIServer
+from habits.views import HabitViewSet
+
+DATASET_PREFIX = "bench-suite"
+
+
+class Command(BaseCommand):
+    """
+    Набор микробенчмарков горячих путей: списки привычек (свой и публичный),
+    HabitSerializer(many=True), сканирование напоминаний и отправка напоминания.
+
+    Данные создаёт habits.dataset во временной транзакции, которая откатывается
+    в конце. По каждому замеру сохраняются время (min, медиана, p95), число
+    SQL-запросов и пик выделенной памяти (tracemalloc). Результаты пишутся в JSON,
+    с --compare печатается разница с прошлым прогоном.
+    """
+
+    help = "Запускает набор бенчмарков и сохраняет результаты в JSON"
+
+    cases = (
+        "habit_list",
+        "habit_public_cold",
+        "habit_public_warm",
+        "serializer_many",
+        "check_and_send_reminders",
+        "send_reminder",
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument(
+            "--habits", type=int, default=10, help="Привычек у каждого пользователя"
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--repeat", type=int, default=30, help="Сколько раз повторять замер"
+        )
+        parser.add_argument(
+            "--warmup", type=int, default=3, help="Прогонов перед замером"
+        )
+        parser.add_argument(
+            "--only", nargs="+", choices=self.cases, help="Запустить только эти замеры"
+        )
+        parser.add_argument(
+            "--output",
+            help="Файл результатов (по умолчанию bench-results/<время>-<коммит>.json)",
+        )
+        parser.add_argument("--compare", help="Файл результатов прошлого прогона")
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options["compare"]:
+            try:
+                baseline = json.loads(Path(options["compare"]).read_text())
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Не удалось прочитать {options['compare']}: {e}")
+
+        server = StubBotAPIServer()
+        server.start()
+        try:
+            with transaction.atomic():
+                dataset = generate_dataset(
+                    options["users"],
+                    options["habits"],
+                    seed=options["seed"],
+                    prefix=DATASET_PREFIX,
+                )
+                self.user = dataset_users(DATASET_PREFIX).order_by("id").first()
+                self.server = server
+                results = {}
+                for name in options["only"] or self.cases:
+                    results[name] = self.measure(
+                        getattr(self, name)(), options["repeat"], options["warmup"]
+                    )
+                    self.stdout.write(self.format_result(name, results[name]))
+                transaction.set_rollback(True)
+        finally:
+            server.shutdown()
+            server.server_close()
+            # В кэше ленты не должно остаться страниц с откаченными данными
+            invalidate_public_feed()
+
+        report = {
+            "meta": self.meta(options, dataset),
+            "results": results,
+        }
+        path = Path(options["output"] or self.default_output(report["meta"]))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+        self.stdout.write(f"Результаты записаны в {path}")
+        if baseline is not None:
+            self.compare(baseline, report)
+
+    def measure(self, run, repeat, warmup):
+        """
+        Замеряет функцию: время повторных прогонов, SQL-запросы и пик памяти.
+
+        Args:
+            run (callable): замеряемая функция без аргументов.
+            repeat (int): количество прогонов для замера времени.
+            warmup (int): количество прогонов перед замером.
+
+        Returns:
+            dict: статистика замера (время в миллисекундах, память в КиБ).
+        """
+        with redirect_stdout(StringIO()):
+            for _ in range(warmup):
+                run()
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                run()
+                timings.append((time.perf_counter() - started) * 1000)
+
+            recorder = QueryRecorder()
+            with connection.execute_wrapper(recorder):
+                run()
+
+            tracemalloc.start()
+            try:
+                run()
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        timings.sort()
+        return {
+            "runs": repeat,
+            "min_ms": round(timings[0], 3),
+            "median_ms": round(statistics.median(timings), 3),
+            "p95_ms": round(timings[math.ceil(0.95 * repeat) - 1], 3),
+            "mean_ms": round(statistics.fmean(timings), 3),
+            "queries": recorder.count,
+            "peak_kib": round(peak / 1024, 1),
+        }
+
+    def habit_list(self):
+        view = HabitViewSet.as_view({"get": "list"})
+        factory = APIRequestFactory()
+
+        def run():
+            request = factory.get("/habits/", {"page_size": 100})
+            force_authenticate(request, user=self.user)
+            view(request).render()
+
+        return run
+
+    def habit_public_cold(self):
+        view = HabitViewSet.as_view({"get": "public"})
+        factory = APIRequestFactory()
+
+        def run():
+            invalidate_public_feed()
+            view(factory.get("/habits/public/", {"page_size": 100})).render()
+
+        return run
+
+    def habit_public_warm(self):
+        view = HabitViewSet.as_view({"get": "public"})
+        factory = APIRequestFactory()
+
+        def run():
+            view(factory.get("/habits/public/", {"page_size": 100})).render()
+
+        return run
+
+    def serializer_many(self):
+        queryset = Habit.objects.select_related("user").order_by("id")
+        renderer = JSONRenderer()
+
+        def run():
+            renderer.render(HabitSerializer(list(queryset[:100]), many=True).data)
+
+        return run
+
+    def check_and_send_reminders(self):
+        def run():
+            # Каждый прогон видит те же наступившие напоминания
+            with override_settings(REMINDER_SCHEDULER="beat", REMINDER_SCAN_WORKERS=1):
+                with patch("habits.tasks.deliver_reminders.delay"):
+                    with transaction.atomic():
+                        check_and_send_reminders()
+                        transaction.set_rollback(True)
+
+        return run
+
+    def send_reminder(self):
+        sender = TelegramSender(
+            base_url=self.server.base_url,
+            token="BENCH",
+            global_rate=1e6,
+            per_chat_rate=1e6,
+        )
+        habit_ids = cycle(
+            Habit.objects.filter(
+                user__email__startswith=f"{DATASET_PREFIX}-",
+                user__telegram_profile__isnull=False,
+            ).values_list("id", flat=True)[:1000]
+        )
+
+        def run():
+            with patch("habits.tasks.get_sender", return_value=sender):
+                send_reminder(next(habit_ids))
+
+        return run
+
+    @staticmethod
+    def format_result(name, result):
+        return (
+            f"{name}: медиана {result['median_ms']:.2f} мс, p95 {result['p95_ms']:.2f} мс, "
+            f"SQL {result['queries']}, память {result['peak_kib']:.0f} КиБ"
+        )
+
+    @staticmethod
+    def meta(options, dataset):
+        try:
+            commit = subprocess.run(
+                ["git", "rev-parse", "HEAD"],
+                cwd=settings.BASE_DIR,
+                capture_output=True,
+                text=True,
+            ).stdout.strip()
+        except OSError:
+            commit = ""
+        return {
+            "commit": commit or None,
+            "created_at": timezone.now().isoformat(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "dataset": dataset,
+            "seed": options["seed"],
+            "repeat": options["repeat"],
+            "warmup": options["warmup"],
+        }
+
+    @staticmethod
+    def default_output(meta):
+        stamp = timezone.now().strftime("%Y%m%dT%H%M%S")
+        commit = (meta["commit"] or "nogit")[:8]
+        return Path(settings.BASE_DIR) / "bench-results" / f"{stamp}-{commit}.json"
+
+    def compare(self, baseline, report):
+        """Печатает изменение медианы относительно прошлого прогона."""
+        self.stdout.write(f"Сравнение с коммитом {baseline['meta'].get('commit')}:")
+        for name, result in report["results"].items():
+            before = baseline.get("results", {}).get(name)
+            if not before:
+                continue
+            change = (result["median_ms"] / before["median_ms"] - 1) * 100
+            self.stdout.write(
+                f"  {name}: {before['median_ms']:.2f} → {result['median_ms']:.2f} мс "
+                f"({change:+.1f}%), SQL {before['queries']} → {result['queries']}"
+            )
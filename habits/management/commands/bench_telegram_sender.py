@@ -0,0 +1,71 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from habits.telegram import TelegramSender
+from habits.telegram_stub import StubBotAPIServer
+
+
+class Command(BaseCommand):
+    """
+    Замеряет пропускную способность TelegramSender на локальной заглушке Bot API.
+    """
+
+    help = "Замеряет пропускную способность отправителя Telegram на заглушке"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=300)
+        parser.add_argument("--chats", type=int, default=300)
+        parser.add_argument("--concurrency", type=int, default=10)
+        parser.add_argument("--global-rate", type=float, default=30)
+        parser.add_argument("--per-chat-rate", type=float, default=1)
+        parser.add_argument(
+            "--latency", type=float, default=0.05, help="Задержка заглушки, секунды"
+        )
+        parser.add_argument(
+            "--error-rate", type=float, default=0.0, help="Доля ответов 429"
+        )
+        parser.add_argument(
+            "--url",
+            default=None,
+            help="Адрес уже запущенной заглушки (по умолчанию запускается своя)",
+        )
+
+    def handle(self, *args, **options):
+        server = None
+        base_url = options["url"]
+        if base_url is None:
+            server = StubBotAPIServer(
+                latency=options["latency"],
+                error_rate=options["error_rate"],
+                retry_after=1,
+                enforce_limits=True,
+            )
+            server.start()
+            base_url = server.base_url
+
+        sender = TelegramSender(
+            base_url=base_url,
+            token="BENCH",
+            pool_size=options["concurrency"],
+            concurrency=options["concurrency"],
+            global_rate=options["global_rate"],
+            per_chat_rate=options["per_chat_rate"],
+        )
+        messages = [
+            (str(i % options["chats"]), f"Пора выполнить привычку: bench {i}!")
+            for i in range(options["messages"])
+        ]
+        started = time.perf_counter()
+        responses = sender.send_many(messages)
+        elapsed = time.perf_counter() - started
+
+        ok = sum(1 for r in responses if r is not None and r.status_code == 200)
+        self.stdout.write(
+            f"Отправлено {ok}/{len(messages)} за {elapsed:.2f} с "
+            f"({len(messages) / elapsed:.1f} сообщений/с)"
+        )
+        if server is not None:
+            self.stdout.write(f"Ответы заглушки: {dict(server.statuses)}")
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,58 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from habits.dataset import DATASET_CHUNK_SIZE, dataset_users, generate_dataset
+
+
+class Command(BaseCommand):
+    """
+    Заполняет базу синтетическими пользователями, привычками и Telegram-профилями
+    для нагрузочных замеров (см. habits.dataset).
+
+    Данные помечаются префиксом email и удаляются той же командой с --delete.
+    """
+
+    help = "Генерирует синтетические данные: N пользователей по M привычек"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument(
+            "--habits", type=int, default=10, help="Привычек у каждого пользователя"
+        )
+        parser.add_argument(
+            "--telegram-share",
+            type=float,
+            default=0.9,
+            help="Доля пользователей с Telegram-профилем",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--prefix", default="bench", help="Префикс email")
+        parser.add_argument("--chunk-size", type=int, default=DATASET_CHUNK_SIZE)
+        parser.add_argument(
+            "--delete",
+            action="store_true",
+            help="Удалить ранее сгенерированные данные с этим префиксом",
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        if options["delete"]:
+            deleted, _ = dataset_users(options["prefix"]).delete()
+            self.stdout.write(f"Удалено объектов: {deleted}")
+            return
+        with transaction.atomic():
+            created = generate_dataset(
+                options["users"],
+                options["habits"],
+                telegram_share=options["telegram_share"],
+                seed=options["seed"],
+                prefix=options["prefix"],
+                chunk_size=options["chunk_size"],
+            )
+        self.stdout.write(
+            f"Создано пользователей: {created['users']}, привычек: {created['habits']}, "
+            f"Telegram-профилей: {created['telegram_profiles']} "
+            f"за {time.perf_counter() - started:.2f} с"
+        )
@@ -0,0 +1,67 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from habits.importer import import_format_for, import_habits
+
+
+class Command(BaseCommand):
+    """
+    Импортирует привычки пользователя из CSV или NDJSON (см. habits.importer).
+
+    Файл читается потоково и загружается пачками; по ходу печатается прогресс,
+    в конце — отклонённые строки с ошибками.
+    """
+
+    help = "Импортирует привычки пользователя из файла CSV или NDJSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Файл .csv, .ndjson или .jsonl")
+        parser.add_argument(
+            "--user", required=True, help="id или email владельца привычек"
+        )
+        parser.add_argument("--format", dest="import_format", choices=["ndjson", "csv"])
+        parser.add_argument(
+            "--show-rejects",
+            type=int,
+            default=20,
+            help="Сколько отклонённых строк напечатать",
+        )
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        lookup = "pk" if options["user"].isdigit() else "email"
+        try:
+            user = User.objects.get(**{lookup: options["user"]})
+        except User.DoesNotExist:
+            raise CommandError(f"Пользователь {options['user']} не найден")
+        import_format = import_format_for(options["path"], options["import_format"])
+        if import_format is None:
+            raise CommandError("Не удалось определить формат, укажите --format")
+
+        started = time.perf_counter()
+        try:
+            with open(options["path"], "rb") as stream:
+                report = import_habits(
+                    user,
+                    stream,
+                    import_format,
+                    progress=self.progress,
+                    max_rejects=options["show_rejects"],
+                )
+        except OSError as e:
+            raise CommandError(str(e))
+
+        for reject in report["rejects"]:
+            self.stdout.write(f"строка {reject['line']}: {reject['errors']}")
+        self.stdout.write(
+            f"Загружено привычек: {report['imported']}, отклонено строк: "
+            f"{report['rejected']} за {time.perf_counter() - started:.2f} с"
+        )
+
+    def progress(self, report):
+        self.stdout.write(
+            f"обработано {report['processed']}, загружено {report['imported']}, "
+            f"отклонено {report['rejected']}"
+        )
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from habits.models import Habit
+from habits.streaks import REBUILD_CHUNK_SIZE, rebuild_streaks
+
+
+class Command(BaseCommand):
+    """
+    Массово пересчитывает счётчики серий выполнения привычек по журналу
+    HabitCompletion (например, после ручной правки журнала или миграции данных).
+    """
+
+    help = "Пересчитывает текущие и самые длинные серии выполнения привычек"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user", type=int, help="Пересчитать только привычки пользователя"
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=REBUILD_CHUNK_SIZE,
+            help="Сколько привычек обновлять одним запросом",
+        )
+
+    def handle(self, *args, **options):
+        habits = Habit.objects.all()
+        if options["user"]:
+            habits = habits.filter(user_id=options["user"])
+        started = time.perf_counter()
+        updated = rebuild_streaks(habits, chunk_size=options["chunk_size"])
+        self.stdout.write(
+            f"Пересчитано серий: {updated} за {time.perf_counter() - started:.2f} с"
+        )
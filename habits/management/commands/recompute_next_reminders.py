@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from habits.models import Habit
+from habits.recurrence import RECOMPUTE_CHUNK_SIZE, recompute_next_remind_at
+
+
+class Command(BaseCommand):
+    """
+    Массово пересчитывает время следующих напоминаний о привычках.
+
+    Запускается после обновления базы часовых поясов (tzdata) или изменения
+    правил повторения.
+    """
+
+    help = "Пересчитывает next_remind_at повторяющихся привычек"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user", type=int, help="Пересчитать только привычки пользователя"
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=RECOMPUTE_CHUNK_SIZE,
+            help="Сколько привычек пересчитывать за один раз",
+        )
+
+    def handle(self, *args, **options):
+        habits = Habit.objects.all()
+        if options["user"]:
+            habits = habits.filter(user_id=options["user"])
+        started = time.perf_counter()
+        updated = recompute_next_remind_at(habits, chunk_size=options["chunk_size"])
+        self.stdout.write(
+            f"Пересчитано напоминаний: {updated} "
+            f"за {time.perf_counter() - started:.2f} с"
+        )
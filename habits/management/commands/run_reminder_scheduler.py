@@ -0,0 +1,45 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from habits.scheduler import ReminderScheduler
+
+
+class Command(BaseCommand):
+    """
+    Запускает долгоживущий планировщик напоминаний с точностью до секунды.
+
+    Используется вместо celery beat задачи check_and_send_reminders
+    (REMINDER_SCHEDULER=wheel).
+    """
+
+    help = "Запускает посекундный планировщик напоминаний о привычках"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--horizon",
+            type=int,
+            default=600,
+            help="На сколько секунд вперёд держать напоминания в памяти",
+        )
+        parser.add_argument(
+            "--refill-interval",
+            type=int,
+            default=5,
+            help="Как часто (в секундах) подгружать изменённые привычки",
+        )
+
+    def handle(self, *args, **options):
+        if settings.REMINDER_SCHEDULER != "wheel":
+            raise CommandError(
+                "Установите REMINDER_SCHEDULER=wheel, иначе напоминания "
+                "будет отправлять и celery beat."
+            )
+        scheduler = ReminderScheduler(
+            horizon=timedelta(seconds=options["horizon"]),
+            refill_interval=timedelta(seconds=options["refill_interval"]),
+        )
+        loaded = scheduler.load()
+        self.stdout.write(f"Загружено напоминаний: {loaded}")
+        scheduler.run_forever()
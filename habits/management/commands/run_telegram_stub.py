@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+
+from habits.telegram_stub import StubBotAPIServer
+
+
+class Command(BaseCommand):
+    """
+    Запускает локальную заглушку Telegram Bot API.
+
+    Для отправки напоминаний в заглушку укажите
+    TELEGRAM_BOT_URL=http://<host>:<port>/bot.
+    """
+
+    help = "Запускает локальную заглушку Telegram Bot API"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8081)
+        parser.add_argument(
+            "--latency", type=float, default=0.0, help="Задержка ответа, секунды"
+        )
+        parser.add_argument(
+            "--error-rate",
+            type=float,
+            default=0.0,
+            help="Доля запросов, на которые отвечать 429",
+        )
+        parser.add_argument(
+            "--retry-after", type=int, default=1, help="retry_after в ответах 429"
+        )
+        parser.add_argument(
+            "--enforce-limits",
+            action="store_true",
+            help="Отвечать 429 при превышении лимитов Telegram (30/с всего, 1/с на чат)",
+        )
+
+    def handle(self, *args, **options):
+        server = StubBotAPIServer(
+            address=(options["host"], options["port"]),
+            latency=options["latency"],
+            error_rate=options["error_rate"],
+            retry_after=options["retry_after"],
+            enforce_limits=options["enforce_limits"],
+        )
+        self.stdout.write(f"Заглушка Bot API: TELEGRAM_BOT_URL={server.base_url}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f"Ответы: {dict(server.statuses)}")
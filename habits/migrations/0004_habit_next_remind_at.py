@@ -0,0 +1,55 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:29
+
+from datetime import timedelta
+
+from django.db import migrations, models
+
+REPEAT_INTERVALS = {
+    "daily": timedelta(days=1),
+    "weekly": timedelta(weeks=1),
+}
+
+
+def fill_next_remind_at(apps, schema_editor):
+    """Заполняет next_remind_at для уже существующих привычек с напоминаниями."""
+    Habit = apps.get_model("habits", "Habit")
+    batch = []
+    for habit in Habit.objects.exclude(remind_at__isnull=True).iterator(
+        chunk_size=1000
+    ):
+        if habit.last_reminded_at is None:
+            habit.next_remind_at = habit.remind_at
+        elif habit.repeat in REPEAT_INTERVALS:
+            habit.next_remind_at = (
+                habit.last_reminded_at + REPEAT_INTERVALS[habit.repeat]
+            )
+        else:
+            continue
+        batch.append(habit)
+        if len(batch) >= 1000:
+            Habit.objects.bulk_update(batch, ["next_remind_at"])
+            batch = []
+    if batch:
+        Habit.objects.bulk_update(batch, ["next_remind_at"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("habits", "0003_habit_last_reminded_at_habit_remind_at_habit_repeat"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="habit",
+            name="next_remind_at",
+            field=models.DateTimeField(
+                blank=True,
+                db_index=True,
+                editable=False,
+                null=True,
+                verbose_name="Время следующего напоминания о выполнении привычки",
+            ),
+        ),
+        migrations.RunPython(fill_next_remind_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("habits", "0004_habit_next_remind_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="habit",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True,
+                db_index=True,
+                verbose_name="Время последнего изменения привычки",
+            ),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("habits", "0005_habit_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="habit",
+            name="version",
+            field=models.PositiveIntegerField(
+                default=1, editable=False, verbose_name="Версия привычки"
+            ),
+        ),
+    ]
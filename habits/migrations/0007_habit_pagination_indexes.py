@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("habits", "0006_habit_version"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="habit",
+            index=models.Index(fields=["user", "id"], name="habit_user_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="habit",
+            index=models.Index(
+                fields=["user", "time", "id"], name="habit_user_time_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="habit",
+            index=models.Index(fields=["is_public", "id"], name="habit_public_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="habit",
+            index=models.Index(
+                fields=["is_public", "time", "id"], name="habit_public_time_id_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.7 on 2026-10-18 06:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("habits", "0007_habit_pagination_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="habit",
+            name="current_streak",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Текущая серия выполнений"
+            ),
+        ),
+        migrations.AddField(
+            model_name="habit",
+            name="last_completed_on",
+            field=models.DateField(
+                blank=True,
+                editable=False,
+                null=True,
+                verbose_name="День последнего выполнения",
+            ),
+        ),
+        migrations.AddField(
+            model_name="habit",
+            name="longest_streak",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Самая длинная серия выполнений"
+            ),
+        ),
+        migrations.CreateModel(
+            name="HabitCompletion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField(verbose_name="День выполнения")),
+                (
+                    "habit",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="completions",
+                        to="habits.habit",
+                        verbose_name="Привычка",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Выполнение привычки",
+                "verbose_name_plural": "Выполнения привычек",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("habit", "day"), name="habit_completion_habit_day_uniq"
+                    )
+                ],
+            },
+        ),
+    ]
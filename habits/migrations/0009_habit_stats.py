@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-18 06:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("habits", "0008_habit_streaks_completion"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="HabitStats",
+            fields=[
+                (
+                    "habit",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="stats",
+                        serialize=False,
+                        to="habits.habit",
+                        verbose_name="Привычка",
+                    ),
+                ),
+                ("computed_on", models.DateField(verbose_name="Посчитано на")),
+                ("completed", models.JSONField(default=list, verbose_name="Выполнено")),
+                ("expected", models.JSONField(default=list, verbose_name="Ожидалось")),
+                (
+                    "weekdays",
+                    models.JSONField(default=list, verbose_name="По дням недели"),
+                ),
+            ],
+            options={
+                "verbose_name": "Статистика привычки",
+                "verbose_name_plural": "Статистика привычек",
+            },
+        ),
+    ]
@@ -3,6 +3,40 @@ from django.core.exceptions import ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 
+from habits import recurrence
+
+
+class HabitQuerySet(models.QuerySet):
+    """
+    QuerySet привычек с массовыми операциями для планировщика напоминаний.
+    """
+
+    def mark_reminded(self, reminded_at):
+        """
+        Фиксирует отправку напоминаний для всех привычек выборки.
+
+        last_reminded_at получает значение reminded_at, а next_remind_at
+        пересчитывается по правилам повторения (см. habits.recurrence),
+        как в Habit.save(). Все привычки обновляются одним запросом.
+
+        Args:
+            reminded_at (datetime): время отправки напоминаний.
+
+        Returns:
+            int: количество обновлённых привычек.
+        """
+        return recurrence.mark_reminded(self, reminded_at)
+
+    def recompute_next_remind_at(self):
+        """
+        Массово пересчитывает next_remind_at (например, после обновления tzdata
+        или смены часового пояса пользователем).
+
+        Returns:
+            int: количество обновлённых привычек.
+        """
+        return recurrence.recompute_next_remind_at(self)
+
 
 class Habit(models.Model):
     """
@@ -22,6 +56,12 @@ class Habit(models.Model):
         remind_at (DateTime): Время отправки первого напоминания.
         repeat (str): Режим повторения (разово, ежедневно, еженедельно).
         last_reminded_at (DateTime): Время последнего отправленного напоминания.
+        next_remind_at (DateTime): Время следующего напоминания (индексируется, пусто — напоминаний нет).
+        updated_at (DateTime): Время последнего изменения привычки.
+        version (int): Номер версии, увеличивается при каждом сохранении привычки.
+        current_streak (int): Текущая серия выполнений подряд (см. habits.streaks).
+        longest_streak (int): Самая длинная серия выполнений.
+        last_completed_on (Date): День последнего выполнения.
     """
 
     user = models.ForeignKey(
@@ -118,6 +158,118 @@ class Habit(models.Model):
         verbose_name="Время напоминания о выполнении привычки, осуществленное в последний раз",
     )
 
+    next_remind_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=True,
+        verbose_name="Время следующего напоминания о выполнении привычки",
+    )
+
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name="Время последнего изменения привычки",
+    )
+
+    version = models.PositiveIntegerField(
+        default=1,
+        editable=False,
+        verbose_name="Версия привычки",
+    )
+
+    # Счётчики серий обновляются при каждой отметке выполнения (habits.streaks),
+    # чтобы не пересчитывать их по журналу HabitCompletion
+    current_streak = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Текущая серия выполнений",
+    )
+    longest_streak = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Самая длинная серия выполнений",
+    )
+    last_completed_on = models.DateField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="День последнего выполнения",
+    )
+
+    objects = HabitQuerySet.as_manager()
+
+    class Meta:
+        # Индексы под курсорную пагинацию списков (см. HabitCursorPagination)
+        indexes = [
+            models.Index(fields=["user", "id"], name="habit_user_id_idx"),
+            models.Index(fields=["user", "time", "id"], name="habit_user_time_id_idx"),
+            models.Index(fields=["is_public", "id"], name="habit_public_id_idx"),
+            models.Index(
+                fields=["is_public", "time", "id"], name="habit_public_time_id_idx"
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Запоминает загруженный из базы признак публичности, чтобы при сохранении
+        определить, затрагивает ли изменение публичную ленту (см. habits.signals).
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_is_public = instance.__dict__.get("is_public")
+        return instance
+
+    def compute_next_remind_at(self):
+        """
+        Вычисляет время следующего напоминания по remind_at, repeat и last_reminded_at.
+
+        - Без remind_at напоминаний нет.
+        - Пока напоминание не отправлялось, следующее время равно remind_at.
+        - После отправки повторяющиеся привычки напоминают через periodicity дней
+          (repeat="daily") или через неделю (repeat="weekly") в момент time
+          по часовому поясу пользователя, а разовые (repeat="none") больше не напоминают.
+
+        Returns:
+            datetime | None: время следующего напоминания или None.
+        """
+        if self.remind_at is None:
+            return None
+        if self.last_reminded_at is None:
+            return self.remind_at
+        days = recurrence.interval_days(self.repeat, self.periodicity)
+        if days is None:
+            return None
+        return recurrence.next_fire(
+            self.last_reminded_at, days, self.time, self.user.time_zone
+        )
+
+    def save(self, *args, **kwargs):
+        """
+        Сохраняет привычку, предварительно пересчитывая next_remind_at.
+
+        Каждое сохранение существующей привычки увеличивает version: по ней
+        задачи доставки отбрасывают напоминания об изменённых привычках.
+        При сохранении с update_fields поля updated_at и version добавляются всегда,
+        а next_remind_at — если обновляется любое из полей, от которых оно зависит.
+        """
+        self.next_remind_at = self.compute_next_remind_at()
+        if not self._state.adding:
+            self.version += 1
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            update_fields = set(update_fields) | {"updated_at", "version"}
+            if {
+                "remind_at",
+                "repeat",
+                "periodicity",
+                "time",
+                "last_reminded_at",
+            } & update_fields:
+                update_fields.add("next_remind_at")
+            kwargs["update_fields"] = update_fields
+        super().save(*args, **kwargs)
+
     def clean(self):
         """
         Валидирует корректность заданных параметров привычки.
@@ -147,3 +299,67 @@ class Habit(models.Model):
         Формат: "{действие} в {время} в {место}"
         """
         return f"{self.action} в {self.time} в {self.place}"
+
+
+class HabitCompletion(models.Model):
+    """
+    Журнал выполнения привычек: одна узкая строка на привычку и день.
+
+    Поля:
+        habit (ForeignKey): Выполненная привычка.
+        day (Date): День выполнения по часовому поясу владельца.
+    """
+
+    habit = models.ForeignKey(
+        Habit,
+        on_delete=models.CASCADE,
+        related_name="completions",
+        # Отдельный индекс не нужен: habit — первое поле уникального индекса
+        db_index=False,
+        verbose_name="Привычка",
+    )
+    day = models.DateField(verbose_name="День выполнения")
+
+    class Meta:
+        verbose_name = "Выполнение привычки"
+        verbose_name_plural = "Выполнения привычек"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["habit", "day"], name="habit_completion_habit_day_uniq"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.habit_id} выполнена {self.day}"
+
+
+class HabitStats(models.Model):
+    """
+    Ежедневная сводка выполнения привычки (см. habits.stats).
+
+    Поля:
+        habit (OneToOne): Привычка.
+        computed_on (Date): День по часовому поясу владельца, на который посчитана сводка.
+        completed (JSON): Выполнения за окна STATS_WINDOWS (7, 30 и 365 дней).
+        expected (JSON): Ожидаемые по периодичности выполнения за те же окна.
+        weekdays (JSON): Выполнения за последний год по дням недели (понедельник — 0).
+    """
+
+    habit = models.OneToOneField(
+        Habit,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="stats",
+        verbose_name="Привычка",
+    )
+    computed_on = models.DateField(verbose_name="Посчитано на")
+    completed = models.JSONField(default=list, verbose_name="Выполнено")
+    expected = models.JSONField(default=list, verbose_name="Ожидалось")
+    weekdays = models.JSONField(default=list, verbose_name="По дням недели")
+
+    class Meta:
+        verbose_name = "Статистика привычки"
+        verbose_name_plural = "Статистика привычек"
+
+    def __str__(self):
+        return f"Статистика {self.habit_id} на {self.computed_on}"
@@ -1,10 +1,212 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage
+from django.db.models import Q
 from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class HabitCursorPagination(pagination.BasePagination):
+    """
+    Курсорная (keyset) пагинация для списка привычек.
+
+    Страница выбирается условием по ключу сортировки последней строки
+    предыдущей страницы, а не OFFSET, поэтому любая страница стоит столько же,
+    сколько первая, и запрос COUNT(*) не выполняется. Сортировка задаётся
+    параметром ordering: "id" (по умолчанию) или "time" (по time, затем id).
+
+    page_size (int): количество привычек на странице по умолчанию.
+    page_size_query_param (str): имя параметра запроса для ручной установки размера страницы.
+    max_page_size (int): максимальное допустимое количество привычек на страницу.
+    """
+
+    page_size = 5
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    ordering_query_param = "ordering"
+    orderings = {"id": ("id",), "time": ("time", "id")}
+    default_ordering = "id"
+    invalid_cursor_message = "Неверный курсор."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Асинхронный вариант paginate_queryset (строки читаются через async for)."""
+        return self.set_page(
+            [row async for row in self.page_queryset(queryset, request)]
+        )
+
+    def page_queryset(self, queryset, request):
+        """
+        Выборка строк страницы (с одной лишней — признаком следующей страницы).
+
+        Returns:
+            QuerySet: не выполненный запрос страницы.
+        """
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request)
+        self.position, self.reverse = self.decode_cursor(request)
+
+        if self.position is not None:
+            self.position = self.clean_position(queryset.model, self.position)
+            queryset = queryset.filter(self.seek(self.position, self.reverse))
+        order = [f"-{field}" if self.reverse else field for field in self.ordering]
+        return queryset.order_by(*order)[: self.page_size + 1]
+
+    def set_page(self, rows):
+        has_more = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        if self.reverse:
+            rows.reverse()
+
+        started = self.position is not None
+        self.has_next = started if self.reverse else has_more
+        self.has_previous = has_more if self.reverse else started
+        self.page = rows
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_ordering(self, request):
+        name = request.query_params.get(
+            self.ordering_query_param, self.default_ordering
+        )
+        return self.orderings.get(name, self.orderings[self.default_ordering])
+
+    def seek(self, position, reverse):
+        """
+        Условие «строка после (или до) позиции» в порядке сортировки.
+
+        Для ключа (time, id): time > t OR (time = t AND id > i).
+
+        Args:
+            position (list): значения полей сортировки граничной строки.
+            reverse (bool): выбирать строки перед позицией.
+
+        Returns:
+            Q: условие для filter().
+        """
+        lookup = "lt" if reverse else "gt"
+        condition = Q()
+        for i, field in enumerate(self.ordering):
+            equal = {name: value for name, value in zip(self.ordering[:i], position)}
+            condition |= Q(**equal, **{f"{field}__{lookup}": position[i]})
+        return condition
+
+    def decode_cursor(self, request):
+        """
+        Разбирает курсор из параметров запроса.
+
+        Returns:
+            tuple[list | None, bool]: позиция и направление (True — к предыдущей странице).
+
+        Raises:
+            NotFound: если курсор повреждён.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            position, reverse = cursor["p"], bool(cursor.get("r"))
+        except (TypeError, ValueError, KeyError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def clean_position(self, model, position):
+        """
+        Приводит значения позиции курсора к типам полей сортировки.
+
+        Args:
+            model (type[Model]): модель выборки.
+            position (list): значения из курсора.
+
+        Returns:
+            list: значения полей сортировки.
+
+        Raises:
+            NotFound: если значение не подходит полю.
+        """
+        try:
+            values = [
+                model._meta.get_field(field).to_python(value)
+                for field, value in zip(self.ordering, position)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        if any(value is None for value in values):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def encode_cursor(self, row, reverse):
+        position = [_key_value(row, field) for field in self.ordering]
+        cursor = {"p": position, "r": 1} if reverse else {"p": position}
+        encoded = base64.urlsafe_b64encode(json.dumps(cursor).encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+
+def _key_value(row, field):
+    value = row[field] if isinstance(row, dict) else getattr(row, field)
+    return value if isinstance(value, int) else str(value)
 
 
 class HabitPagination(pagination.PageNumberPagination):
     """
     Пагинация для списка привычек.
 
+    По умолчанию постраничная (page), с параметром pagination=cursor или cursor=...
+    переключается на курсорную HabitCursorPagination.
+
     page_size (int): количество привычек на странице по умолчанию.
     page_size_query_param (str): имя параметра запроса для ручной установки размера страницы.
     max_page_size (int): максимальное допустимое количество привычек на страницу.
@@ -13,3 +215,57 @@ class HabitPagination(pagination.PageNumberPagination):
     page_size = 5
     page_size_query_param = "page_size"
     max_page_size = 100
+    cursor_pagination_class = HabitCursorPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if self.cursor_requested(request):
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        Асинхронный вариант paginate_queryset.
+
+        Количество строк читается acount(), страница — async for; номер
+        страницы, ошибки и ссылки те же, что у PageNumberPagination.
+        """
+        self.cursor_paginator = None
+        if self.cursor_requested(request):
+            self.cursor_paginator = self.cursor_pagination_class()
+            return await self.cursor_paginator.apaginate_queryset(
+                queryset, request, view
+            )
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        # count у Paginator — cached_property: посчитанное заранее значение
+        # не запрашивается повторно
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(
+                self.invalid_page_message.format(
+                    page_number=page_number, message=str(exc)
+                )
+            )
+        self.page.object_list = [row async for row in self.page.object_list]
+        return list(self.page)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    @staticmethod
+    def cursor_requested(request):
+        return (
+            request.query_params.get("pagination") == "cursor"
+            or "cursor" in request.query_params
+        )
@@ -8,6 +8,7 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
     """
 
     def has_object_permission(self, request, view, obj):
+        # Сравнение по user_id не загружает владельца из базы
         if request.method in permissions.SAFE_METHODS:
-            return obj.is_public or obj.user == request.user
-        return obj.user == request.user
+            return obj.is_public or obj.user_id == request.user.id
+        return obj.user_id == request.user.id
@@ -0,0 +1,341 @@
+"""
+Расчёт времени следующего напоминания о привычке.
+
+Следующее напоминание наступает через интервал повторения (для repeat="daily" —
+periodicity дней, для repeat="weekly" — неделя) после дня последней отправки,
+в момент Habit.time по часовому поясу пользователя. Время считается по
+календарю пользователя, поэтому не «уплывает» из-за задержек отправки
+и корректно переживает переход на летнее время.
+
+Кроме расчёта для одной привычки (next_fire) есть векторизованный расчёт
+на NumPy (bulk_next_fire) для массового пересчёта — например, после
+обновления tzdata или смены часового пояса пользователем.
+"""
+
+from datetime import datetime
+from datetime import time as dt_time
+from datetime import timedelta
+from datetime import timezone as dt_timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import numpy as np
+from django.db import connection
+from django.db.models import BigIntegerField, ExpressionWrapper, F, Func
+from django.db.models.functions import ExtractHour, ExtractMinute, ExtractSecond
+from django.utils import timezone
+
+SECONDS_PER_DAY = 24 * 60 * 60
+
+# Шаг, с которым опрашивается смещение пояса при поиске переходов.
+# Переходы одного пояса не бывают чаще, чем раз в несколько недель.
+TRANSITION_SAMPLE_STEP = 6 * 60 * 60
+
+# Сколько привычек пересчитывается и записывается за один раз
+RECOMPUTE_CHUNK_SIZE = 50000
+
+
+@lru_cache(maxsize=None)
+def get_zone(name):
+    """
+    Возвращает часовой пояс по имени IANA.
+
+    Args:
+        name (str): имя пояса, например "Europe/Moscow".
+
+    Returns:
+        ZoneInfo: часовой пояс (UTC, если имя неизвестно).
+    """
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError, TypeError):
+        return ZoneInfo("UTC")
+
+
+def interval_days(repeat, periodicity):
+    """
+    Интервал между напоминаниями в днях.
+
+    Args:
+        repeat (str): режим повторения ("none", "daily", "weekly").
+        periodicity (int): периодичность привычки в днях.
+
+    Returns:
+        int | None: количество дней или None, если напоминание не повторяется.
+    """
+    if repeat == "daily":
+        return periodicity or 1
+    if repeat == "weekly":
+        return 7
+    return None
+
+
+def _as_time(value):
+    return value if isinstance(value, dt_time) else dt_time.fromisoformat(value)
+
+
+def next_fire(last_reminded_at, days, time_of_day, zone_name):
+    """
+    Вычисляет время следующего напоминания для одной привычки.
+
+    Args:
+        last_reminded_at (datetime): время последней отправки.
+        days (int): интервал повторения в днях.
+        time_of_day (time | str): время выполнения привычки.
+        zone_name (str): часовой пояс пользователя.
+
+    Returns:
+        datetime: время следующего напоминания в UTC.
+    """
+    zone = get_zone(zone_name)
+    local_date = last_reminded_at.astimezone(zone).date() + timedelta(days=days)
+    local_fire = datetime.combine(local_date, _as_time(time_of_day), tzinfo=zone)
+    return local_fire.astimezone(dt_timezone.utc)
+
+
+def _utc_offset(zone, ts):
+    return int(datetime.fromtimestamp(ts, zone).utcoffset().total_seconds())
+
+
+def zone_transitions(zone, start_ts, end_ts):
+    """
+    Находит переходы смещения часового пояса на отрезке времени.
+
+    Смещение опрашивается с шагом TRANSITION_SAMPLE_STEP, момент каждого
+    перехода уточняется двоичным поиском до секунды.
+
+    Args:
+        zone (ZoneInfo): часовой пояс.
+        start_ts (int): начало отрезка, unix timestamp.
+        end_ts (int): конец отрезка, unix timestamp.
+
+    Returns:
+        tuple[numpy.ndarray, numpy.ndarray]: моменты переходов (UTC) и смещения;
+        offsets[i] действует до transitions[i], offsets[-1] — после последнего.
+    """
+    samples = list(
+        range(
+            int(start_ts), int(end_ts) + TRANSITION_SAMPLE_STEP, TRANSITION_SAMPLE_STEP
+        )
+    )
+    sampled = [_utc_offset(zone, ts) for ts in samples]
+    transitions, offsets = [], [sampled[0]]
+    for i in range(1, len(samples)):
+        if sampled[i] == sampled[i - 1]:
+            continue
+        low, high = samples[i - 1], samples[i]
+        while high - low > 1:
+            middle = (low + high) // 2
+            if _utc_offset(zone, middle) == sampled[i - 1]:
+                low = middle
+            else:
+                high = middle
+        transitions.append(high)
+        offsets.append(sampled[i])
+    return np.array(transitions, dtype=np.int64), np.array(offsets, dtype=np.int64)
+
+
+def bulk_next_fire(anchor_ts, days, time_of_day, zone_names):
+    """
+    Векторизованно вычисляет время следующего напоминания для многих привычек.
+
+    Для каждого часового пояса один раз строится таблица переходов, а дальше
+    перевод времени между UTC и местным выполняется поиском по ней
+    (numpy.searchsorted) без создания datetime на каждую привычку.
+    Несуществующее и неоднозначное местное время разрешаются так же,
+    как в next_fire (fold=0 в zoneinfo).
+
+    Args:
+        anchor_ts (Sequence[int]): время последней отправки, unix timestamp.
+        days (Sequence[int]): интервалы повторения в днях.
+        time_of_day (Sequence[int]): время выполнения привычки, секунды от полуночи.
+        zone_names (Sequence[str]): часовые пояса пользователей.
+
+    Returns:
+        numpy.ndarray: время следующих напоминаний, unix timestamp (int64).
+    """
+    anchor_ts = np.asarray(anchor_ts, dtype=np.int64)
+    days = np.asarray(days, dtype=np.int64)
+    time_of_day = np.asarray(time_of_day, dtype=np.int64)
+    result = np.empty(len(anchor_ts), dtype=np.int64)
+    if not len(anchor_ts):
+        return result
+
+    names, codes = np.unique(np.asarray(zone_names, dtype=str), return_inverse=True)
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(names) + 1))
+    for code, name in enumerate(names):
+        idx = order[bounds[code] : bounds[code + 1]]
+        anchor, interval = anchor_ts[idx], days[idx]
+        transitions, offsets = zone_transitions(
+            get_zone(name),
+            anchor.min() - SECONDS_PER_DAY,
+            anchor.max() + (interval.max() + 2) * SECONDS_PER_DAY,
+        )
+        # UTC -> местный день последней отправки
+        local_anchor = (
+            anchor + offsets[np.searchsorted(transitions, anchor, side="right")]
+        )
+        local_fire = (
+            local_anchor // SECONDS_PER_DAY + interval
+        ) * SECONDS_PER_DAY + time_of_day[idx]
+        # Местное время -> UTC: границы переходов по местным часам с большим
+        # из смещений, как у zoneinfo для fold=0
+        wall = transitions + np.maximum(offsets[:-1], offsets[1:])
+        result[idx] = (
+            local_fire - offsets[np.searchsorted(wall, local_fire, side="right")]
+        )
+    return result
+
+
+class Epoch(Func):
+    """Unix timestamp (целые секунды) значения DateTimeField, вычисляемый в БД."""
+
+    template = "CAST(FLOOR(EXTRACT(EPOCH FROM %(expressions)s)) AS BIGINT)"
+    output_field = BigIntegerField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler,
+            connection,
+            template="CAST(strftime('%%%%s', %(expressions)s) AS INTEGER)",
+            **extra_context,
+        )
+
+
+def seconds_of_day(field):
+    """
+    Выражение «секунды от полуночи» для TimeField.
+
+    Args:
+        field (str): имя поля.
+
+    Returns:
+        Expression: выражение для annotate().
+    """
+    return ExpressionWrapper(
+        ExtractHour(field) * 3600 + ExtractMinute(field) * 60 + ExtractSecond(field),
+        output_field=BigIntegerField(),
+    )
+
+
+def bulk_set_next_remind_at(model, ids, next_ts, **fields):
+    """
+    Записывает пересчитанные next_remind_at одним запросом на пачку.
+
+    На PostgreSQL используется UPDATE ... FROM unnest(массивы), на остальных
+    базах — bulk_update. Вместе с next_remind_at обновляется updated_at,
+    чтобы изменение увидел посекундный планировщик.
+
+    Args:
+        model (type[Habit]): модель привычки.
+        ids (Sequence[int]): идентификаторы привычек.
+        next_ts (Sequence[int | None]): новые next_remind_at, unix timestamp.
+        **fields: общие для всех привычек значения других полей.
+
+    Returns:
+        int: количество обновлённых привычек.
+    """
+    if not len(ids):
+        return 0
+    fields["updated_at"] = timezone.now()
+    if connection.vendor == "postgresql":
+        assignments = ", ".join(
+            f"{connection.ops.quote_name(name)} = %s" for name in fields
+        )
+        sql = (
+            f"UPDATE {connection.ops.quote_name(model._meta.db_table)} AS h "
+            f"SET next_remind_at = to_timestamp(v.ts), {assignments} "
+            "FROM unnest(%s::bigint[], %s::bigint[]) AS v(id, ts) WHERE h.id = v.id"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [*fields.values(), list(ids), list(next_ts)])
+            return cursor.rowcount
+    objs = [
+        model(
+            id=habit_id,
+            next_remind_at=(
+                None if ts is None else datetime.fromtimestamp(ts, dt_timezone.utc)
+            ),
+            **fields,
+        )
+        for habit_id, ts in zip(ids, next_ts)
+    ]
+    return model.objects.bulk_update(objs, ["next_remind_at", *fields], batch_size=1000)
+
+
+def _compute(rows):
+    """
+    Считает next_remind_at для строк (id, anchor_ts, repeat, periodicity, time_s, time_zone).
+
+    Returns:
+        tuple[list[int], list[int | None]]: идентификаторы и новые значения.
+    """
+    ids = [row[0] for row in rows]
+    next_ts = [None] * len(rows)
+    repeating = [i for i, row in enumerate(rows) if interval_days(row[2], row[3])]
+    if repeating:
+        fired = bulk_next_fire(
+            [rows[i][1] for i in repeating],
+            [interval_days(rows[i][2], rows[i][3]) for i in repeating],
+            [rows[i][4] for i in repeating],
+            [rows[i][5] or "UTC" for i in repeating],
+        )
+        for i, ts in zip(repeating, fired.tolist()):
+            next_ts[i] = ts
+    return ids, next_ts
+
+
+def mark_reminded(queryset, reminded_at):
+    """
+    Фиксирует отправку напоминаний и планирует следующие (см. HabitQuerySet.mark_reminded).
+
+    Returns:
+        int: количество обновлённых привычек.
+    """
+    anchor_ts = int(reminded_at.timestamp())
+    rows = [
+        (habit_id, anchor_ts, repeat, periodicity, time_s, zone_name)
+        for habit_id, repeat, periodicity, time_s, zone_name in queryset.annotate(
+            time_s=seconds_of_day("time")
+        ).values_list("id", "repeat", "periodicity", "time_s", "user__time_zone")
+    ]
+    ids, next_ts = _compute(rows)
+    return bulk_set_next_remind_at(
+        queryset.model, ids, next_ts, last_reminded_at=reminded_at
+    )
+
+
+def recompute_next_remind_at(queryset, chunk_size=RECOMPUTE_CHUNK_SIZE):
+    """
+    Массово пересчитывает next_remind_at повторяющихся привычек выборки.
+
+    Затрагиваются только привычки, по которым напоминание уже отправлялось:
+    до первой отправки next_remind_at равно remind_at и от пояса не зависит.
+
+    Args:
+        queryset (QuerySet[Habit]): привычки для пересчёта.
+        chunk_size (int): сколько привычек обрабатывать за один раз.
+
+    Returns:
+        int: количество обновлённых привычек.
+    """
+    rows = (
+        queryset.filter(remind_at__isnull=False, last_reminded_at__isnull=False)
+        .exclude(repeat="none")
+        .annotate(anchor_ts=Epoch(F("last_reminded_at")), time_s=seconds_of_day("time"))
+        .order_by("id")
+        .values_list(
+            "id", "anchor_ts", "repeat", "periodicity", "time_s", "user__time_zone"
+        )
+    )
+    updated = 0
+    chunk = []
+    for row in rows.iterator(chunk_size=min(chunk_size, 10000)):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            updated += bulk_set_next_remind_at(queryset.model, *_compute(chunk))
+            chunk = []
+    if chunk:
+        updated += bulk_set_next_remind_at(queryset.model, *_compute(chunk))
+    return updated
@@ -0,0 +1,248 @@
+import heapq
+import logging
+import time
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+from django.db.models import Q
+
+from habits.models import Habit
+
+logger = logging.getLogger(__name__)
+
+
+class TimerQueue:
+    """
+    Очередь таймеров на двоичной куче с ленивым удалением.
+
+    Для каждой привычки хранится только последнее запланированное время:
+    перепланирование и отмена не трогают кучу, а устаревшие записи
+    отбрасываются при извлечении.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._deadlines = {}
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    def __contains__(self, key):
+        return key in self._deadlines
+
+    def schedule(self, key, deadline):
+        """
+        Планирует (или перепланирует) срабатывание таймера.
+
+        Args:
+            key (int): идентификатор таймера (id привычки).
+            deadline (float): время срабатывания, unix timestamp.
+        """
+        if self._deadlines.get(key) == deadline:
+            return
+        self._deadlines[key] = deadline
+        heapq.heappush(self._heap, (deadline, key))
+
+    def cancel(self, key):
+        """
+        Отменяет таймер, если он был запланирован.
+
+        Args:
+            key (int): идентификатор таймера.
+        """
+        self._deadlines.pop(key, None)
+
+    def next_deadline(self):
+        """
+        Возвращает ближайшее время срабатывания.
+
+        Returns:
+            float | None: unix timestamp ближайшего таймера или None, если очередь пуста.
+        """
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now_ts):
+        """
+        Извлекает все таймеры, время которых наступило.
+
+        Args:
+            now_ts (float): текущее время, unix timestamp.
+
+        Returns:
+            list[tuple[int, float]]: пары (ключ, время срабатывания).
+        """
+        due = []
+        while True:
+            self._drop_stale()
+            if not self._heap or self._heap[0][0] > now_ts:
+                return due
+            deadline, key = heapq.heappop(self._heap)
+            del self._deadlines[key]
+            due.append((key, deadline))
+
+    def _drop_stale(self):
+        """Удаляет с вершины кучи отменённые и перепланированные записи."""
+        while self._heap:
+            deadline, key = self._heap[0]
+            if self._deadlines.get(key) == deadline:
+                return
+            heapq.heappop(self._heap)
+
+
+class ReminderScheduler:
+    """
+    Планировщик напоминаний с точностью до секунды — альтернатива задаче
+    check_and_send_reminders, запускаемой celery beat раз в минуту.
+
+    Держит в памяти напоминания на horizon вперёд, раз в refill_interval
+    подгружает изменённые привычки (по updated_at) и сдвигает окно загрузки,
+    а в момент срабатывания захватывает наступившие привычки через
+    claim_due_batch (как и check_and_send_reminders) и ставит их в очередь.
+
+    Просроченные, но не захваченные привычки (строка заблокирована другим
+    отправителем, ошибка брокера или базы) подхватываются следующей подгрузкой,
+    а ошибки итерации не останавливают цикл: он повторяется с нарастающей паузой.
+    """
+
+    def __init__(
+        self,
+        horizon=timedelta(minutes=10),
+        refill_interval=timedelta(seconds=5),
+        max_backoff=timedelta(minutes=1),
+        clock=time.time,
+        sleep=time.sleep,
+    ):
+        self.horizon = horizon
+        self.refill_interval = refill_interval
+        self.max_backoff = max_backoff
+        self.clock = clock
+        self.sleep = sleep
+        self.timers = TimerQueue()
+        self.loaded_until = None
+        self.changed_since = None
+        self.next_refill_ts = 0.0
+
+    def _now(self):
+        return datetime.fromtimestamp(self.clock(), tz=dt_timezone.utc)
+
+    def _schedule(self, habit_id, next_remind_at):
+        if next_remind_at is None or next_remind_at > self.loaded_until:
+            self.timers.cancel(habit_id)
+        else:
+            self.timers.schedule(habit_id, next_remind_at.timestamp())
+
+    def load(self):
+        """
+        Полностью загружает напоминания в пределах горизонта (включая просроченные).
+
+        Returns:
+            int: количество загруженных напоминаний.
+        """
+        now_dt = self._now()
+        loaded_until = now_dt + self.horizon
+        rows = list(
+            Habit.objects.filter(next_remind_at__lte=loaded_until)
+            .values_list("id", "next_remind_at")
+            .iterator(chunk_size=2000)
+        )
+        self.timers = TimerQueue()
+        self.loaded_until = loaded_until
+        self.changed_since = now_dt
+        for habit_id, next_remind_at in rows:
+            self._schedule(habit_id, next_remind_at)
+        self.next_refill_ts = now_dt.timestamp() + self.refill_interval.total_seconds()
+        return len(self.timers)
+
+    def refill(self):
+        """
+        Инкрементально обновляет очередь.
+
+        - Привычки, изменённые с прошлой подгрузки, перепланируются или отменяются.
+        - Окно загрузки сдвигается до now + horizon, новые напоминания добавляются.
+        - Просроченные напоминания, которые так и не удалось захватить, планируются снова.
+
+        Состояние меняется только после успешного чтения обеих выборок, поэтому
+        после ошибки базы подгрузку можно просто повторить.
+        """
+        now_dt = self._now()
+        loaded_until = now_dt + self.horizon
+        # Небольшой запас перекрывает расхождение часов и незакоммиченные транзакции
+        changed = list(
+            Habit.objects.filter(
+                updated_at__gte=self.changed_since - self.refill_interval
+            )
+            .values_list("id", "next_remind_at")
+            .iterator(chunk_size=2000)
+        )
+        upcoming = list(
+            Habit.objects.filter(
+                Q(next_remind_at__gt=self.loaded_until) | Q(next_remind_at__lte=now_dt),
+                next_remind_at__lte=loaded_until,
+            )
+            .values_list("id", "next_remind_at")
+            .iterator(chunk_size=2000)
+        )
+
+        self.changed_since = now_dt
+        self.loaded_until = loaded_until
+        for habit_id, next_remind_at in changed + upcoming:
+            self._schedule(habit_id, next_remind_at)
+        self.next_refill_ts = now_dt.timestamp() + self.refill_interval.total_seconds()
+
+    def fire_due(self):
+        """
+        Отправляет напоминания, время которых наступило.
+
+        Отправка фиксируется только для привычек, чьё next_remind_at в базе
+        действительно наступило: удалённые и перенесённые привычки пропускаются.
+
+        Returns:
+            list[int]: идентификаторы привычек, поставленных в очередь.
+        """
+        from habits.tasks import claim_due_batch
+
+        now_dt = self._now()
+        due = [habit_id for habit_id, _ in self.timers.pop_due(now_dt.timestamp())]
+        if not due:
+            return []
+        return claim_due_batch(
+            Q(id__in=due, next_remind_at__lte=now_dt), now_dt, len(due)
+        )
+
+    def run_once(self):
+        """
+        Выполняет одну итерацию: подгрузку (если пора) и отправку наступивших напоминаний.
+
+        Returns:
+            float: сколько секунд можно спать до следующего события.
+        """
+        if self.loaded_until is None:
+            self.load()
+        elif self.clock() >= self.next_refill_ts:
+            self.refill()
+        self.fire_due()
+        wake_at = self.next_refill_ts
+        next_deadline = self.timers.next_deadline()
+        if next_deadline is not None:
+            wake_at = min(wake_at, next_deadline)
+        return max(0.0, wake_at - self.clock())
+
+    def run_forever(self):
+        """
+        Бесконечный цикл планировщика.
+
+        Ошибка итерации (недоступны база или брокер) логируется, после чего
+        итерация повторяется через 1, 2, 4... секунды, но не реже max_backoff.
+        """
+        backoff = 1.0
+        while True:
+            try:
+                delay = self.run_once()
+            except Exception:
+                logger.exception("Reminder scheduler iteration failed")
+                delay = backoff
+                backoff = min(backoff * 2, self.max_backoff.total_seconds())
+            else:
+                backoff = 1.0
+            self.sleep(delay)
@@ -1,4 +1,8 @@
+from functools import cached_property
+
+from django.core.exceptions import ImproperlyConfigured
 from rest_framework import serializers
+from rest_framework.settings import ISO_8601, api_settings
 
 from .models import Habit
 
@@ -75,3 +79,168 @@ class HabitSerializer(serializers.ModelSerializer):
                 "Периодичность должна быть от 1 до 7 дней."
             )
         return data
+
+
+class PrefetchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField, который берёт объекты из заранее загруженного
+    словаря context[prefetched_key] вместо запроса к базе на каждое значение.
+    """
+
+    def __init__(self, prefetched_key, **kwargs):
+        self.prefetched_key = prefetched_key
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        prefetched = self.context.get(self.prefetched_key)
+        if prefetched is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            return prefetched[int(data)]
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        except KeyError:
+            self.fail("does_not_exist", pk_value=data)
+
+
+class HabitBatchSerializer(HabitSerializer):
+    """
+    Сериализатор привычки для пакетных операций (HabitViewSet.batch).
+
+    Правила валидации те же, что у HabitSerializer, но связанные приятные
+    привычки всей пачки загружаются одним запросом (context["related_habits"]).
+    """
+
+    related_habit = PrefetchedPrimaryKeyRelatedField(
+        prefetched_key="related_habits",
+        queryset=Habit.objects.filter(is_pleasant=True),
+        required=False,
+        allow_null=True,
+    )
+
+
+class CheckInSerializer(serializers.Serializer):
+    """
+    Отметка выполнения привычки (HabitViewSet.check_in).
+
+    day — день выполнения по часовому поясу владельца, по умолчанию сегодня.
+    """
+
+    day = serializers.DateField(required=False)
+
+
+class RowEncoder:
+    """
+    Быстрое представление объектов для списков без механизма полей DRF.
+
+    По полям сериализатора один раз составляется список столбцов (ключ,
+    поле values(), преобразование), по которому строка
+    QuerySet.values(*encoder.lookups) превращается в словарь, совпадающий
+    с serializer.data (те же ключи в том же порядке и те же значения).
+    Поля, для которых совпадение не гарантировано, вызывают ImproperlyConfigured.
+
+    Args:
+        serializer_class (type[ModelSerializer]): сериализатор-образец.
+    """
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+
+    @property
+    def lookups(self):
+        """list[str]: поля для QuerySet.values()."""
+        return [lookup for _, lookup, _ in self._columns]
+
+    @property
+    def fields(self):
+        """list[str]: ключи представления в порядке полей сериализатора."""
+        return [name for name, _, _ in self._columns]
+
+    def encode(self, row):
+        """
+        Представление одной строки.
+
+        Args:
+            row (dict): строка QuerySet.values(*lookups).
+
+        Returns:
+            dict: данные, как в serializer.data.
+        """
+        return {
+            name: (
+                row[lookup]
+                if convert is None or row[lookup] is None
+                else convert(row[lookup])
+            )
+            for name, lookup, convert in self._columns
+        }
+
+    def encode_many(self, rows):
+        """
+        Представление списка строк.
+
+        Args:
+            rows (Iterable[dict]): строки QuerySet.values(*lookups).
+
+        Returns:
+            list[dict]: данные, как в serializer(many=True).data.
+        """
+        encode = self.encode
+        return [encode(row) for row in rows]
+
+    @cached_property
+    def _columns(self):
+        if (
+            self.serializer_class.to_representation
+            is not serializers.ModelSerializer.to_representation
+        ):
+            raise ImproperlyConfigured(
+                f"{self.serializer_class.__name__} переопределяет to_representation"
+            )
+        return [
+            (name, "__".join(field.source_attrs), self._converter(name, field))
+            for name, field in self.serializer_class().fields.items()
+            if not field.write_only
+        ]
+
+    @staticmethod
+    def _converter(name, field):
+        """
+        Функция преобразования значения из базы в представление поля.
+
+        Returns:
+            Callable | None: преобразование или None, если значение из базы
+            совпадает с представлением.
+        """
+        field_type = type(field)
+        if field_type is serializers.TimeField:
+            time_format = getattr(field, "format", api_settings.TIME_FORMAT)
+            if time_format is not None and time_format.lower() == ISO_8601:
+                return _isoformat
+        elif field_type is serializers.PrimaryKeyRelatedField:
+            if field.pk_field is None:
+                return None
+        elif field_type in IDENTITY_FIELDS:
+            return None
+        raise ImproperlyConfigured(
+            f"Поле {name} ({field_type.__name__}) не поддерживается RowEncoder"
+        )
+
+
+# Поля, представление которых совпадает со значением из базы
+IDENTITY_FIELDS = (
+    serializers.ReadOnlyField,
+    serializers.IntegerField,
+    serializers.CharField,
+    serializers.BooleanField,
+)
+
+
+def _isoformat(value):
+    return value if isinstance(value, str) else value.isoformat()
+
+
+# Представление привычек для list и public (быстрый путь HabitSerializer)
+habit_row_encoder = RowEncoder(HabitSerializer)
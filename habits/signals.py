@@ -0,0 +1,105 @@
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from habits.cache import (
+    DELETED_VERSION,
+    invalidate_public_feed,
+    remember_habit_version,
+    touch_user_habits,
+)
+from habits.models import Habit
+from habits.serializers import HabitSerializer
+
+# Поля привычки, которые видны в API (списки, карточки и публичная лента)
+SERIALIZED_FIELDS = frozenset(HabitSerializer.Meta.fields) - {"user", "owner_email"}
+
+
+@receiver(post_save, sender=Habit)
+def habit_saved(sender, instance, update_fields=None, **kwargs):
+    """
+    Публикует новую версию привычки для проверки актуальности напоминаний.
+
+    Если изменились видимые в API поля, обновляет отметку изменения привычек
+    владельца (ETag списков) и сбрасывает кэш публичной ленты, если привычка
+    публичная (в том числе ставшая или переставшая быть публичной).
+    """
+    habit_id, version = instance.pk, instance.version
+    # Версия публикуется после фиксации: при откате в кэше осталась бы версия,
+    # которой нет в базе, и напоминания привычки считались бы устаревшими
+    transaction.on_commit(lambda: remember_habit_version(habit_id, version))
+
+    was_public = getattr(instance, "_loaded_is_public", False)
+    instance._loaded_is_public = instance.is_public
+    if update_fields is not None and not SERIALIZED_FIELDS & set(update_fields):
+        return
+    user_id = instance.user_id
+    transaction.on_commit(lambda: touch_user_habits(user_id))
+    if instance.is_public or was_public:
+        transaction.on_commit(invalidate_public_feed)
+
+
+@receiver(pre_delete, sender=Habit)
+def habit_deleting(sender, instance, **kwargs):
+    """
+    Запоминает владельцев привычек, ссылающихся на удаляемую приятную привычку:
+    у их привычек related_habit будет очищен.
+
+    При удалении выборкой привычек (QuerySet.delete(), пакетное удаление)
+    владельцев одним запросом собирает вызывающий код, а не этот сигнал
+    по запросу на каждую привычку.
+    """
+    origin = kwargs.get("origin")
+    if isinstance(origin, QuerySet) and origin.model is Habit:
+        return
+    if instance.is_pleasant:
+        instance._related_user_ids = set(
+            instance.pleasant_habits.values_list("user_id", flat=True)
+        )
+
+
+@receiver(post_delete, sender=Habit)
+def habit_deleted(sender, instance, **kwargs):
+    """
+    Помечает привычку удалённой, чтобы её напоминания из очереди не отправлялись.
+
+    Обновляет отметку изменения привычек владельца (и владельцев ссылавшихся
+    на неё привычек). Удаление публичной привычки сбрасывает кэш публичной
+    ленты; удаление приятной — тоже, так как на неё могли ссылаться публичные привычки.
+    """
+    habit_id = instance.pk
+    transaction.on_commit(lambda: remember_habit_version(habit_id, DELETED_VERSION))
+    user_ids = {instance.user_id, *getattr(instance, "_related_user_ids", ())}
+    transaction.on_commit(lambda: touch_user_habits(*user_ids))
+    if instance.is_public or instance.is_pleasant:
+        transaction.on_commit(invalidate_public_feed)
+
+
+@receiver(post_save, sender="users.User")
+def user_time_zone_changed(sender, instance, created, **kwargs):
+    """При смене часового пояса пересчитывает время напоминаний пользователя."""
+    loaded = getattr(instance, "_loaded_time_zone", None)
+    if created or loaded is None or loaded == instance.time_zone:
+        return
+    instance._loaded_time_zone = instance.time_zone
+
+    from habits.tasks import recompute_user_reminders
+
+    user_id = instance.pk
+    transaction.on_commit(lambda: recompute_user_reminders.delay(user_id))
+
+
+@receiver(post_save, sender="users.User")
+def user_email_changed(sender, instance, created, **kwargs):
+    """
+    Email владельца виден в привычках (owner_email), поэтому его смена
+    обновляет отметку изменения привычек пользователя и сбрасывает публичную ленту.
+    """
+    loaded = getattr(instance, "_loaded_email", None)
+    if created or loaded is None or loaded == instance.email:
+        return
+    instance._loaded_email = instance.email
+    user_id = instance.pk
+    transaction.on_commit(lambda: touch_user_habits(user_id))
+    transaction.on_commit(invalidate_public_feed)
@@ -0,0 +1,327 @@
+"""
+Статистика выполнения привычек.
+
+Ночная задача rollup_habit_stats сворачивает журнал выполнений в одну строку
+HabitStats на привычку: выполнения и ожидаемые по периодичности выполнения
+за окна STATS_WINDOWS и выполнения за последний год по дням недели. Журнал
+пачки привычек загружается массивами NumPy, окна и дни недели считаются
+векторно (numpy.bincount) без цикла по строкам.
+
+Эндпоинты статистики читают только сводки — по строке на привычку — и
+агрегируют их тоже на NumPy: доля выполнения за окно, лучший день недели
+и тепловая карта «день недели × час» (час — Habit.time выполненной привычки).
+Сводка, которой ещё нет (новая привычка), считается при первом чтении.
+
+Ожидаемые выполнения отсчитываются от начала отслеживания привычки —
+первого выполнения или первого напоминания (remind_at), что раньше;
+у привычки без того и другого ожидаемых выполнений нет.
+"""
+
+from datetime import date, timedelta
+
+import numpy as np
+from django.db.models import Min
+from django.utils import timezone
+
+from habits import recurrence
+from habits.models import Habit, HabitCompletion, HabitStats
+from habits.streaks import streak_interval
+
+# Окна статистики в днях (включая сегодняшний день)
+STATS_WINDOWS = (7, 30, 365)
+
+# Сколько привычек сворачивается за один раз
+STATS_CHUNK_SIZE = 5000
+
+STATS_FIELDS = ["computed_on", "completed", "expected", "weekdays"]
+
+
+def _local_today(zone_names, now):
+    # Один расчёт даты на часовой пояс, а не на привычку
+    days = {
+        name: now.astimezone(recurrence.get_zone(name)).date().toordinal()
+        for name in set(zone_names)
+    }
+    return np.array([days[name] for name in zone_names], dtype=np.int64)
+
+
+def compute_stats(rows, completions, now=None):
+    """
+    Векторно считает сводки для пачки привычек.
+
+    Args:
+        rows (list[tuple]): привычки — (id, repeat, periodicity, remind_at,
+            time_zone, first_day), по возрастанию id.
+        completions (list[tuple[int, date]]): выполнения привычек пачки (habit_id, day)
+            не раньше чем за max(STATS_WINDOWS) дней до сегодняшнего.
+        now (datetime | None): момент расчёта.
+
+    Returns:
+        list[HabitStats]: сводки в порядке rows.
+    """
+    now = now or timezone.now()
+    if not rows:
+        return []
+    ids = np.array([row[0] for row in rows], dtype=np.int64)
+    zone_names = [row[4] or "UTC" for row in rows]
+    today = _local_today(zone_names, now)
+    interval = np.array(
+        [streak_interval(row[1], row[2]) for row in rows], dtype=np.int64
+    )
+    starts = []
+    for (_, _, _, remind_at, _, first_day), zone_name in zip(rows, zone_names):
+        candidates = [first_day] if first_day else []
+        if remind_at:
+            candidates.append(
+                remind_at.astimezone(recurrence.get_zone(zone_name)).date()
+            )
+        starts.append(
+            min(candidates).toordinal() if candidates else np.iinfo(np.int64).max
+        )
+    start = np.array(starts, dtype=np.int64)
+
+    position = np.searchsorted(
+        ids, np.fromiter((c[0] for c in completions), np.int64, len(completions))
+    )
+    day = np.fromiter(
+        (c[1].toordinal() for c in completions), np.int64, len(completions)
+    )
+    age = today[position] - day
+
+    completed, expected = [], []
+    for window in STATS_WINDOWS:
+        in_window = (age >= 0) & (age < window)
+        completed.append(np.bincount(position[in_window], minlength=len(ids)))
+        tracked = today - np.maximum(today - window + 1, start) + 1
+        expected.append(-(-np.clip(tracked, 0, None) // interval))
+    completed = np.stack(completed, axis=1)
+    expected = np.stack(expected, axis=1)
+
+    last_year = (age >= 0) & (age < max(STATS_WINDOWS))
+    # date.toordinal() == 1 у понедельника 1 января 1 года
+    weekday = (day[last_year] - 1) % 7
+    weekdays = np.bincount(
+        position[last_year] * 7 + weekday, minlength=len(ids) * 7
+    ).reshape(len(ids), 7)
+
+    return [
+        HabitStats(
+            habit_id=habit_id,
+            computed_on=computed_on,
+            completed=done,
+            expected=due,
+            weekdays=by_weekday,
+        )
+        for habit_id, computed_on, done, due, by_weekday in zip(
+            ids.tolist(),
+            map(date.fromordinal, today.tolist()),
+            completed.tolist(),
+            expected.tolist(),
+            weekdays.tolist(),
+        )
+    ]
+
+
+def rollup_habits(habit_ids, now=None):
+    """
+    Пересчитывает и сохраняет сводки привычек одной пачкой (три запроса).
+
+    Args:
+        habit_ids (list[int]): привычки пачки.
+        now (datetime | None): момент расчёта.
+
+    Returns:
+        list[HabitStats]: сохранённые сводки.
+    """
+    now = now or timezone.now()
+    rows = list(
+        Habit.objects.filter(id__in=habit_ids)
+        .annotate(first_day=Min("completions__day"))
+        .order_by("id")
+        .values_list(
+            "id", "repeat", "periodicity", "remind_at", "user__time_zone", "first_day"
+        )
+    )
+    # С запасом в день на разницу часовых поясов; лишнее отсекается по возрасту
+    since = now.date() - timedelta(days=max(STATS_WINDOWS) + 1)
+    completions = list(
+        HabitCompletion.objects.filter(
+            habit_id__in=habit_ids, day__gte=since
+        ).values_list("habit_id", "day")
+    )
+    stats = compute_stats(rows, completions, now)
+    HabitStats.objects.bulk_create(
+        stats,
+        update_conflicts=True,
+        unique_fields=["habit"],
+        update_fields=STATS_FIELDS,
+    )
+    return stats
+
+
+def rollup_stats(queryset, chunk_size=STATS_CHUNK_SIZE, now=None):
+    """
+    Пересчитывает сводки всех привычек выборки пачками по chunk_size.
+
+    Args:
+        queryset (QuerySet[Habit]): привычки для пересчёта.
+        chunk_size (int): сколько привычек обрабатывать за один раз.
+        now (datetime | None): момент расчёта (общий для всех пачек).
+
+    Returns:
+        int: количество пересчитанных сводок.
+    """
+    now = now or timezone.now()
+    habit_ids = queryset.order_by("id").values_list("id", flat=True)
+    updated, last_id = 0, 0
+    while chunk := list(habit_ids.filter(id__gt=last_id)[:chunk_size]):
+        updated += len(rollup_habits(chunk, now))
+        last_id = chunk[-1]
+    return updated
+
+
+def summarize(completed, expected, counted, weekdays):
+    """
+    Доли выполнения и лучшие дни недели для строк сводок, векторно.
+
+    Args:
+        completed (numpy.ndarray): выполнения, форма (строки, окна).
+        expected (numpy.ndarray): ожидаемые выполнения той же формы.
+        counted (numpy.ndarray): выполнения в пределах ожидаемых той же формы.
+        weekdays (numpy.ndarray): выполнения по дням недели, форма (строки, 7).
+
+    Returns:
+        list[dict]: по строке — windows (по окну completed, expected и rate)
+        и best_weekday.
+    """
+    rate = np.round(counted / np.maximum(expected, 1), 4)
+    best = np.where(weekdays.any(axis=1), weekdays.argmax(axis=1), -1)
+    summaries = []
+    for done, due, share, weekday in zip(
+        completed.tolist(), expected.tolist(), rate.tolist(), best.tolist()
+    ):
+        windows = {
+            str(window): {
+                "completed": done[k],
+                "expected": due[k],
+                "rate": share[k] if due[k] else None,
+            }
+            for k, window in enumerate(STATS_WINDOWS)
+        }
+        summaries.append(
+            {"windows": windows, "best_weekday": weekday if weekday >= 0 else None}
+        )
+    return summaries
+
+
+def summarize_total(completed, expected, weekdays):
+    """
+    Общая статистика нескольких привычек (см. summarize).
+
+    Лишние выполнения одной привычки (чаще периодичности) не перекрывают
+    пропуски другой.
+
+    Returns:
+        dict: windows и best_weekday.
+    """
+    return summarize(
+        completed.sum(axis=0, keepdims=True),
+        expected.sum(axis=0, keepdims=True),
+        np.minimum(completed, expected).sum(axis=0, keepdims=True),
+        weekdays.sum(axis=0, keepdims=True),
+    )[0]
+
+
+def heatmap(weekdays, hours):
+    """
+    Тепловая карта выполнений «день недели × час».
+
+    Args:
+        weekdays (numpy.ndarray): выполнения по дням недели, форма (привычки, 7).
+        hours (numpy.ndarray): час Habit.time каждой привычки.
+
+    Returns:
+        list[list[int]]: 7 строк (понедельник — 0) по 24 часа.
+    """
+    grid = np.zeros((24, 7), dtype=np.int64)
+    np.add.at(grid, hours, weekdays)
+    return grid.T.tolist()
+
+
+def _load(queryset):
+    rows = list(
+        queryset.order_by("id").values_list(
+            "id",
+            "action",
+            "time",
+            "stats__computed_on",
+            "stats__completed",
+            "stats__expected",
+            "stats__weekdays",
+        )
+    )
+    missing = [row[0] for row in rows if row[3] is None]
+    if missing:
+        computed = {stats.habit_id: stats for stats in rollup_habits(missing)}
+        rows = [
+            (
+                row[:3]
+                + tuple(getattr(computed[row[0]], field) for field in STATS_FIELDS)
+                if row[0] in computed
+                else row
+            )
+            for row in rows
+        ]
+    shape = (len(rows), len(STATS_WINDOWS))
+    completed = np.array([row[4] for row in rows], dtype=np.int64).reshape(shape)
+    expected = np.array([row[5] for row in rows], dtype=np.int64).reshape(shape)
+    weekdays = np.array([row[6] for row in rows], dtype=np.int64).reshape(len(rows), 7)
+    hours = np.array([row[2].hour for row in rows], dtype=np.int64)
+    return rows, completed, expected, weekdays, hours
+
+
+def user_stats(queryset):
+    """
+    Статистика привычек пользователя: общая и по каждой привычке.
+
+    Args:
+        queryset (QuerySet[Habit]): привычки пользователя.
+
+    Returns:
+        dict: computed_on, windows, best_weekday, heatmap и habits.
+    """
+    rows, completed, expected, weekdays, hours = _load(queryset)
+    summaries = summarize(
+        completed, expected, np.minimum(completed, expected), weekdays
+    )
+    return {
+        "computed_on": max((row[3] for row in rows), default=None),
+        **summarize_total(completed, expected, weekdays),
+        "heatmap": heatmap(weekdays, hours),
+        "habits": [
+            {"habit": row[0], "action": row[1], "computed_on": row[3], **summary}
+            for row, summary in zip(rows, summaries)
+        ],
+    }
+
+
+def habit_detail_stats(queryset):
+    """
+    Статистика одной привычки.
+
+    Args:
+        queryset (QuerySet[Habit]): выборка из одной привычки.
+
+    Returns:
+        dict | None: habit, computed_on, windows, best_weekday и heatmap;
+        None, если привычки нет.
+    """
+    rows, completed, expected, weekdays, hours = _load(queryset)
+    if not rows:
+        return None
+    return {
+        "habit": rows[0][0],
+        "computed_on": rows[0][3],
+        **summarize_total(completed, expected, weekdays),
+        "heatmap": heatmap(weekdays, hours),
+    }
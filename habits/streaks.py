@@ -0,0 +1,218 @@
+"""
+Серии выполнения привычек.
+
+Выполнения хранятся в журнале HabitCompletion (строка на привычку и день),
+а текущая и самая длинная серии — в счётчиках привычки: отметка выполнения
+обновляет их за O(1), не перечитывая журнал. Выполнения продолжают серию,
+если между ними не больше интервала повторения привычки (periodicity дней
+или неделя для repeat="weekly"). Серия прерывается, если с последнего
+выполнения прошло больше интервала; это проверяется при чтении.
+
+Отметка задним числом (раньше последнего выполнения) пересчитывает счётчики
+привычки по журналу, а rebuild_streaks пересчитывает их массово.
+"""
+
+from django.db import transaction
+from django.utils import timezone
+
+from habits import recurrence
+from habits.models import Habit, HabitCompletion
+
+REBUILD_CHUNK_SIZE = 1000
+
+
+def streak_interval(repeat, periodicity):
+    """
+    Максимальный разрыв между выполнениями внутри серии, в днях.
+
+    Args:
+        repeat (str): режим повторения привычки.
+        periodicity (int): периодичность в днях.
+
+    Returns:
+        int: интервал в днях.
+    """
+    return recurrence.interval_days(repeat, periodicity) or periodicity
+
+
+def local_today(user):
+    """Сегодняшний день по часовому поясу пользователя."""
+    return timezone.now().astimezone(recurrence.get_zone(user.time_zone)).date()
+
+
+class Streak:
+    """
+    Счётчики серии выполнений привычки.
+
+    current (int): длина серии, которая заканчивается последним выполнением.
+    longest (int): самая длинная серия.
+    last_day (date | None): день последнего выполнения.
+    """
+
+    def __init__(self, current=0, longest=0, last_day=None):
+        self.current = current
+        self.longest = longest
+        self.last_day = last_day
+
+    @classmethod
+    def of(cls, habit):
+        return cls(habit.current_streak, habit.longest_streak, habit.last_completed_on)
+
+    def add(self, day, interval):
+        """
+        Учитывает выполнение в день day, не раньше последнего.
+
+        Args:
+            day (date): день выполнения.
+            interval (int): интервал повторения привычки в днях.
+        """
+        if self.last_day is not None and (day - self.last_day).days <= interval:
+            self.current += 1
+        else:
+            self.current = 1
+        self.longest = max(self.longest, self.current)
+        self.last_day = day
+
+    def current_on(self, today, interval):
+        """
+        Текущая серия на день today: 0, если серия уже прервалась.
+
+        Args:
+            today (date): день, на который читается серия.
+            interval (int): интервал повторения привычки в днях.
+
+        Returns:
+            int: длина текущей серии.
+        """
+        if self.last_day is None or (today - self.last_day).days > interval:
+            return 0
+        return self.current
+
+    def save_to(self, habit_id):
+        # Через update(), а не Habit.save(): отметка выполнения не должна менять
+        # version (иначе отбрасываются поставленные в очередь напоминания)
+        Habit.objects.filter(pk=habit_id).update(
+            current_streak=self.current,
+            longest_streak=self.longest,
+            last_completed_on=self.last_day,
+        )
+
+
+def streak_data(habit, today=None):
+    """
+    Серия привычки для ответа API (без обращения к журналу выполнений).
+
+    Args:
+        habit (Habit): привычка с загруженным пользователем.
+        today (date | None): день, на который читается серия.
+
+    Returns:
+        dict: habit, current_streak, longest_streak, last_completed_on.
+    """
+    today = today or local_today(habit.user)
+    interval = streak_interval(habit.repeat, habit.periodicity)
+    streak = Streak.of(habit)
+    return {
+        "habit": habit.pk,
+        "current_streak": streak.current_on(today, interval),
+        "longest_streak": streak.longest,
+        "last_completed_on": streak.last_day,
+    }
+
+
+def _rebuild(habit):
+    streak = Streak()
+    interval = streak_interval(habit.repeat, habit.periodicity)
+    for day in habit.completions.order_by("day").values_list("day", flat=True):
+        streak.add(day, interval)
+    return streak
+
+
+def check_in(habit, day):
+    """
+    Отмечает выполнение привычки в день day и обновляет счётчики серии.
+
+    Строка привычки блокируется на время обновления, поэтому параллельные
+    отметки одной привычки не теряют шаги серии. Повторная отметка того же
+    дня ничего не меняет.
+
+    Args:
+        habit (Habit): привычка.
+        day (date): день выполнения по часовому поясу владельца.
+
+    Returns:
+        tuple[Habit, bool]: привычка с обновлёнными счётчиками и признак новой отметки.
+    """
+    with transaction.atomic():
+        habit = (
+            Habit.objects.select_for_update(of=("self",))
+            .select_related("user")
+            .get(pk=habit.pk)
+        )
+        _, created = HabitCompletion.objects.get_or_create(habit=habit, day=day)
+        if not created:
+            return habit, False
+        streak = Streak.of(habit)
+        if streak.last_day is None or day > streak.last_day:
+            streak.add(day, streak_interval(habit.repeat, habit.periodicity))
+        else:
+            # Отметка задним числом может склеить или разбить прошлые серии
+            streak = _rebuild(habit)
+        streak.save_to(habit.pk)
+    habit.current_streak = streak.current
+    habit.longest_streak = streak.longest
+    habit.last_completed_on = streak.last_day
+    return habit, True
+
+
+def rebuild_streaks(queryset, chunk_size=REBUILD_CHUNK_SIZE):
+    """
+    Массово пересчитывает счётчики серий привычек выборки по журналу выполнений.
+
+    Журнал читается одним проходом в порядке (habit, day), счётчики
+    записываются через bulk_update пачками по chunk_size.
+
+    Args:
+        queryset (QuerySet[Habit]): привычки для пересчёта.
+        chunk_size (int): сколько привычек обновлять одним запросом.
+
+    Returns:
+        int: количество привычек с выполнениями.
+    """
+    fields = ["current_streak", "longest_streak", "last_completed_on"]
+    rows = (
+        HabitCompletion.objects.filter(habit__in=queryset)
+        .order_by("habit_id", "day")
+        .values_list("habit_id", "day", "habit__repeat", "habit__periodicity")
+    )
+    updated = 0
+    with transaction.atomic():
+        queryset.exclude(last_completed_on=None).update(
+            current_streak=0, longest_streak=0, last_completed_on=None
+        )
+        habit_id, streak, habits = None, None, []
+        for row_habit_id, day, repeat, periodicity in rows.iterator(chunk_size=10000):
+            if row_habit_id != habit_id:
+                if streak is not None:
+                    habits.append(_as_habit(habit_id, streak))
+                habit_id, streak = row_habit_id, Streak()
+                interval = streak_interval(repeat, periodicity)
+            streak.add(day, interval)
+            if len(habits) >= chunk_size:
+                Habit.objects.bulk_update(habits, fields)
+                updated += len(habits)
+                habits = []
+        if streak is not None:
+            habits.append(_as_habit(habit_id, streak))
+        Habit.objects.bulk_update(habits, fields, batch_size=chunk_size)
+        updated += len(habits)
+    return updated
+
+
+def _as_habit(habit_id, streak):
+    return Habit(
+        pk=habit_id,
+        current_streak=streak.current,
+        longest_streak=streak.longest,
+        last_completed_on=streak.last_day,
+    )
@@ -13,22 +13,57 @@
 #     requests.post(url, data={'chat_id': chat_id, 'text': text})
 
 
-import requests
-from celery import shared_task
+import time
+from datetime import datetime, timedelta
+
+from celery import group
 from django.conf import settings
-from django.utils.timezone import localtime, now, timedelta
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q
+from django.utils.timezone import localtime, now
 
+from config import metrics
+from config.celery import app
+from habits.cache import get_import_status, set_import_status, stale_habit_ids
+from habits.importer import import_habits, import_storage
 from habits.models import Habit
+from habits.stats import rollup_stats
+from habits.telegram import get_sender
+
+# Поля привычки, из которых напоминание собирается без обращений к базе в воркере
+REMINDER_FIELDS = (
+    "id",
+    "version",
+    "action",
+    "user_id",
+    "user__reminder_digest",
+    "user__telegram_profile__chat_id",
+    "next_remind_at",
+)
+
+
+def reminder_text(action):
+    """
+    Формирует текст напоминания по привычке.
 
+    Args:
+        action (str): действие привычки.
 
-@shared_task
+    Returns:
+        str: текст сообщения.
+    """
+    return f"Пора выполнить привычку: {action}!"
+
+
+@app.task
 def send_reminder(habit_id):
     """
     Отправляет напоминание по привычке в Telegram или другой канал.
     :param habit_id: идентификатор привычки для напоминания.
     """
     try:
-        habit = Habit.objects.get(id=habit_id)
+        habit = Habit.objects.select_related("user__telegram_profile").get(id=habit_id)
         if (
             not hasattr(habit.user, "telegram_profile")
             or habit.user.telegram_profile is None
@@ -37,65 +72,288 @@ def send_reminder(habit_id):
             return
 
         chat_id = habit.user.telegram_profile.chat_id
-        text = f"Пора выполнить привычку: {habit.action}!"
-        url = f"{settings.TELEGRAM_BOT_URL}{settings.TELEGRAM_BOT_TOKEN}/sendMessage"
-
-        print("================== DEBUG BLOCK ==================")
-        print(f".venv PATH: {settings.BASE_DIR}")
-        print(f"URL: {url}")
-        print(f"CHAT_ID: {chat_id}")
-        print(f"TEXT: {text}")
-        print("=================================================")
-
-        payload = {"chat_id": chat_id, "text": text}
-        response = requests.post(url, json=payload)
-        print(f"Celery debug response: {response.status_code}, {response.text}")
+        response = get_sender().send_message(chat_id, reminder_text(habit.action))
+        if response is not None:
+            print(f"Celery debug response: {response.status_code}, {response.text}")
     except Exception as e:
         print("Celery error:", e)
 
 
-@shared_task
+def digest_text(actions):
+    """
+    Формирует текст сводного напоминания по нескольким привычкам.
+
+    Args:
+        actions (list[str]): действия привычек.
+
+    Returns:
+        str: текст сообщения.
+    """
+    if len(actions) == 1:
+        return reminder_text(actions[0])
+    lines = "\n".join(f"— {action}" for action in actions)
+    return f"Пора выполнить привычки:\n{lines}"
+
+
+def build_reminder_payload(rows):
+    """
+    Собирает компактное описание сообщений для задачи deliver_reminders.
+
+    Для пользователей с включённой сводкой (reminder_digest) все их привычки
+    объединяются в одно сообщение на chat_id, остальным — по сообщению на привычку.
+    Привычки владельцев без Telegram-профиля пропускаются.
+
+    Args:
+        rows (Iterable[tuple]): строки Habit.objects.values_list(*REMINDER_FIELDS).
+
+    Returns:
+        list[list]: сообщения вида
+            [chat_id, [[habit_id, version, action, due_timestamp], ...]].
+    """
+    messages = []
+    digests = {}
+    for habit_id, version, action, _, digest, chat_id, due_at in rows:
+        if chat_id is None:
+            continue
+        entry = [habit_id, version, action, due_at.timestamp() if due_at else None]
+        if digest:
+            if chat_id not in digests:
+                digests[chat_id] = [chat_id, []]
+                messages.append(digests[chat_id])
+            digests[chat_id][1].append(entry)
+        else:
+            messages.append([chat_id, [entry]])
+    return messages
+
+
+@app.task
+def deliver_reminders(messages):
+    """
+    Отправляет заранее собранные напоминания, не обращаясь к базе данных.
+
+    Напоминания об изменённых или удалённых после постановки в очередь
+    привычках отбрасываются по версиям из кэша; сообщения отправляются
+    параллельно через общий TelegramSender.
+    :param messages: сообщения из build_reminder_payload.
+    """
+    versions = {entry[0]: entry[1] for _, entries in messages for entry in entries}
+    stale = stale_habit_ids(versions)
+    outgoing = []
+    due_times = []
+    for chat_id, entries in messages:
+        fresh = [entry for entry in entries if entry[0] not in stale]
+        if fresh:
+            outgoing.append((chat_id, digest_text([entry[2] for entry in fresh])))
+            due_times.extend(entry[3] for entry in fresh if entry[3] is not None)
+    responses = get_sender().send_many(outgoing)
+
+    sent_at = time.time()
+    for due_at in due_times:
+        metrics.REMINDER_LAG.observe(max(0.0, sent_at - due_at))
+    if stale:
+        metrics.REMINDERS_STALE.inc(len(stale))
+    failed = sum(1 for r in responses if r is None or r.status_code != 200)
+    print(
+        f"Отправлено сообщений: {len(responses) - failed}, с ошибкой: {failed}, "
+        f"устаревших напоминаний: {len(stale)}"
+    )
+
+
+@app.task
+def send_reminders_batch(habit_ids):
+    """
+    Отправляет напоминания по пачке привычек одной задачей Celery.
+
+    Оставлена для задач, поставленных в очередь до перехода на deliver_reminders:
+    привычки загружаются одним запросом и передаются в deliver_reminders.
+    :param habit_ids: список идентификаторов привычек.
+    """
+    rows = (
+        Habit.objects.filter(id__in=habit_ids)
+        .order_by("user_id", "id")
+        .values_list(*REMINDER_FIELDS)
+    )
+    deliver_reminders(build_reminder_payload(rows))
+
+
+def claim_due_batch(due, now_dt, batch_size):
+    """
+    Захватывает пачку наступивших напоминаний и ставит её в очередь.
+
+    Строки блокируются через SELECT ... FOR UPDATE SKIP LOCKED, поэтому
+    параллельные сканеры получают непересекающиеся пачки. Тем же запросом
+    (с join пользователя и Telegram-профиля) читаются данные для сообщений,
+    так что задача deliver_reminders не обращается к базе. В той же транзакции
+    пачка ставится в очередь и помечается отправленной: если брокер недоступен,
+    транзакция откатывается и напоминания останутся наступившими.
+
+    Пачка дополняется оставшимися привычками последнего пользователя,
+    чтобы сводное сообщение не разделилось.
+
+    Args:
+        due (Q): условие наступивших напоминаний.
+        now_dt (datetime): время отправки.
+        batch_size (int): размер пачки.
+
+    Returns:
+        list[int]: идентификаторы захваченных привычек.
+    """
+    claimable = (
+        Habit.objects.select_for_update(skip_locked=True, of=("self",))
+        .filter(due)
+        .exclude(last_reminded_at=now_dt)
+        .order_by("user_id", "id")
+    )
+    with transaction.atomic():
+        rows = list(claimable.values_list(*REMINDER_FIELDS)[:batch_size])
+        if not rows:
+            return []
+        if len(rows) == batch_size:
+            last_id, last_user_id = rows[-1][0], rows[-1][3]
+            rows += claimable.filter(user_id=last_user_id, id__gt=last_id).values_list(
+                *REMINDER_FIELDS
+            )
+        batch = [row[0] for row in rows]
+        messages = build_reminder_payload(rows)
+        if messages:
+            deliver_reminders.delay(messages)
+        Habit.objects.filter(id__in=batch).mark_reminded(now_dt)
+    metrics.REMINDERS_ENQUEUED.inc(len(batch))
+    return batch
+
+
+def due_reminders(now_dt):
+    """
+    Условие выборки наступивших напоминаний.
+
+    Для пользователей со сводкой захватываются и напоминания
+    на REMINDER_DIGEST_WINDOW секунд вперёд.
+
+    Args:
+        now_dt (datetime): текущее время.
+
+    Returns:
+        Q: условие для Habit.objects.filter().
+    """
+    due = Q(next_remind_at__lte=now_dt)
+    if settings.REMINDER_DIGEST_WINDOW:
+        window_end = now_dt + timedelta(seconds=settings.REMINDER_DIGEST_WINDOW)
+        due |= Q(user__reminder_digest=True, next_remind_at__lte=window_end)
+    return due
+
+
+@app.task
+def scan_due_reminders(now_iso):
+    """
+    Захватывает и ставит в очередь наступившие напоминания, пока они не закончатся.
+
+    Безопасна при параллельном запуске на нескольких воркерах: каждая пачка
+    захватывается через SKIP LOCKED и помечается отправленной атомарно.
+    :param now_iso: время тика в формате ISO 8601.
+    """
+    started = time.perf_counter()
+    now_dt = datetime.fromisoformat(now_iso)
+    due = due_reminders(now_dt)
+    sent = 0
+    while batch := claim_due_batch(due, now_dt, settings.REMINDER_BATCH_SIZE):
+        sent += len(batch)
+    metrics.REMINDER_TICK_DURATION.observe(time.perf_counter() - started)
+    metrics.REMINDER_TICK_ROWS.inc(sent)
+    print(f"Поставлено в очередь {sent} напоминаний в {now_dt}")
+    return sent
+
+
+@app.task
+def recompute_user_reminders(user_id):
+    """
+    Пересчитывает время напоминаний всех привычек пользователя
+    (вызывается после смены часового пояса).
+
+    Args:
+        user_id (int): идентификатор пользователя.
+
+    Returns:
+        int: количество обновлённых привычек.
+    """
+    return Habit.objects.filter(user_id=user_id).recompute_next_remind_at()
+
+
+@app.task
+def rollup_habit_stats():
+    """
+    Ночной пересчёт сводок статистики всех привычек (см. habits.stats).
+
+    Returns:
+        int: количество пересчитанных сводок.
+    """
+    updated = rollup_stats(Habit.objects.all())
+    print(f"Пересчитано сводок статистики: {updated}")
+    return updated
+
+
+@app.task
+def import_habits_file(import_id, user_id, name, import_format):
+    """
+    Импортирует привычки из загруженного файла (см. habits.importer).
+
+    После каждой пачки состояние импорта (счётчики обработанных, загруженных
+    и отклонённых строк) обновляется в кэше; по окончании туда же попадает
+    отчёт с отклонёнными строками. Файл удаляется в любом случае.
+
+    Args:
+        import_id (str): идентификатор импорта.
+        user_id (int): владелец импортируемых привычек.
+        name (str): имя файла в import_storage().
+        import_format (str): "ndjson" или "csv".
+
+    Returns:
+        dict: счётчики отчёта.
+    """
+    status = get_import_status(import_id) or {"user_id": user_id}
+
+    def progress(report):
+        set_import_status(
+            import_id,
+            {**status, "state": "running", **report, "rejects": []},
+        )
+
+    storage = import_storage()
+    try:
+        user = get_user_model().objects.get(pk=user_id)
+        with storage.open(name, "rb") as stream:
+            report = import_habits(user, stream, import_format, progress=progress)
+    except Exception:
+        set_import_status(import_id, {**status, "state": "failed"})
+        raise
+    finally:
+        storage.delete(name)
+    set_import_status(import_id, {**status, "state": "done", **report})
+    return {key: report[key] for key in ("processed", "imported", "rejected")}
+
+
+@app.task
 def check_and_send_reminders():
     """
-    Проверяет все привычки пользователей и отправляет напоминания, если наступило время.
+    Отправляет напоминания по привычкам, время которых наступило.
 
     Основная логика:
-    - сравнение времени remind_at с now_dt;
-    - повторные напоминания по repeat;
-    - постановка задачи в очередь через Celery.
-
-    """
-    now_dt = localtime(now())
-    habits = Habit.objects.exclude(remind_at__isnull=True)
-    print(f"Проверка напоминаний для {habits.count()} привычки в {now_dt}")
-
-    for habit in habits:
-        print(f"Проверка привычки id={habit.id}")
-        print(
-            f"remind_at={habit.remind_at}, "
-            f"repeat={habit.repeat}, "
-            f"last_reminded_at={habit.last_reminded_at}, "
-            f"now_dt={now_dt}"
-        )
+    - выборка по индексу next_remind_at <= now_dt (только наступившие напоминания);
+    - захват пачек из REMINDER_BATCH_SIZE привычек через SELECT ... FOR UPDATE SKIP LOCKED
+      (привычки одного пользователя попадают в одну пачку для сводных сообщений);
+    - постановка в очередь одной задачи Celery на пачку;
+    - фиксация last_reminded_at и пересчёт next_remind_at одним UPDATE на пачку
+      (для repeat="none" — очистка);
+    - при REMINDER_SCAN_WORKERS > 1 сканирование раздаётся нескольким воркерам.
 
-    for habit in habits:
-        to_remind = False
-        if not habit.last_reminded_at and habit.remind_at <= now_dt:
-            to_remind = True
-        elif habit.repeat == "daily" and habit.last_reminded_at:
-            next_time = habit.last_reminded_at + timedelta(days=1)
-            if now_dt >= next_time:
-                to_remind = True
-        elif habit.repeat == "weekly" and habit.last_reminded_at:
-            next_time = habit.last_reminded_at + timedelta(weeks=1)
-            if now_dt >= next_time:
-                to_remind = True
-
-        if to_remind:
-            print(f"Поставлено в очередь напоминание о привычке {habit.id}")
-            from habits.tasks import send_reminder
-
-            send_reminder.delay(habit.id)
-            # Обновляем last_reminded_at только если успешно задание отправлено в очередь
-            habit.last_reminded_at = now_dt
-            habit.save()
+    """
+    if settings.REMINDER_SCHEDULER != "beat":
+        # Напоминания отправляет run_reminder_scheduler; запись в расписании
+        # django_celery_beat могла остаться в базе от прежней конфигурации.
+        return
+    now_iso = localtime(now()).isoformat()
+    if settings.REMINDER_SCAN_WORKERS > 1:
+        group(
+            scan_due_reminders.s(now_iso) for _ in range(settings.REMINDER_SCAN_WORKERS)
+        ).apply_async()
+        return
+    scan_due_reminders(now_iso)
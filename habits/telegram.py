@@ -0,0 +1,190 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from config import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Потокобезопасное «ведро токенов» для ограничения частоты запросов.
+
+    rate (float): сколько токенов добавляется в секунду.
+    capacity (float): максимальный запас токенов (допустимый всплеск).
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self.clock = clock
+        self.tokens = self.capacity
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self):
+        """
+        Забирает токен (при необходимости — в долг).
+
+        Returns:
+            float: сколько секунд нужно подождать, прежде чем выполнять запрос.
+        """
+        with self.lock:
+            self._refill()
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+
+class TelegramSender:
+    """
+    Отправитель сообщений в Telegram Bot API.
+
+    - Постоянная keep-alive сессия с пулом соединений (без TLS-рукопожатия на каждое сообщение).
+    - Явные таймауты на подключение и чтение.
+    - Общее ограничение частоты и отдельное ограничение на каждый чат.
+    - Повтор запроса после ответа 429 с учётом retry_after.
+    - Параллельная отправка пачки сообщений из одного воркера.
+    """
+
+    # Сколько ведер отдельных чатов держать в памяти
+    max_chat_buckets = 10000
+
+    def __init__(
+        self,
+        base_url,
+        token,
+        pool_size=20,
+        timeout=(3.05, 10),
+        global_rate=30,
+        per_chat_rate=1,
+        concurrency=10,
+        max_retries=3,
+    ):
+        self.url = f"{base_url}{token}/sendMessage"
+        self.timeout = timeout
+        self.per_chat_rate = per_chat_rate
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.global_bucket = TokenBucket(global_rate)
+        self.chat_buckets = OrderedDict()
+        self.chat_buckets_lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _chat_bucket(self, chat_id):
+        with self.chat_buckets_lock:
+            bucket = self.chat_buckets.get(chat_id)
+            if bucket is None:
+                bucket = TokenBucket(self.per_chat_rate, capacity=1)
+                self.chat_buckets[chat_id] = bucket
+                if len(self.chat_buckets) > self.max_chat_buckets:
+                    self.chat_buckets.popitem(last=False)
+            else:
+                self.chat_buckets.move_to_end(chat_id)
+            return bucket
+
+    def _wait_for_slot(self, chat_id):
+        # Сначала ждём свой чат, чтобы не расходовать общий лимит впустую
+        time.sleep(self._chat_bucket(chat_id).reserve())
+        time.sleep(self.global_bucket.reserve())
+
+    def send_message(self, chat_id, text):
+        """
+        Отправляет одно сообщение с соблюдением ограничений Telegram.
+
+        Args:
+            chat_id (str): идентификатор чата.
+            text (str): текст сообщения.
+
+        Returns:
+            requests.Response | None: последний ответ API или None при сетевой ошибке.
+        """
+        response = None
+        for _ in range(self.max_retries + 1):
+            self._wait_for_slot(chat_id)
+            started = time.perf_counter()
+            try:
+                response = self.session.post(
+                    self.url,
+                    json={"chat_id": chat_id, "text": text},
+                    timeout=self.timeout,
+                )
+            except requests.RequestException as e:
+                metrics.TELEGRAM_REQUESTS.inc(status="error")
+                logger.warning("Telegram request error for chat %s: %s", chat_id, e)
+                return None
+            metrics.TELEGRAM_REQUEST_DURATION.observe(time.perf_counter() - started)
+            metrics.TELEGRAM_REQUESTS.inc(status=response.status_code)
+            if response.status_code != 429:
+                return response
+            time.sleep(self._retry_after(response))
+        return response
+
+    def send_many(self, messages):
+        """
+        Параллельно отправляет пачку сообщений.
+
+        Args:
+            messages (Iterable[tuple[str, str]]): пары (chat_id, text).
+
+        Returns:
+            list[requests.Response | None]: ответы в порядке сообщений.
+        """
+        messages = list(messages)
+        if len(messages) <= 1 or self.concurrency <= 1:
+            return [self.send_message(chat_id, text) for chat_id, text in messages]
+        workers = min(self.concurrency, len(messages))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(lambda m: self.send_message(*m), messages))
+
+    @staticmethod
+    def _retry_after(response):
+        try:
+            return float(response.json()["parameters"]["retry_after"])
+        except (ValueError, KeyError, TypeError):
+            return 1.0
+
+
+_sender = None
+_sender_lock = threading.Lock()
+
+
+def get_sender():
+    """
+    Возвращает общий для процесса экземпляр TelegramSender, настроенный из settings.
+
+    Returns:
+        TelegramSender: отправитель сообщений.
+    """
+    global _sender
+    if _sender is None:
+        with _sender_lock:
+            if _sender is None:
+                _sender = TelegramSender(
+                    base_url=settings.TELEGRAM_BOT_URL,
+                    token=settings.TELEGRAM_BOT_TOKEN,
+                    pool_size=settings.TELEGRAM_POOL_SIZE,
+                    timeout=settings.TELEGRAM_TIMEOUT,
+                    global_rate=settings.TELEGRAM_GLOBAL_RATE,
+                    per_chat_rate=settings.TELEGRAM_PER_CHAT_RATE,
+                    concurrency=settings.TELEGRAM_CONCURRENCY,
+                    max_retries=settings.TELEGRAM_MAX_RETRIES,
+                )
+    return _sender
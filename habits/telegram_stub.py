@@ -0,0 +1,142 @@
+import json
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubBotAPIHandler(BaseHTTPRequestHandler):
+    """
+    Обработчик запросов заглушки Telegram Bot API (только метод sendMessage).
+    """
+
+    protocol_version = "HTTP/1.1"
+    # Заголовки и тело уходят отдельными пакетами: без TCP_NODELAY keep-alive
+    # запросы ждут delayed ACK (~40 мс) и замеры показывают задержку заглушки
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length)
+        server = self.server
+        if not self.path.endswith("/sendMessage"):
+            self._reply(
+                404, {"ok": False, "error_code": 404, "description": "Not Found"}
+            )
+            return
+        try:
+            chat_id = str(json.loads(body)["chat_id"])
+        except (ValueError, KeyError):
+            self._reply(
+                400, {"ok": False, "error_code": 400, "description": "Bad Request"}
+            )
+            return
+
+        if server.latency:
+            time.sleep(server.latency)
+        retry_after = server.check_rate_limit(chat_id)
+        if retry_after is not None:
+            server.record(429)
+            self._reply(
+                429,
+                {
+                    "ok": False,
+                    "error_code": 429,
+                    "description": f"Too Many Requests: retry after {retry_after}",
+                    "parameters": {"retry_after": retry_after},
+                },
+            )
+            return
+        server.record(200)
+        self._reply(200, {"ok": True, "result": {"chat": {"id": chat_id}}})
+
+    def _reply(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubBotAPIServer(ThreadingHTTPServer):
+    """
+    Локальная заглушка Telegram Bot API для офлайн-замеров отправителя.
+
+    latency (float): искусственная задержка ответа, секунды.
+    error_rate (float): доля запросов, на которые случайно отвечать 429.
+    retry_after (int): значение retry_after в ответах 429.
+    enforce_limits (bool): отвечать 429 при превышении лимитов Telegram
+        (global_rate сообщений в секунду всего и per_chat_rate на чат).
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address=("127.0.0.1", 0),
+        latency=0.0,
+        error_rate=0.0,
+        retry_after=1,
+        enforce_limits=False,
+        global_rate=30,
+        per_chat_rate=1,
+    ):
+        super().__init__(address, StubBotAPIHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.enforce_limits = enforce_limits
+        self.global_rate = global_rate
+        self.per_chat_rate = per_chat_rate
+        self.lock = threading.Lock()
+        self.statuses = Counter()
+        self.sent_at = []
+        self.chat_sent_at = {}
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/bot"
+
+    def record(self, status):
+        with self.lock:
+            self.statuses[status] += 1
+
+    def check_rate_limit(self, chat_id):
+        """
+        Решает, ответить ли на запрос ошибкой 429.
+
+        Returns:
+            int | None: retry_after для ответа 429 или None, если запрос принят.
+        """
+        if self.error_rate and random.random() < self.error_rate:
+            return self.retry_after
+        if not self.enforce_limits:
+            return None
+        now = time.monotonic()
+        with self.lock:
+            last = self.chat_sent_at.get(chat_id)
+            if last is not None and now - last < 1 / self.per_chat_rate:
+                return self.retry_after
+            self.sent_at = [t for t in self.sent_at if now - t < 1]
+            if len(self.sent_at) >= self.global_rate:
+                return self.retry_after
+            self.sent_at.append(now)
+            self.chat_sent_at[chat_id] = now
+        return None
+
+    def start(self):
+        """
+        Запускает сервер в фоновом потоке.
+
+        Returns:
+            threading.Thread: поток сервера.
+        """
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
@@ -1,20 +1,110 @@
-from unittest.mock import patch
+import asyncio
+import base64
+import csv
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time as time_module
+from datetime import datetime, time, timedelta
+from datetime import timezone as dt_timezone
+from io import BytesIO, StringIO
+from types import SimpleNamespace
+from unittest import skipUnless
+from unittest.mock import Mock, patch
+from zoneinfo import ZoneInfo
 
+import eventlet.semaphore
+import psycopg2
+import requests
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
-from django.test import TestCase
-from django.urls import reverse
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections, transaction
+from django.db.backends.postgresql.base import DatabaseWrapper as PostgresWrapper
+from django.db.models import Q
+from django.test import AsyncRequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils.module_loading import import_string
+from django.utils.timezone import now
+from psycopg2 import extensions
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient, APIRequestFactory, APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
 
-from habits.models import Habit
+from config import metrics
+from config.asgi import application
+from config.pooled_postgresql.base import DatabaseWrapper
+from config.pooled_postgresql.pool import (
+    DB_POOL_TIMEOUTS,
+    ConnectionPool,
+    PoolTimeout,
+    make_semaphore,
+)
+from config.querybudget import QueryBudgetExceeded, QueryRecorder
+from habits import urls as habit_urls
+from habits.cache import (
+    invalidate_public_feed,
+    public_feed_generation,
+    set_import_status,
+    stale_habit_ids,
+)
+from habits.importer import import_habits
+from habits.models import Habit, HabitCompletion, HabitStats
 from habits.permissions import IsOwnerOrReadOnly
-from habits.serializers import HabitSerializer
-from habits.tasks import send_reminder
+from habits.recurrence import bulk_next_fire, next_fire
+from habits.scheduler import ReminderScheduler, TimerQueue
+from habits.serializers import HabitSerializer, habit_row_encoder
+from habits.stats import STATS_WINDOWS, compute_stats
+from habits.streaks import local_today
+from habits.tasks import (
+    check_and_send_reminders,
+    claim_due_batch,
+    deliver_reminders,
+    import_habits_file,
+    recompute_user_reminders,
+    rollup_habit_stats,
+    send_reminder,
+    send_reminders_batch,
+)
+from habits.telegram import TelegramSender, TokenBucket
+from habits.telegram_stub import StubBotAPIServer
+from habits.views import HabitViewSet
+from users.cache import auth_users, invalidate_auth_user
 from users.models import UserTelegram
 
 User = get_user_model()
 
 
+def make_habit(user, on_commit=False, **overrides):
+    """
+    Создаёт привычку пользователя с обязательными полями по умолчанию.
+
+    Args:
+        user (User): владелец привычки.
+        on_commit (bool): выполнить колбэки on_commit (кэши, версии привычки).
+        **overrides: поля привычки вместо значений по умолчанию.
+
+    Returns:
+        Habit: созданная привычка.
+    """
+    fields = {"action": "Зарядка", "time": "07:00", "place": "дом", "duration": 10}
+    fields.update(overrides)
+    if not on_commit:
+        return Habit.objects.create(user=user, **fields)
+    with TestCase.captureOnCommitCallbacks(execute=True):
+        return Habit.objects.create(user=user, **fields)
+
+
 # Тест моделей: Habit
 class HabitModelTest(TestCase):
     def setUp(self):
@@ -105,6 +195,1399 @@ class HabitAPITest(APITestCase):
         response = self.client.post(url, data, format="json")
         self.assertEqual(response.status_code, 201)
 
+    def test_page_number_pagination_is_default(self):
+        for _ in range(7):
+            make_habit(self.user, time="08:00")
+        response = self.client.get(reverse("habits:habit-list"), {"page": 2})
+        self.assertEqual(response.data["count"], 7)
+        self.assertEqual(len(response.data["results"]), 2)
+
+    def test_cursor_pagination_by_time(self):
+        habits = [
+            make_habit(self.user, time=habit_time)
+            for habit_time in ["09:00", "07:00", "07:00", "08:00", "07:00"]
+        ]
+        expected = sorted(habits, key=lambda h: (h.time, h.id))
+        url = reverse("habits:habit-list")
+        params = {"pagination": "cursor", "ordering": "time", "page_size": 2}
+        seen = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertNotIn("count", response.data)
+            seen += [item["id"] for item in response.data["results"]]
+            if response.data["next"] is None:
+                break
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(response.data["next"])
+            self.assertFalse(
+                any(
+                    "COUNT" in query["sql"].upper()
+                    for query in queries.captured_queries
+                )
+            )
+        self.assertEqual(seen, [habit.id for habit in expected])
+
+        previous = self.client.get(response.data["previous"])
+        self.assertEqual(
+            [item["id"] for item in previous.data["results"]],
+            [habit.id for habit in expected[2:4]],
+        )
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse("habits:habit-list"), {"cursor": "xxx"})
+        self.assertEqual(response.status_code, 404)
+
+    def test_cursor_with_wrong_value_types(self):
+        make_habit(self.user, time="08:00")
+        url = reverse("habits:habit-list")
+        cases = [
+            ("id", ["abc"]),
+            ("id", [{"x": 1}]),
+            ("id", [None]),
+            ("time", ["25:99:00", 1]),
+            ("time", ["x", "y"]),
+            ("time", [["08:00"], 1]),
+        ]
+        for ordering, position in cases:
+            cursor = base64.urlsafe_b64encode(json.dumps({"p": position}).encode())
+            with self.subTest(ordering=ordering, position=position):
+                response = self.client.get(
+                    url, {"cursor": cursor.decode(), "ordering": ordering}
+                )
+                self.assertEqual(response.status_code, 404)
+
+
+# Потоковая выгрузка
+class HabitExportTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(email="export@mail.com", password="123")
+        self.other = User.objects.create(email="other-export@mail.com", password="123")
+        self.client.force_authenticate(self.user)
+        for user in (self.user, self.other):
+            Habit.objects.bulk_create(
+                Habit(
+                    user=user,
+                    action=f"Привычка, {i}",
+                    time=f"07:{i:02d}",
+                    place="дом",
+                    duration=60,
+                    reward="Кофе" if i % 2 else None,
+                )
+                for i in range(12)
+            )
+
+    def export(self, **params):
+        response = self.client.get(reverse("habits:habit-export"), params)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content).decode()
+
+    def test_ndjson_streams_all_habits(self):
+        response, content = self.export()
+
+        self.assertEqual(
+            response["Content-Type"], "application/x-ndjson; charset=utf-8"
+        )
+        rows = [json.loads(line) for line in content.splitlines()]
+        habits = Habit.objects.filter(user=self.user).order_by("id")
+        self.assertEqual(rows, HabitSerializer(habits, many=True).data)
+
+    @override_settings(HABIT_EXPORT_CHUNK_SIZE=5)
+    def test_csv(self):
+        response, content = self.export(export_format="csv")
+
+        self.assertIn('filename="habits.csv"', response["Content-Disposition"])
+        rows = list(csv.reader(StringIO(content)))
+        self.assertEqual(rows[0], habit_row_encoder.fields)
+        self.assertEqual(len(rows), 13)
+        self.assertEqual(rows[1][rows[0].index("action")], "Привычка, 0")
+        self.assertEqual(rows[2][rows[0].index("reward")], "Кофе")
+
+    def test_other_users_only_for_staff(self):
+        response = self.client.get(
+            reverse("habits:habit-export"), {"user": self.other.id}
+        )
+        self.assertEqual(response.status_code, 403)
+
+        self.user.is_staff = True
+        self.user.save()
+        _, content = self.export(user=[self.user.id, self.other.id])
+        self.assertEqual(len(content.splitlines()), 24)
+
+    def test_invalid_params(self):
+        url = reverse("habits:habit-export")
+        self.assertEqual(
+            self.client.get(url, {"export_format": "xml"}).status_code, 400
+        )
+        self.user.is_staff = True
+        self.user.save()
+        self.assertEqual(self.client.get(url, {"user": "me"}).status_code, 400)
+
+
+# Массовый импорт
+class HabitImportTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(email="import@mail.com", password="123")
+        self.client.force_authenticate(self.user)
+        self.pleasant = Habit.objects.create(
+            user=self.user,
+            action="Кофе",
+            time="08:00",
+            place="кухня",
+            is_pleasant=True,
+            duration=60,
+        )
+        self.url = reverse("habits:habit-import")
+
+    def upload(self, name, content, **data):
+        file = SimpleUploadedFile(name, content.encode())
+        return self.client.post(self.url, {"file": file, **data}, format="multipart")
+
+    def test_csv_with_rejects(self):
+        content = (
+            "action,time,place,duration,reward,related_habit,is_public\n"
+            "Бег,07:00,парк,60,,,true\n"
+            "Чтение,21:00,дом,500,,,\n"
+            f"Зарядка,07:30,дом,60,Кофе,{self.pleasant.id},\n"
+            f"Планка,07:45,дом,60,,{self.pleasant.id},\n"
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.upload("habits.csv", content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {key: response.data[key] for key in ("processed", "imported", "rejected")},
+            {"processed": 4, "imported": 2, "rejected": 2},
+        )
+        self.assertEqual([r["line"] for r in response.data["rejects"]], [3, 4])
+        self.assertIn("duration", response.data["rejects"][0]["errors"])
+        habits = Habit.objects.filter(user=self.user, is_pleasant=False)
+        self.assertEqual(
+            sorted(habits.values_list("action", flat=True)), ["Бег", "Планка"]
+        )
+        self.assertEqual(habits.get(action="Планка").related_habit, self.pleasant)
+        self.assertTrue(habits.get(action="Бег").is_public)
+
+    def test_export_round_trip(self):
+        Habit.objects.create(
+            user=self.user, action="Бег", time="07:00", place="парк", duration=60
+        )
+        exported = self.client.get(reverse("habits:habit-export"))
+        content = b"".join(exported.streaming_content).decode()
+        other = User.objects.create(email="import-other@mail.com", password="123")
+        self.client.force_authenticate(other)
+
+        response = self.upload("habits.ndjson", content)
+
+        self.assertEqual(response.data["imported"], 2)
+        self.assertEqual(
+            list(other.habits.order_by("id").values_list("action", "is_pleasant")),
+            [("Кофе", True), ("Бег", False)],
+        )
+
+    @override_settings(HABIT_IMPORT_BATCH_SIZE=2)
+    def test_ndjson_bad_lines_and_batches(self):
+        lines = [
+            json.dumps(
+                {"action": f"Шаг {i}", "time": "07:00", "place": "дом", "duration": 60}
+            )
+            for i in range(3)
+        ]
+        content = "\n".join([lines[0], "{не json", "", "[1, 2]", *lines[1:]])
+        progress = []
+
+        with open(os.devnull, "rb") as devnull:
+            self.assertEqual(
+                import_habits(self.user, devnull, "ndjson")["processed"], 0
+            )
+        report = import_habits(
+            self.user,
+            BytesIO(content.encode()),
+            "ndjson",
+            progress=lambda r: progress.append(r["processed"]),
+        )
+
+        self.assertEqual(report["imported"], 3)
+        self.assertEqual([r["line"] for r in report["rejects"]], [2, 4])
+        self.assertEqual(progress, [2, 4, 5])
+
+    def test_format_errors(self):
+        self.assertEqual(self.upload("habits.txt", "").status_code, 400)
+        response = self.upload("habits.txt", "action\nБег\n", import_format="csv")
+        self.assertEqual(response.data["rejected"], 1)
+        self.assertEqual(self.client.post(self.url, {}).status_code, 400)
+
+    def test_large_file_imported_in_background(self):
+        content = "action,time,place,duration\nБег,07:00,парк,60\n"
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(
+                HABIT_IMPORT_SYNC_MAX_BYTES=10, HABIT_IMPORT_DIR=directory
+            ):
+                with patch("habits.tasks.import_habits_file.delay") as delay:
+                    response = self.upload("habits.csv", content)
+                self.assertEqual(response.status_code, 202)
+                status_url = response.data["status_url"]
+                self.assertEqual(self.client.get(status_url).data["state"], "pending")
+
+                import_habits_file(*delay.call_args.args)
+
+                self.assertEqual(os.listdir(directory), [])
+        status = self.client.get(status_url).data
+        self.assertEqual(status["state"], "done")
+        self.assertEqual(status["imported"], 1)
+        self.assertTrue(Habit.objects.filter(user=self.user, action="Бег").exists())
+
+        other = User.objects.create(email="import-other@mail.com", password="123")
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(status_url).status_code, 404)
+
+    def test_command(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as f:
+            f.write("action,time,place,duration\nБег,07:00,парк,60\nЙога,,дом,60\n")
+        out = StringIO()
+        try:
+            call_command("import_habits", f.name, user=self.user.email, stdout=out)
+        finally:
+            os.remove(f.name)
+
+        self.assertIn("строка 3:", out.getvalue())
+        self.assertIn("Загружено привычек: 1, отклонено строк: 1", out.getvalue())
+
+
+# Журнал выполнения и серии
+class StreakTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(email="streak@mail.com", password="123")
+        self.client.force_authenticate(self.user)
+        self.habit = Habit.objects.create(
+            user=self.user, action="Бег", time="07:00", place="парк", duration=60
+        )
+        self.today = local_today(self.user)
+
+    def check_in(self, days_ago=None, habit=None):
+        data = {}
+        if days_ago is not None:
+            data["day"] = (self.today - timedelta(days=days_ago)).isoformat()
+        url = reverse("habits:habit-check-in", args=[(habit or self.habit).id])
+        return self.client.post(url, data, format="json")
+
+    def test_consecutive_days(self):
+        for days_ago in (3, 2, 1):
+            self.assertEqual(self.check_in(days_ago).status_code, 201)
+        response = self.check_in()
+
+        self.assertEqual(response.data["current_streak"], 4)
+        self.assertEqual(response.data["longest_streak"], 4)
+        self.assertEqual(response.data["last_completed_on"], self.today)
+        self.assertEqual(self.check_in().status_code, 200)
+        self.assertEqual(self.habit.completions.count(), 4)
+        self.habit.refresh_from_db()
+        self.assertEqual(self.habit.version, 1)
+
+    def test_gap_longer_than_periodicity_breaks_streak(self):
+        self.habit.periodicity = 2
+        self.habit.save()
+        for days_ago in (9, 7, 5, 1):
+            response = self.check_in(days_ago)
+
+        self.assertEqual(response.data["current_streak"], 1)
+        self.assertEqual(response.data["longest_streak"], 3)
+
+        url = reverse("habits:habit-streak", args=[self.habit.id])
+        with patch(
+            "habits.streaks.timezone.now", return_value=now() + timedelta(days=2)
+        ):
+            self.assertEqual(self.client.get(url).data["current_streak"], 0)
+        self.assertEqual(self.client.get(url).data["current_streak"], 1)
+
+    def test_backfill_joins_streaks(self):
+        self.check_in(4)
+        self.check_in(2)
+        self.assertEqual(self.check_in(0).data["current_streak"], 1)
+
+        self.check_in(1)
+        response = self.check_in(3)
+
+        self.assertEqual(response.data["current_streak"], 5)
+        self.assertEqual(response.data["longest_streak"], 5)
+
+    def test_invalid_check_ins(self):
+        self.assertEqual(self.check_in(-1).status_code, 400)
+        other = User.objects.create(email="streak-other@mail.com", password="123")
+        habit = Habit.objects.create(
+            user=other, action="Йога", time="07:00", place="дом", duration=60
+        )
+        self.assertEqual(self.check_in(habit=habit).status_code, 404)
+
+    def test_rebuild_matches_incremental_counters(self):
+        rng = random.Random(5)
+        habits = [
+            Habit.objects.create(
+                user=self.user,
+                action=f"Привычка {i}",
+                time="07:00",
+                place="дом",
+                duration=60,
+                periodicity=i % 3 + 1,
+                repeat=["daily", "weekly", "none"][i % 3],
+            )
+            for i in range(6)
+        ]
+        for habit in habits:
+            days = rng.sample(range(60), 25)
+            for days_ago in days:
+                self.check_in(days_ago, habit)
+        expected = list(
+            Habit.objects.order_by("id").values_list(
+                "current_streak", "longest_streak", "last_completed_on"
+            )
+        )
+        Habit.objects.update(current_streak=0, longest_streak=0, last_completed_on=None)
+
+        call_command("rebuild_streaks", chunk_size=4, stdout=StringIO())
+
+        actual = list(
+            Habit.objects.order_by("id").values_list(
+                "current_streak", "longest_streak", "last_completed_on"
+            )
+        )
+        self.assertEqual(actual, expected)
+        self.assertEqual(actual[0], (0, 0, None))
+
+
+# Статистика выполнения
+class HabitStatsTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(email="stats@mail.com", password="123")
+        self.client.force_authenticate(self.user)
+        self.today = local_today(self.user)
+        self.daily = Habit.objects.create(
+            user=self.user, action="Бег", time="07:00", place="парк", duration=60
+        )
+        self.weekly = Habit.objects.create(
+            user=self.user,
+            action="Йога",
+            time="19:30",
+            place="дом",
+            duration=60,
+            repeat="weekly",
+        )
+        self.complete(self.daily, 0, 1, 2, 4, 10, 40)
+        self.complete(self.weekly, 3, 500)
+
+    def complete(self, habit, *days_ago):
+        HabitCompletion.objects.bulk_create(
+            HabitCompletion(habit=habit, day=self.today - timedelta(days=n))
+            for n in days_ago
+        )
+
+    def test_rollup(self):
+        self.assertEqual(rollup_habit_stats(), 2)
+
+        daily = HabitStats.objects.get(habit=self.daily)
+        self.assertEqual(daily.computed_on, self.today)
+        self.assertEqual(daily.completed, [4, 5, 6])
+        # Отслеживание началось с первого выполнения 40 дней назад
+        self.assertEqual(daily.expected, [7, 30, 41])
+        self.assertEqual(sum(daily.weekdays), 6)
+        weekly = HabitStats.objects.get(habit=self.weekly)
+        self.assertEqual(weekly.completed, [1, 1, 1])
+        self.assertEqual(weekly.expected, [1, 5, 53])
+
+    def test_user_stats(self):
+        response = self.client.get(reverse("habits:habit-stats"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(HabitStats.objects.count(), 2)
+        week = response.data["windows"]["7"]
+        self.assertEqual((week["completed"], week["expected"]), (5, 8))
+        self.assertEqual(week["rate"], round(5 / 8, 4))
+        weekday = (self.today - timedelta(days=3)).weekday()
+        self.assertEqual(response.data["best_weekday"], weekday)
+        heatmap = response.data["heatmap"]
+        self.assertEqual(heatmap[self.today.weekday()][7], 1)
+        self.assertEqual(heatmap[weekday][19], 1)
+        self.assertEqual(sum(map(sum, heatmap)), 7)
+        habits = {row["habit"]: row for row in response.data["habits"]}
+        self.assertEqual(
+            habits[self.daily.id]["windows"]["30"]["rate"], round(5 / 30, 4)
+        )
+        self.assertEqual(habits[self.weekly.id]["windows"]["365"]["completed"], 1)
+
+    def test_reads_rollup(self):
+        rollup_habit_stats()
+        self.complete(self.daily, 3)
+
+        url = reverse("habits:habit-stats-detail", args=[self.daily.id])
+        response = self.client.get(url)
+
+        self.assertEqual(response.data["windows"]["7"]["completed"], 4)
+        rollup_habit_stats()
+        self.assertEqual(self.client.get(url).data["windows"]["7"]["completed"], 5)
+
+    def test_other_users_habit(self):
+        other = User.objects.create(email="stats-other@mail.com", password="123")
+        habit = Habit.objects.create(
+            user=other, action="Йога", time="07:00", place="дом", duration=60
+        )
+        url = reverse("habits:habit-stats-detail", args=[habit.id])
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_matches_row_by_row_computation(self):
+        rng = random.Random(3)
+        moment = now()
+        rows, completions, expected = [], [], {}
+        for habit_id in range(1, 40):
+            zone_name = rng.choice(["UTC", "Europe/Moscow", "America/New_York"])
+            today = moment.astimezone(ZoneInfo(zone_name)).date()
+            repeat = rng.choice(["daily", "weekly", "none"])
+            periodicity = rng.randint(1, 7)
+            days = sorted(
+                {today - timedelta(days=rng.randint(0, 400)) for _ in range(50)}
+            )
+            days = days[: rng.randint(0, len(days))]
+            remind_at = (
+                moment - timedelta(days=rng.randint(-5, 500))
+                if rng.random() < 0.5
+                else None
+            )
+            rows.append(
+                (
+                    habit_id,
+                    repeat,
+                    periodicity,
+                    remind_at,
+                    zone_name,
+                    days[0] if days else None,
+                )
+            )
+            completions += [(habit_id, day) for day in days]
+
+            interval = 7 if repeat == "weekly" else periodicity
+            starts = days[:1] + (
+                [remind_at.astimezone(ZoneInfo(zone_name)).date()] if remind_at else []
+            )
+            start = min(starts) if starts else None
+            done, due = [], []
+            for window in STATS_WINDOWS:
+                first = today - timedelta(days=window - 1)
+                done.append(sum(first <= day <= today for day in days))
+                tracked = (today - max(first, start)).days + 1 if start else 0
+                due.append(math.ceil(max(tracked, 0) / interval))
+            weekdays = [0] * 7
+            for day in days:
+                if (today - day).days < 365:
+                    weekdays[day.weekday()] += 1
+            expected[habit_id] = (today, done, due, weekdays)
+
+        stats = compute_stats(rows, completions, moment)
+
+        actual = {
+            s.habit_id: (s.computed_on, s.completed, s.expected, s.weekdays)
+            for s in stats
+        }
+        self.assertEqual(actual, expected)
+
+
+# Пакетные операции
+class HabitBatchTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(email="batch@mail.com", password="123")
+        self.client.force_authenticate(self.user)
+        self.url = reverse("habits:habit-batch")
+        self.pleasant = Habit.objects.create(
+            user=self.user,
+            action="Кофе",
+            time="08:00",
+            place="кухня",
+            duration=30,
+            is_pleasant=True,
+        )
+
+    def habit_data(self, i, **kwargs):
+        return {
+            "action": f"Шаг {i}",
+            "time": "07:00",
+            "place": "дом",
+            "duration": 30,
+            "related_habit": self.pleasant.id,
+            **kwargs,
+        }
+
+    def test_create_many(self):
+        items = [self.habit_data(i) for i in range(10)]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, items, format="json")
+        statements = [
+            q["sql"] for q in queries.captured_queries if "SAVEPOINT" not in q["sql"]
+        ]
+        # Одна выборка связанных приятных привычек и один INSERT на всю пачку
+        self.assertEqual(len(statements), 2)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), 10)
+        self.assertTrue(all(item["id"] for item in response.data))
+        self.assertEqual(Habit.objects.filter(user=self.user).count(), 11)
+
+    def test_errors_are_reported_per_item(self):
+        items = [
+            self.habit_data(0),
+            self.habit_data(1, duration=500),
+            self.habit_data(2, reward="Торт"),
+            self.habit_data(3, related_habit=999999),
+        ]
+        response = self.client.post(self.url, items, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0], {})
+        self.assertIn("duration", response.data[1])
+        self.assertIn("non_field_errors", response.data[2])
+        self.assertIn("related_habit", response.data[3])
+        self.assertEqual(Habit.objects.filter(user=self.user).count(), 1)
+
+    def test_update_many_bumps_versions_and_schedule(self):
+        reminded_at = datetime(2030, 1, 1, 7, 0, tzinfo=dt_timezone.utc)
+        habits = [
+            make_habit(
+                self.user,
+                remind_at=reminded_at,
+                last_reminded_at=reminded_at,
+                repeat="daily",
+            )
+            for _ in range(3)
+        ]
+        items = [{"id": h.id, "place": "парк", "time": "09:30"} for h in habits]
+        response = self.client.patch(self.url, items, format="json")
+        self.assertEqual(response.status_code, 200)
+        for habit in habits:
+            version = habit.version
+            habit.refresh_from_db()
+            self.assertEqual(habit.place, "парк")
+            self.assertEqual(habit.version, version + 1)
+            self.assertEqual(
+                habit.next_remind_at,
+                datetime(2030, 1, 2, 9, 30, tzinfo=dt_timezone.utc),
+            )
+
+        other = User.objects.create(email="other-batch@mail.com", password="123")
+        foreign = Habit.objects.create(
+            user=other, action="Чужая", time="07:00", place="дом", duration=30
+        )
+        response = self.client.patch(
+            self.url, [{"id": habits[0].id}, {"id": foreign.id}], format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[1], {"id": ["Привычка не найдена."]})
+
+    def test_rolled_back_update_keeps_cached_versions(self):
+        habit = make_habit(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError):
+                with transaction.atomic():
+                    response = self.client.patch(
+                        self.url, [{"id": habit.id, "place": "парк"}], format="json"
+                    )
+                    self.assertEqual(response.status_code, 200)
+                    raise RuntimeError
+        self.assertEqual(stale_habit_ids({habit.id: habit.version}), set())
+
+    def test_delete_many(self):
+        ids = [make_habit(self.user).id for _ in range(3)]
+        response = self.client.delete(self.url, ids + [999999], format="json")
+        self.assertEqual(response.status_code, 400)
+        response = self.client.delete(self.url, ids, format="json")
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Habit.objects.filter(id__in=ids).exists())
+
+
+# Условные запросы (ETag / 304) к своим привычкам
+class ConditionalGetTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(email="poll@mail.com", password="123")
+        self.client.force_authenticate(self.user)
+        self.habit = make_habit(self.user, on_commit=True)
+
+    def test_unchanged_list_returns_304_without_queries(self):
+        url = reverse("habits:habit-list")
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Last-Modified", response)
+        self.assertIn("no-cache", response["Cache-Control"])
+        with self.assertNumQueries(0):
+            cached = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(cached.status_code, 304)
+
+        other_page = self.client.get(
+            url, {"page_size": 1}, HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(other_page.status_code, 200)
+
+        make_habit(self.user, on_commit=True, action="Чтение")
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(len(changed.data["results"]), 2)
+
+    def test_detail_etag_changes_on_update(self):
+        url = reverse("habits:habit-detail", args=[self.habit.id])
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(url, {"place": "спортзал"}, format="json")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["place"], "спортзал")
+
+
+# Быстрый путь чтения списков
+class HabitRowEncoderTest(APITestCase):
+    def test_matches_serializer(self):
+        user = User.objects.create(email="encoder@mail.com", password="123")
+        pleasant = Habit.objects.create(
+            user=user,
+            action="Кофе",
+            time="08:15:30",
+            place="кухня",
+            duration=30,
+            is_pleasant=True,
+        )
+        Habit.objects.create(
+            user=user,
+            action="Бег",
+            time="07:00",
+            place="парк",
+            periodicity=3,
+            duration=120,
+            related_habit=pleasant,
+            is_public=True,
+        )
+        Habit.objects.create(
+            user=user,
+            action="Чтение",
+            time="21:00",
+            place="дом",
+            duration=60,
+            reward="Сериал",
+        )
+        queryset = Habit.objects.order_by("id")
+        renderer = JSONRenderer()
+        expected = renderer.render(HabitSerializer(queryset, many=True).data)
+        with self.assertNumQueries(1):
+            rows = queryset.values(*habit_row_encoder.lookups)
+            self.assertEqual(
+                renderer.render(habit_row_encoder.encode_many(rows)), expected
+            )
+
+    def test_list_queries_do_not_grow_with_page(self):
+        user = User.objects.create(email="rows@mail.com", password="123")
+        for i in range(20):
+            Habit.objects.create(
+                user=user, action=f"Шаг {i}", time="10:00", place="дом", duration=5
+            )
+        self.client.force_authenticate(user)
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("habits:habit-list"), {"page_size": 20})
+        self.assertEqual(len(response.data["results"]), 20)
+        self.assertEqual(response.data["results"][0]["owner_email"], "rows@mail.com")
+
+
+# Кэш публичной ленты
+class PublicFeedCacheTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(email="feed@mail.com", password="123")
+        self.url = reverse("habits:habit-public")
+
+    def feed_actions(self):
+        return [item["action"] for item in self.client.get(self.url).data["results"]]
+
+    def test_pages_are_cached_with_cdn_headers(self):
+        make_habit(self.user, on_commit=True, action="Гулять", is_public=True)
+        first = self.client.get(self.url)
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(second["Cache-Control"], "public, max-age=5")
+        self.assertEqual(second["Surrogate-Key"], "habits-public")
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url, {"page_size": 1})
+        self.assertTrue(queries.captured_queries)
+
+    def test_public_changes_invalidate_feed(self):
+        public = make_habit(self.user, on_commit=True, action="Гулять", is_public=True)
+        private = make_habit(self.user, on_commit=True, action="Читать")
+        self.assertEqual(self.feed_actions(), ["Гулять"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            public.action = "Гулять с собакой"
+            public.save()
+        self.assertEqual(self.feed_actions(), ["Гулять с собакой"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            private.is_public = True
+            private.save()
+        self.assertEqual(self.feed_actions(), ["Гулять с собакой", "Читать"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            public.delete()
+        self.assertEqual(self.feed_actions(), ["Читать"])
+
+    def test_private_changes_keep_feed(self):
+        make_habit(self.user, on_commit=True, action="Гулять", is_public=True)
+        private = make_habit(self.user, on_commit=True, action="Читать")
+        self.client.get(self.url)
+        generation = public_feed_generation()
+        with self.captureOnCommitCallbacks(execute=True):
+            private.place = "библиотека"
+            private.save()
+        self.assertEqual(public_feed_generation(), generation)
+
+
+# Асинхронные представления под ASGI (config/asyncviews.py, config/asgi_urls.py)
+class AsyncViewTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        auth_users.clear()
+        self.user = User.objects.create_user(email="async@mail.com", password="123")
+        other = User.objects.create_user(email="async-other@mail.com", password="123")
+        pleasant = Habit.objects.create(
+            user=self.user,
+            action="Кофе",
+            time="08:00",
+            place="кухня",
+            is_pleasant=True,
+            duration=60,
+        )
+        self.habits = [
+            Habit.objects.create(
+                user=user,
+                action=f"Привычка {i}",
+                time=f"0{i}:30",
+                place="дом",
+                duration=60,
+                is_public=i % 2 == 0,
+                related_habit=pleasant if i == 1 else None,
+            )
+            for i, user in enumerate([self.user] * 4 + [other])
+        ]
+        token = RefreshToken.for_user(self.user).access_token
+        self.auth = {"Authorization": f"Bearer {token}"}
+
+    def asgi_get(self, path, data=None, **headers):
+        """Запрос через ASGI-приложение config.asgi (без сервера)."""
+        request = AsyncRequestFactory().get(path, data, headers=headers)
+        return async_to_sync(application.get_response_async)(request)
+
+    def assertSameResponse(self, path, data=None, **headers):
+        """ASGI и синхронные (WSGI) представления отвечают одинаково."""
+        invalidate_auth_user(self.user.id)
+        asgi = self.asgi_get(path, data, **headers)
+        invalidate_auth_user(self.user.id)
+        wsgi = self.client.get(path, data, headers=headers)
+        self.assertEqual(asgi.status_code, wsgi.status_code)
+        self.assertEqual(asgi.content, wsgi.content)
+        for header in (
+            "Content-Type",
+            "Allow",
+            "Vary",
+            "ETag",
+            "Cache-Control",
+            "WWW-Authenticate",
+            "X-Query-Count",
+        ):
+            self.assertEqual(asgi.get(header), wsgi.get(header), header)
+        return asgi
+
+    def test_hot_routes_are_async(self):
+        for path in (
+            reverse("habits:habit-list"),
+            reverse("habits:habit-public"),
+            reverse("habits:habit-detail", args=[self.habits[0].id]),
+            reverse("users:user_detail"),
+        ):
+            match = resolve(path, urlconf=settings.ASGI_URLCONF)
+            self.assertTrue(iscoroutinefunction(match.func), path)
+            self.assertEqual(match.view_name, resolve(path).view_name)
+        stats = resolve(reverse("habits:habit-stats"), urlconf=settings.ASGI_URLCONF)
+        self.assertFalse(iscoroutinefunction(stats.func))
+
+    def test_middleware_is_async_capable(self):
+        for path in settings.MIDDLEWARE:
+            self.assertTrue(import_string(path).async_capable, path)
+
+    def test_list_matches_sync(self):
+        url = reverse("habits:habit-list")
+        self.assertSameResponse(url, **self.auth)
+        self.assertSameResponse(url, {"page_size": 2, "page": 2}, **self.auth)
+        self.assertSameResponse(url, {"page": 99}, **self.auth)
+        first = self.assertSameResponse(
+            url,
+            {"pagination": "cursor", "ordering": "time", "page_size": 2},
+            **self.auth,
+        )
+        next_url = json.loads(first.content)["next"]
+        self.assertSameResponse(next_url, **self.auth)
+        self.assertSameResponse(url, {"cursor": "broken"}, **self.auth)
+
+    def test_retrieve_matches_sync(self):
+        for pk in (self.habits[1].id, self.habits[4].id, 0, "abc"):
+            self.assertSameResponse(
+                reverse("habits:habit-detail", args=[pk]), **self.auth
+            )
+
+    def test_not_modified(self):
+        url = reverse("habits:habit-detail", args=[self.habits[0].id])
+        etag = self.asgi_get(url, **self.auth)["ETag"]
+        response = self.asgi_get(url, **self.auth, **{"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_public_matches_sync(self):
+        url = reverse("habits:habit-public")
+        for params in ({}, {"page_size": 1, "page": 2}):
+            asgi = self.asgi_get(url, params)
+            invalidate_public_feed()
+            wsgi = self.client.get(url, params)
+            self.assertEqual(asgi.status_code, 200)
+            self.assertEqual(asgi.content, wsgi.content)
+            self.assertEqual(asgi["Cache-Control"], wsgi["Cache-Control"])
+            self.assertEqual(asgi["Surrogate-Key"], wsgi["Surrogate-Key"])
+
+    def test_user_detail_matches_sync(self):
+        self.assertSameResponse(reverse("users:user_detail"), **self.auth)
+
+    def test_authentication_errors_match_sync(self):
+        url = reverse("habits:habit-list")
+        self.assertSameResponse(url)
+        self.assertSameResponse(url, Authorization="Bearer broken")
+        self.user.is_active = False
+        self.user.save()
+        self.assertSameResponse(url, **self.auth)
+
+    def test_concurrent_requests_count_own_queries(self):
+        paths = [
+            reverse("habits:habit-list"),
+            reverse("habits:habit-detail", args=[self.habits[0].id]),
+            reverse("users:user_detail"),
+        ]
+        self.asgi_get(paths[0], **self.auth)
+        sequential = [
+            self.asgi_get(path, **self.auth)["X-Query-Count"] for path in paths
+        ]
+
+        async def concurrent():
+            requests = [
+                AsyncRequestFactory().get(path, headers=self.auth) for path in paths
+            ]
+            return await asyncio.gather(
+                *(application.get_response_async(request) for request in requests)
+            )
+
+        responses = async_to_sync(concurrent)()
+        self.assertEqual([r["X-Query-Count"] for r in responses], sequential)
+        self.assertNotIn("0", sequential)
+
+    def test_other_requests_use_sync_views(self):
+        url = reverse("habits:habit-list")
+        request = AsyncRequestFactory().post(
+            url,
+            {"action": "Бег", "time": "06:30", "place": "парк", "duration": 60},
+            content_type="application/json",
+            headers=self.auth,
+        )
+        response = async_to_sync(application.get_response_async)(request)
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Habit.objects.filter(user=self.user, action="Бег").exists())
+
+        html = self.asgi_get(url, Accept="text/html", **self.auth)
+        self.assertEqual(html.status_code, 200)
+        self.assertTrue(html["Content-Type"].startswith("text/html"))
+
+
+# Бюджеты SQL-запросов (config/querybudget.py): число запросов не растёт с данными
+class QueryBudgetTest(APITestCase):
+    sizes = (1, 10, 100)
+
+    def setUp(self):
+        self.user = User.objects.create_user(email="budget@mail.com", password="123")
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def create_rows(self, n):
+        """Привычки пользователя и чужие публичные, ссылающиеся на приятную."""
+        pleasant = Habit.objects.create(
+            user=self.user,
+            action="Кофе",
+            time="08:00",
+            place="кухня",
+            is_pleasant=True,
+            duration=60,
+        )
+        others = User.objects.bulk_create(
+            User(email=f"budget{i}@mail.com") for i in range(n)
+        )
+        Habit.objects.bulk_create(
+            Habit(
+                user=user,
+                action=f"Привычка {i}",
+                time="07:00",
+                place="дом",
+                duration=60,
+                is_public=True,
+                related_habit=pleasant,
+            )
+            for i, user in enumerate([self.user] * n + others)
+        )
+        return pleasant, list(Habit.objects.filter(user=self.user, is_pleasant=False))
+
+    def query_counts(self, n):
+        """Выполняет запрос к каждому маршруту habits/urls.py и собирает X-Query-Count."""
+        pleasant, habits = self.create_rows(n)
+        detail = reverse("habits:habit-detail", args=[habits[0].id])
+        batch = reverse("habits:habit-batch")
+        data = {
+            "action": "Бег",
+            "time": "06:30",
+            "place": "парк",
+            "duration": 60,
+            "periodicity": 1,
+            "related_habit": pleasant.id,
+        }
+        requests = {
+            "list": lambda: self.client.get(
+                reverse("habits:habit-list"), {"page_size": 100}
+            ),
+            "public": lambda: APIClient().get(
+                reverse("habits:habit-public"), {"page_size": 100}
+            ),
+            "create": lambda: self.client.post(
+                reverse("habits:habit-list"), data, format="json"
+            ),
+            "retrieve": lambda: self.client.get(detail),
+            "update": lambda: self.client.put(detail, data, format="json"),
+            "partial_update": lambda: self.client.patch(
+                detail, {"time": "09:00"}, format="json"
+            ),
+            "check_in": lambda: self.client.post(
+                reverse("habits:habit-check-in", args=[habits[0].id])
+            ),
+            "streak": lambda: self.client.get(
+                reverse("habits:habit-streak", args=[habits[0].id])
+            ),
+            "stats": lambda: self.client.get(reverse("habits:habit-stats")),
+            "habit_stats": lambda: self.client.get(
+                reverse("habits:habit-stats-detail", args=[habits[0].id])
+            ),
+            "batch_create": lambda: self.client.post(batch, [data] * n, format="json"),
+            "batch_update": lambda: self.client.patch(
+                batch, [{"id": h.id, "place": "сад"} for h in habits], format="json"
+            ),
+            "destroy": lambda: self.client.delete(
+                reverse("habits:habit-detail", args=[pleasant.id])
+            ),
+            "batch_delete": lambda: self.client.delete(
+                batch, [h.id for h in habits], format="json"
+            ),
+            "export": lambda: self.client.get(reverse("habits:habit-export")),
+            "import_file": lambda: self.client.post(
+                reverse("habits:habit-import"),
+                {"file": SimpleUploadedFile("habits.csv", import_csv.encode())},
+                format="multipart",
+            ),
+            "import_status": lambda: self.client.get(
+                reverse("habits:habit-import-status", args=["0" * 32])
+            ),
+        }
+        import_csv = "action,time,place,duration,related_habit\n" + "".join(
+            f"Бег {i},07:00,парк,60,{pleasant.id}\n" for i in range(n)
+        )
+        set_import_status("0" * 32, {"user_id": self.user.id, "state": "done"})
+        today = local_today(self.user)
+        HabitCompletion.objects.bulk_create(
+            HabitCompletion(habit=habits[0], day=today - timedelta(days=i + 1))
+            for i in range(n)
+        )
+        counts = {}
+        for name, request in requests.items():
+            response = request()
+            self.assertLess(response.status_code, 300, name)
+            counts[name] = int(response["X-Query-Count"])
+        return counts
+
+    def test_query_counts_do_not_grow_with_rows(self):
+        counts = {}
+        for n in self.sizes:
+            cache.clear()
+            auth_users.clear()
+            with transaction.atomic():
+                counts[n] = self.query_counts(n)
+                transaction.set_rollback(True)
+        # bulk_create в SQLite делится на INSERT по 999 параметров
+        for name, action in [("batch_create", "batch"), ("import_file", "import_file")]:
+            inserts = {n: counts[n].pop(name) for n in self.sizes}
+            self.assertLessEqual(
+                max(inserts.values()), HabitViewSet.query_budgets[action]
+            )
+        self.assertEqual(counts[1], counts[10])
+        self.assertEqual(counts[1], counts[100])
+
+    def test_every_route_has_budget(self):
+        # api-root перекрыт маршрутом списка (префикс "")
+        for url in habit_urls.router.urls:
+            if url.name == "api-root":
+                continue
+            for action in url.callback.actions.values():
+                self.assertIn(action, url.callback.cls.query_budgets, url.name)
+
+    @override_settings(QUERY_BUDGET_STRICT=True)
+    def test_exceeded_budget_fails(self):
+        with patch.dict(HabitViewSet.query_budgets, {"list": 1}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(reverse("habits:habit-list"))
+
+    @override_settings(QUERY_BUDGET_STRICT=False)
+    def test_exceeded_budget_is_logged(self):
+        with patch.dict(HabitViewSet.query_budgets, {"list": 1}):
+            with self.assertLogs("config.querybudget", "WARNING") as logs:
+                response = self.client.get(reverse("habits:habit-list"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Query budget exceeded", logs.output[-1])
+
+    def test_repeated_query_shapes(self):
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            for i in range(1, 4):
+                list(Habit.objects.filter(id__in=range(i)))
+            Habit.objects.count()
+        self.assertEqual(recorder.count, 4)
+        self.assertEqual(list(recorder.repeated(3).values()), [3])
+        self.assertEqual(recorder.repeated(4), {})
+
+
+# Пул соединений с PostgreSQL (config/pooled_postgresql)
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.autocommit = True
+        self.info = SimpleNamespace(
+            transaction_status=extensions.TRANSACTION_STATUS_IDLE
+        )
+        self.rollbacks = 0
+        self.healthy = True
+
+    def cursor(self):
+        connection = self
+
+        class Cursor:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def execute(self, sql):
+                if not connection.healthy:
+                    raise psycopg2.OperationalError("server closed the connection")
+
+        return Cursor()
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.info.transaction_status = extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+class ConnectionPoolTest(SimpleTestCase):
+    def setUp(self):
+        metrics.get_backend().clear()
+
+    def pool(self, **options):
+        return ConnectionPool(connect=FakeConnection, **options)
+
+    def test_reuses_connections(self):
+        pool = self.pool(max_size=2)
+        first = pool.getconn()
+        pool.putconn(first)
+
+        self.assertIs(pool.getconn(), first)
+        stats = pool.stats()
+        self.assertEqual(
+            (stats["opened"], stats["checkouts"], stats["in_use"]), (1, 2, 1)
+        )
+        self.assertEqual(stats["saturation"], 0.5)
+
+    def test_checkouts_are_capped(self):
+        pool = self.pool(max_size=2, timeout=0.05)
+        connections = [pool.getconn(), pool.getconn()]
+
+        with self.assertRaises(PoolTimeout):
+            pool.getconn()
+        self.assertEqual(pool.stats()["timeouts"], 1)
+        timeouts = metrics.get_backend().read([DB_POOL_TIMEOUTS.key])[0]
+        self.assertEqual(timeouts, {'["web"]': 1})
+
+        threading.Timer(0.05, pool.putconn, [connections[0]]).start()
+        pool.timeout = 5
+        self.assertIs(pool.getconn(), connections[0])
+        stats = pool.stats()
+        self.assertEqual((stats["waits"], stats["max_in_use"]), (1, 2))
+        self.assertGreater(stats["wait_seconds_max"], 0.01)
+
+    def test_open_failure_releases_slot(self):
+        pool = ConnectionPool(
+            connect=Mock(side_effect=psycopg2.OperationalError), max_size=1
+        )
+        for _ in range(2):
+            with self.assertRaises(psycopg2.OperationalError):
+                pool.getconn(connect=pool.connect)
+        self.assertEqual(pool.stats()["in_use"], 0)
+
+    def test_returned_connections_are_reset_or_dropped(self):
+        pool = self.pool(max_size=3)
+        in_transaction, broken, discarded = (
+            pool.getconn(),
+            pool.getconn(),
+            pool.getconn(),
+        )
+        in_transaction.info.transaction_status = extensions.TRANSACTION_STATUS_INERROR
+        broken.closed = 2
+
+        pool.putconn(in_transaction)
+        pool.putconn(broken)
+        pool.discard(discarded)
+
+        self.assertEqual(in_transaction.rollbacks, 1)
+        self.assertEqual((pool.stats()["idle"], pool.stats()["in_use"]), (1, 0))
+        self.assertTrue(discarded.closed)
+
+    def test_health_check_and_expiry(self):
+        pool = self.pool(
+            max_size=2, check_interval=10, idle_timeout=100, max_lifetime=1000
+        )
+        broken, old = pool.getconn(), pool.getconn()
+        pool.putconn(old)
+        pool.putconn(broken)
+        broken.healthy = False
+
+        started = time_module.monotonic()
+        with patch(
+            "config.pooled_postgresql.pool.time.monotonic", return_value=started + 20
+        ):
+            connection = pool.getconn()
+        self.assertIs(connection, old)
+        self.assertTrue(broken.closed)
+        self.assertEqual(pool.stats()["check_failures"], 1)
+
+        with patch(
+            "config.pooled_postgresql.pool.time.monotonic", return_value=started + 2000
+        ):
+            pool.putconn(connection)
+        self.assertTrue(old.closed)
+        self.assertEqual(pool.stats()["idle"], 0)
+
+    def test_semaphore_follows_green_threads(self):
+        for patched, semaphore_class in [
+            (False, threading.BoundedSemaphore),
+            (True, eventlet.semaphore.BoundedSemaphore),
+        ]:
+            patcher = Mock(is_monkey_patched=Mock(return_value=patched))
+            with patch.dict(sys.modules, {"eventlet.patcher": patcher}):
+                self.assertIsInstance(make_semaphore(1), semaphore_class)
+
+    def test_database_wrapper_uses_pool(self):
+        settings_dict = {
+            **connection.settings_dict,
+            "ENGINE": "config.pooled_postgresql",
+            "NAME": "pool-test",
+            "HOST": "",
+            "PORT": "",
+            "USER": "",
+            "OPTIONS": {},
+            "POOL": {"max_size": 1, "timeout": 0.05},
+        }
+        wrapper = DatabaseWrapper(settings_dict, alias="pool-test")
+        with patch.object(
+            PostgresWrapper,
+            "get_new_connection",
+            side_effect=lambda params: FakeConnection(),
+        ):
+            raw = wrapper.get_new_connection({})
+            wrapper.connection = raw
+            wrapper.close()
+            self.assertIsNone(wrapper.connection)
+            self.assertIs(wrapper.get_new_connection({}), raw)
+        self.assertFalse(raw.closed)
+        self.assertEqual(wrapper.connection_pool.stats()["opened"], 1)
+
+
+# Пул на настоящем PostgreSQL; выполняется, если задан POSTGRES_TEST_HOST (в CI)
+@skipUnless(os.getenv("POSTGRES_TEST_HOST"), "POSTGRES_TEST_HOST не задан")
+class PooledPostgresTest(SimpleTestCase):
+    def wrapper(self, name="pool", **pool):
+        settings_dict = connections.configure_settings(
+            {
+                "default": {
+                    "ENGINE": "config.pooled_postgresql",
+                    "NAME": os.getenv("POSTGRES_DB", "test_db"),
+                    "USER": os.getenv("POSTGRES_USER", "postgres"),
+                    "PASSWORD": os.getenv("POSTGRES_PASSWORD", ""),
+                    "HOST": os.getenv("POSTGRES_TEST_HOST"),
+                    "PORT": os.getenv("POSTGRES_TEST_PORT", "5432"),
+                    "POOL": {"max_size": 2, "timeout": 1, **pool},
+                }
+            }
+        )["default"]
+        # Алиас входит в ключ пула: у каждого теста свой пул
+        wrapper = DatabaseWrapper(settings_dict, alias=f"{self.id()}-{name}")
+        self.addCleanup(wrapper.connection_pool.close)
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    @staticmethod
+    def fetch(wrapper, sql):
+        with wrapper.cursor() as cursor:
+            cursor.execute(sql)
+            return cursor.fetchone()[0]
+
+    def test_connection_is_reused(self):
+        wrapper = self.wrapper()
+        pid = self.fetch(wrapper, "SELECT pg_backend_pid()")
+        wrapper.close()
+
+        self.assertEqual(self.fetch(wrapper, "SELECT pg_backend_pid()"), pid)
+        stats = wrapper.connection_pool.stats()
+        self.assertEqual((stats["opened"], stats["checkouts"]), (1, 2))
+
+    def test_open_transaction_is_rolled_back(self):
+        wrapper = self.wrapper()
+        wrapper.set_autocommit(False)
+        self.fetch(wrapper, "CREATE TEMP TABLE pool_check (x int); SELECT 1")
+        wrapper.close()
+
+        self.assertIsNone(
+            self.fetch(wrapper, "SELECT to_regclass('pg_temp.pool_check')")
+        )
+        self.assertTrue(wrapper.get_autocommit())
+        self.assertEqual(wrapper.connection_pool.stats()["opened"], 1)
+
+    def test_terminated_connection_is_replaced(self):
+        wrapper = self.wrapper(check_interval=0)
+        pid = self.fetch(wrapper, "SELECT pg_backend_pid()")
+        wrapper.close()
+        admin = self.wrapper("admin")
+        self.fetch(admin, f"SELECT pg_terminate_backend({pid})")
+
+        self.assertNotEqual(self.fetch(wrapper, "SELECT pg_backend_pid()"), pid)
+        stats = wrapper.connection_pool.stats()
+        self.assertEqual((stats["opened"], stats["check_failures"]), (2, 1))
+
+
+class ImportTimeTest(SimpleTestCase):
+    """Холодный старт веб-процесса: импорт config.wsgi в новом интерпретаторе."""
+
+    SCRIPT = (
+        "import json, sys, time\n"
+        "started = time.perf_counter()\n"
+        "import config.wsgi\n"
+        "elapsed = time.perf_counter() - started\n"
+        "modules = ['eventlet', 'config.celery', 'habits.tasks', 'users.tasks']\n"
+        "print(json.dumps({'elapsed': elapsed,"
+        " 'loaded': [name for name in modules if name in sys.modules]}))\n"
+    )
+
+    def import_wsgi(self):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE="config.settings")
+        env.setdefault("SECRET_KEY", "import-time-test")
+        result = subprocess.run(
+            [sys.executable, "-c", self.SCRIPT],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+            timeout=60,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return json.loads(result.stdout.splitlines()[-1])
+
+    def test_web_process_is_not_patched_and_celery_is_lazy(self):
+        self.assertEqual(self.import_wsgi()["loaded"], [])
+
+    # Время зависит от машины: бюджет по умолчанию (секунды) с запасом,
+    # в CI он задан точнее через IMPORT_TIME_BUDGET:
+    # IMPORT_TIME_BUDGET=1.5 python manage.py test habits.tests.ImportTimeTest
+    def test_cold_start_budget(self):
+        # Лучший из трёх запусков: первый может читать файлы с диска
+        elapsed = min(self.import_wsgi()["elapsed"] for _ in range(3))
+        self.assertLess(elapsed, float(os.getenv("IMPORT_TIME_BUDGET", 3)))
+
+
+# Синтетические данные и набор бенчмарков
+class DatasetTest(TestCase):
+    def test_generate_dataset(self):
+        call_command("generate_dataset", users=20, habits=5, seed=1, stdout=StringIO())
+
+        users = User.objects.filter(email__startswith="bench-1-")
+        habits = Habit.objects.filter(user__in=users).select_related("user")
+        self.assertEqual(users.count(), 20)
+        self.assertEqual(habits.count(), 100)
+        self.assertTrue(
+            UserTelegram.objects.filter(user__in=users).count() in range(10, 21)
+        )
+        for habit in habits:
+            habit.clean()
+            self.assertEqual(habit.next_remind_at, habit.compute_next_remind_at())
+            if habit.related_habit_id:
+                self.assertTrue(habit.related_habit.is_pleasant)
+                self.assertEqual(habit.related_habit.user_id, habit.user_id)
+
+        call_command("generate_dataset", delete=True, stdout=StringIO())
+        self.assertFalse(users.exists())
+
+    def test_bench_habits_writes_results(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = f"{directory}/results.json"
+            call_command(
+                "bench_habits",
+                users=5,
+                habits=4,
+                repeat=2,
+                warmup=0,
+                output=path,
+                stdout=StringIO(),
+            )
+            with open(path) as f:
+                report = json.load(f)
+            out = StringIO()
+            call_command(
+                "bench_habits",
+                users=5,
+                habits=4,
+                repeat=2,
+                warmup=0,
+                only=["habit_list"],
+                output=f"{directory}/next.json",
+                compare=path,
+                stdout=out,
+            )
+
+        self.assertEqual(report["meta"]["dataset"]["users"], 5)
+        self.assertEqual(
+            set(report["results"]),
+            {
+                "habit_list",
+                "habit_public_cold",
+                "habit_public_warm",
+                "serializer_many",
+                "check_and_send_reminders",
+                "send_reminder",
+            },
+        )
+        for result in report["results"].values():
+            self.assertLessEqual(result["min_ms"], result["median_ms"])
+            self.assertGreater(result["peak_kib"], 0)
+        self.assertEqual(report["results"]["habit_public_warm"]["queries"], 0)
+        self.assertIn("habit_list:", out.getvalue().split("Сравнение")[1])
+        self.assertFalse(User.objects.filter(email__startswith="bench-suite-").exists())
+
 
 # Permissions через TestCase
 class PermissionTestCase(TestCase):
@@ -132,7 +1615,10 @@ class PermissionTestCase(TestCase):
 
 # Celery — unit test c моками (через TestCase)
 class CeleryTaskTest(TestCase):
-    @patch("habits.tasks.requests.post")
+    def setUp(self):
+        cache.clear()
+
+    @patch("habits.telegram.requests.Session.post")
     def test_send_reminder(self, mock_post):
         user = User.objects.create(email="tguser@mail.com", password="123")
         tg = UserTelegram.objects.create(user=user, chat_id="111111")
@@ -150,3 +1636,584 @@ class CeleryTaskTest(TestCase):
         mock_post.return_value.text = "ok"
         send_reminder(habit.id)
         self.assertTrue(mock_post.called)
+
+    @patch("habits.tasks.get_sender")
+    def test_send_reminders_batch(self, mock_get_sender):
+        with_tg = User.objects.create(email="batch1@mail.com", password="123")
+        UserTelegram.objects.create(user=with_tg, chat_id="222")
+        without_tg = User.objects.create(email="batch2@mail.com", password="123")
+        habits = [
+            Habit.objects.create(
+                user=user,
+                action=f"Действие {user.id}",
+                time="06:00",
+                place="дом",
+                periodicity=1,
+                duration=10,
+            )
+            for user in (with_tg, without_tg)
+        ]
+        sender = mock_get_sender.return_value
+        sender.send_many.return_value = []
+        with self.assertNumQueries(1):
+            send_reminders_batch([habit.id for habit in habits])
+        sender.send_many.assert_called_once_with(
+            [("222", f"Пора выполнить привычку: Действие {with_tg.id}!")]
+        )
+
+    @patch("habits.tasks.get_sender")
+    def test_digest_combines_same_chat(self, mock_get_sender):
+        digest_user = User.objects.create(
+            email="digest@mail.com", password="123", reminder_digest=True
+        )
+        UserTelegram.objects.create(user=digest_user, chat_id="333")
+        habits = [
+            Habit.objects.create(
+                user=digest_user,
+                action=action,
+                time="06:00",
+                place="дом",
+                periodicity=1,
+                duration=10,
+            )
+            for action in ("Зарядка", "Чтение")
+        ]
+        sender = mock_get_sender.return_value
+        sender.send_many.return_value = []
+        send_reminders_batch([habit.id for habit in habits])
+        sender.send_many.assert_called_once_with(
+            [("333", "Пора выполнить привычки:\n— Зарядка\n— Чтение")]
+        )
+
+    @patch("habits.tasks.get_sender")
+    def test_deliver_drops_stale_reminders(self, mock_get_sender):
+        user = User.objects.create(email="stale@mail.com", password="123")
+        UserTelegram.objects.create(user=user, chat_id="444")
+        kept, edited, deleted = [
+            Habit.objects.create(
+                user=user,
+                action=action,
+                time="06:00",
+                place="дом",
+                periodicity=1,
+                duration=10,
+            )
+            for action in ("Бег", "Сон", "Йога")
+        ]
+        messages = [
+            ["444", [[habit.id, habit.version, habit.action, now().timestamp()]]]
+            for habit in (kept, edited, deleted)
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            edited.action = "Сон до 23:00"
+            edited.save()
+            deleted.delete()
+        sender = mock_get_sender.return_value
+        sender.send_many.return_value = []
+
+        with self.assertNumQueries(0):
+            deliver_reminders(messages)
+
+        sender.send_many.assert_called_once_with(
+            [("444", "Пора выполнить привычку: Бег!")]
+        )
+
+    @patch("habits.tasks.get_sender")
+    def test_rolled_back_changes_keep_reminders(self, mock_get_sender):
+        user = User.objects.create(email="rollback@mail.com", password="123")
+        UserTelegram.objects.create(user=user, chat_id="555")
+        edited, deleted = [
+            Habit.objects.create(
+                user=user,
+                action=action,
+                time="06:00",
+                place="дом",
+                periodicity=1,
+                duration=10,
+            )
+            for action in ("Бег", "Сон")
+        ]
+        messages = [
+            ["555", [[habit.id, habit.version, habit.action, now().timestamp()]]]
+            for habit in (edited, deleted)
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError):
+                with transaction.atomic():
+                    edited.action = "Бег по утрам"
+                    edited.save()
+                    Habit.objects.get(pk=deleted.pk).delete()
+                    raise RuntimeError
+        sender = mock_get_sender.return_value
+        sender.send_many.return_value = []
+
+        deliver_reminders(messages)
+
+        sender.send_many.assert_called_once_with(
+            [
+                ("555", "Пора выполнить привычку: Бег!"),
+                ("555", "Пора выполнить привычку: Сон!"),
+            ]
+        )
+
+
+def utc_at_seven(day):
+    """Напоминание привычки с time="07:00" пользователя в поясе UTC."""
+    return datetime.combine(day, time(7), tzinfo=dt_timezone.utc)
+
+
+def delivered_ids(mock_delay):
+    """Идентификаторы привычек из каждого вызова deliver_reminders.delay."""
+    return [
+        [entry[0] for _, entries in call.args[0] for entry in entries]
+        for call in mock_delay.call_args_list
+    ]
+
+
+# Планировщик напоминаний: выборка по next_remind_at
+class ReminderScheduleTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(email="sched@mail.com", password="123")
+        UserTelegram.objects.create(user=self.user, chat_id="100")
+
+    def test_next_remind_at_on_save(self):
+        remind_at = datetime(2025, 3, 1, 9, 30, tzinfo=dt_timezone.utc)
+        habit = make_habit(self.user, remind_at=remind_at, repeat="daily")
+        self.assertEqual(habit.next_remind_at, remind_at)
+        habit.last_reminded_at = remind_at
+        habit.save()
+        self.assertEqual(
+            habit.next_remind_at, datetime(2025, 3, 2, 7, 0, tzinfo=dt_timezone.utc)
+        )
+        self.assertIsNone(make_habit(self.user).next_remind_at)
+
+    @patch("habits.tasks.deliver_reminders.delay")
+    def test_only_due_habits_are_sent(self, mock_delay):
+        past = now() - timedelta(minutes=1)
+        once = make_habit(self.user, remind_at=past)
+        weekly = make_habit(self.user, remind_at=past, repeat="weekly")
+        future = make_habit(self.user, remind_at=now() + timedelta(hours=1))
+
+        check_and_send_reminders()
+
+        self.assertEqual(delivered_ids(mock_delay), [[once.id, weekly.id]])
+        once.refresh_from_db()
+        weekly.refresh_from_db()
+        future.refresh_from_db()
+        self.assertIsNone(once.next_remind_at)
+        self.assertEqual(
+            weekly.next_remind_at,
+            utc_at_seven(weekly.last_reminded_at.date() + timedelta(weeks=1)),
+        )
+        self.assertEqual(future.next_remind_at, future.remind_at)
+
+        mock_delay.reset_mock()
+        check_and_send_reminders()
+        self.assertFalse(mock_delay.called)
+
+    @override_settings(REMINDER_BATCH_SIZE=2)
+    @patch("habits.tasks.deliver_reminders.delay")
+    def test_due_habits_are_sent_in_batches(self, mock_delay):
+        past = now() - timedelta(minutes=1)
+        users = [
+            User.objects.create(email=f"batch{i}@mail.com", password="123")
+            for i in range(5)
+        ]
+        for user in users:
+            UserTelegram.objects.create(user=user, chat_id=f"chat{user.id}")
+        habits = [make_habit(user, remind_at=past, repeat="daily") for user in users]
+
+        with CaptureQueriesContext(connection) as ctx:
+            check_and_send_reminders()
+
+        updates = [q for q in ctx.captured_queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 3)
+        batches = delivered_ids(mock_delay)
+        self.assertEqual([len(batch) for batch in batches], [2, 2, 1])
+        self.assertEqual(
+            sorted(i for batch in batches for i in batch), [h.id for h in habits]
+        )
+        self.assertFalse(Habit.objects.filter(next_remind_at__lte=now()).exists())
+
+    @override_settings(REMINDER_BATCH_SIZE=2, REMINDER_DIGEST_WINDOW=300)
+    @patch("habits.tasks.deliver_reminders.delay")
+    def test_user_habits_stay_in_one_batch(self, mock_delay):
+        self.user.reminder_digest = True
+        self.user.save()
+        past = now() - timedelta(minutes=1)
+        soon = now() + timedelta(minutes=2)
+        habits = [make_habit(self.user, remind_at=past) for _ in range(2)]
+        habits.append(make_habit(self.user, remind_at=soon))
+        later = make_habit(self.user, remind_at=now() + timedelta(hours=1))
+
+        check_and_send_reminders()
+
+        self.assertEqual(delivered_ids(mock_delay), [[h.id for h in habits]])
+        later.refresh_from_db()
+        self.assertEqual(later.next_remind_at, later.remind_at)
+
+    @override_settings(REMINDER_SCAN_WORKERS=3)
+    @patch("habits.tasks.group")
+    def test_scan_fans_out_to_workers(self, mock_group):
+        check_and_send_reminders()
+        signatures = list(mock_group.call_args.args[0])
+        self.assertEqual(len(signatures), 3)
+        self.assertEqual(signatures[0].task, "habits.tasks.scan_due_reminders")
+        mock_group.return_value.apply_async.assert_called_once_with()
+
+    @patch("habits.tasks.deliver_reminders.delay", side_effect=ConnectionError)
+    def test_claim_is_rolled_back_when_enqueue_fails(self, mock_delay):
+        habit = make_habit(self.user, remind_at=now() - timedelta(minutes=1))
+        with self.assertRaises(ConnectionError):
+            claim_due_batch(Q(next_remind_at__lte=now()), now(), 10)
+        habit.refresh_from_db()
+        self.assertIsNone(habit.last_reminded_at)
+        self.assertEqual(habit.next_remind_at, habit.remind_at)
+
+
+# Расчёт повторений с учётом периодичности и часового пояса
+class RecurrenceTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(
+            email="tz@mail.com", password="123", time_zone="Europe/Berlin"
+        )
+        self.remind_at = datetime(2025, 3, 1, tzinfo=dt_timezone.utc)
+
+    def test_periodicity_and_dst(self):
+        # 28.03 07:05 по Берлину (UTC+1), через 3 дня уже летнее время (UTC+2)
+        habit = make_habit(
+            self.user,
+            remind_at=self.remind_at,
+            repeat="daily",
+            periodicity=3,
+            last_reminded_at=datetime(2025, 3, 28, 6, 5, tzinfo=dt_timezone.utc),
+        )
+        self.assertEqual(
+            habit.next_remind_at, datetime(2025, 3, 31, 5, 0, tzinfo=dt_timezone.utc)
+        )
+
+    def test_bulk_matches_scalar(self):
+        rng = random.Random(9)
+        zones = [
+            "UTC",
+            "Europe/Berlin",
+            "America/New_York",
+            "Australia/Lord_Howe",
+            "Asia/Kolkata",
+            "America/Sao_Paulo",
+            "Unknown/Zone",
+        ]
+        start = datetime(2017, 1, 1, tzinfo=dt_timezone.utc).timestamp()
+        rows = []
+        for _ in range(2000):
+            rows.append(
+                (
+                    int(start + rng.random() * 9 * 365 * 86400),
+                    rng.randint(1, 7),
+                    rng.choice([0, 5400, 9000, 7 * 3600, 86399]),
+                    rng.choice(zones),
+                )
+            )
+        bulk = bulk_next_fire(*zip(*rows))
+        for (anchor, days, seconds, zone), fired in zip(rows, bulk.tolist()):
+            expected = next_fire(
+                datetime.fromtimestamp(anchor, dt_timezone.utc),
+                days,
+                time(seconds // 3600, seconds // 60 % 60, seconds % 60),
+                zone,
+            )
+            self.assertEqual(fired, expected.timestamp(), (anchor, days, seconds, zone))
+
+    def test_mark_reminded_matches_save(self):
+        habits = [
+            make_habit(
+                self.user, remind_at=self.remind_at, repeat="daily", periodicity=2
+            ),
+            make_habit(self.user, remind_at=self.remind_at, repeat="weekly"),
+            make_habit(self.user, remind_at=self.remind_at, repeat="none"),
+        ]
+        reminded_at = datetime(2025, 10, 25, 23, 30, tzinfo=dt_timezone.utc)
+        Habit.objects.filter(id__in=[h.id for h in habits]).mark_reminded(reminded_at)
+        for habit in habits:
+            habit.refresh_from_db()
+            self.assertEqual(habit.last_reminded_at, reminded_at)
+            self.assertEqual(habit.next_remind_at, habit.compute_next_remind_at())
+        self.assertIsNone(habits[2].next_remind_at)
+
+    @patch("habits.tasks.recompute_user_reminders.delay")
+    def test_time_zone_change_recomputes(self, mock_delay):
+        mock_delay.side_effect = recompute_user_reminders
+        habit = make_habit(
+            self.user,
+            remind_at=self.remind_at,
+            repeat="daily",
+            last_reminded_at=datetime(2025, 6, 1, 5, 0, tzinfo=dt_timezone.utc),
+        )
+        user = User.objects.get(pk=self.user.pk)
+        user.time_zone = "Asia/Tokyo"
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+        mock_delay.assert_called_once_with(user.pk)
+        habit.refresh_from_db()
+        self.assertEqual(
+            habit.next_remind_at, datetime(2025, 6, 1, 22, 0, tzinfo=dt_timezone.utc)
+        )
+
+        mock_delay.reset_mock()
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+        self.assertFalse(mock_delay.called)
+
+    def test_recompute_command(self):
+        habit = make_habit(
+            self.user,
+            remind_at=self.remind_at,
+            repeat="daily",
+            last_reminded_at=datetime(2025, 6, 1, 5, 0, tzinfo=dt_timezone.utc),
+        )
+        Habit.objects.filter(id=habit.id).update(next_remind_at=None)
+        call_command("recompute_next_reminders", stdout=StringIO())
+        habit.refresh_from_db()
+        self.assertEqual(
+            habit.next_remind_at, datetime(2025, 6, 2, 5, 0, tzinfo=dt_timezone.utc)
+        )
+
+
+# Посекундный планировщик напоминаний
+class TimerQueueTest(TestCase):
+    def test_reschedule_and_cancel(self):
+        timers = TimerQueue()
+        timers.schedule(1, 10.0)
+        timers.schedule(2, 5.0)
+        timers.schedule(3, 7.0)
+        timers.schedule(1, 3.0)
+        timers.cancel(3)
+        self.assertEqual(timers.next_deadline(), 3.0)
+        self.assertEqual(timers.pop_due(6.0), [(1, 3.0), (2, 5.0)])
+        self.assertIsNone(timers.next_deadline())
+        self.assertEqual(len(timers), 0)
+
+
+class ReminderSchedulerTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(email="wheel@mail.com", password="123")
+        UserTelegram.objects.create(user=self.user, chat_id="200")
+        self.start = now()
+        self.clock_ts = self.start.timestamp()
+        self.scheduler = ReminderScheduler(clock=lambda: self.clock_ts)
+
+    @patch("habits.tasks.deliver_reminders.delay")
+    def test_fires_at_exact_second(self, mock_delay):
+        habit = make_habit(
+            self.user, remind_at=self.start + timedelta(seconds=30), repeat="daily"
+        )
+        self.assertEqual(self.scheduler.load(), 1)
+
+        self.clock_ts += 29
+        self.assertEqual(self.scheduler.fire_due(), [])
+
+        self.clock_ts += 1
+        self.assertEqual(self.scheduler.fire_due(), [habit.id])
+        due_ts = (self.start + timedelta(seconds=30)).timestamp()
+        mock_delay.assert_called_once_with(
+            [["200", [[habit.id, 1, "Зарядка", due_ts]]]]
+        )
+        habit.refresh_from_db()
+        self.assertEqual(
+            habit.next_remind_at,
+            utc_at_seven(habit.last_reminded_at.date() + timedelta(days=1)),
+        )
+
+    @patch("habits.tasks.deliver_reminders.delay")
+    def test_refill_picks_up_changed_habits(self, mock_delay):
+        moved = make_habit(self.user, remind_at=self.start + timedelta(seconds=20))
+        self.scheduler.load()
+        deleted = make_habit(self.user, remind_at=self.start + timedelta(seconds=10))
+        moved.remind_at = self.start + timedelta(hours=2)
+        moved.save()
+
+        self.clock_ts += 5
+        self.scheduler.refill()
+        self.assertNotIn(moved.id, self.scheduler.timers)
+        self.assertIn(deleted.id, self.scheduler.timers)
+
+        deleted.delete()
+        self.clock_ts += 30
+        self.assertEqual(self.scheduler.fire_due(), [])
+        self.assertFalse(mock_delay.called)
+
+    @patch("habits.tasks.deliver_reminders.delay")
+    def test_refill_retries_unclaimed_overdue(self, mock_delay):
+        habit = make_habit(self.user, remind_at=self.start + timedelta(seconds=1))
+        self.scheduler.load()
+        self.clock_ts += 1
+        # Строку захватил другой отправитель (SKIP LOCKED) — таймер уже извлечён
+        with patch("habits.tasks.claim_due_batch", return_value=[]):
+            self.assertEqual(self.scheduler.fire_due(), [])
+        self.assertNotIn(habit.id, self.scheduler.timers)
+
+        self.clock_ts += 5
+        self.scheduler.refill()
+        self.assertEqual(self.scheduler.fire_due(), [habit.id])
+
+    @patch("habits.tasks.deliver_reminders.delay")
+    def test_run_forever_survives_errors(self, mock_delay):
+        habit = make_habit(self.user, remind_at=self.start)
+        delays = []
+
+        def sleep(seconds):
+            delays.append(seconds)
+            self.clock_ts += seconds
+            if len(delays) == 4:
+                raise KeyboardInterrupt
+
+        self.scheduler.sleep = sleep
+        self.scheduler.refill_interval = timedelta(seconds=1)
+        broken = patch("habits.tasks.claim_due_batch", side_effect=OperationalError)
+        with broken, self.assertLogs("habits.scheduler", "ERROR") as logs:
+            with self.assertRaises(KeyboardInterrupt):
+                self.scheduler.run_forever()
+        self.assertEqual(delays, [1.0, 2.0, 4.0, 8.0])
+        self.assertEqual(len(logs.records), 4)
+
+        self.scheduler.refill()
+        self.assertEqual(self.scheduler.fire_due(), [habit.id])
+
+
+# Отправитель Telegram: ограничение частоты, пул соединений, заглушка Bot API
+class TokenBucketTest(TestCase):
+    def test_reserve_waits_when_empty(self):
+        clock = [0.0]
+        bucket = TokenBucket(rate=2, capacity=2, clock=lambda: clock[0])
+        self.assertEqual(bucket.reserve(), 0.0)
+        self.assertEqual(bucket.reserve(), 0.0)
+        self.assertAlmostEqual(bucket.reserve(), 0.5)
+        clock[0] = 1.0
+        self.assertAlmostEqual(bucket.reserve(), 0.0)
+
+
+class TelegramSenderTest(TestCase):
+    def setUp(self):
+        self.server = StubBotAPIServer()
+        self.server.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def make_sender(self, **kwargs):
+        return TelegramSender(
+            base_url=self.server.base_url, token="TEST", global_rate=1000, **kwargs
+        )
+
+    def test_send_many_concurrently(self):
+        sender = self.make_sender(per_chat_rate=1000, concurrency=5)
+        responses = sender.send_many([(str(i), "text") for i in range(20)])
+        self.assertEqual([r.status_code for r in responses], [200] * 20)
+        self.assertEqual(self.server.statuses[200], 20)
+
+    def test_retry_after_429(self):
+        self.server.error_rate = 1.0
+        self.server.retry_after = 0
+        sender = self.make_sender(per_chat_rate=1000, max_retries=2)
+        response = sender.send_message("1", "text")
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(self.server.statuses[429], 3)
+
+    def test_network_error_is_logged(self):
+        sender = self.make_sender()
+        error = requests.ConnectionError("connection refused")
+        with patch.object(sender.session, "post", side_effect=error):
+            with self.assertLogs("habits.telegram", "WARNING") as logs:
+                self.assertIsNone(sender.send_message("1", "text"))
+        self.assertIn("chat 1: connection refused", logs.output[0])
+
+
+# Метрики Prometheus
+class MetricsTest(APITestCase):
+    def setUp(self):
+        metrics.get_backend().clear()
+
+    def test_histogram_and_counter_rendering(self):
+        metrics.TELEGRAM_REQUEST_DURATION.observe(0.02)
+        metrics.TELEGRAM_REQUEST_DURATION.observe(3)
+        metrics.TELEGRAM_REQUESTS.inc(status=429)
+        text = metrics.render()
+        self.assertIn('telegram_request_duration_seconds_bucket{le="0.025"} 1', text)
+        self.assertIn('telegram_request_duration_seconds_bucket{le="5"} 2', text)
+        self.assertIn('telegram_request_duration_seconds_bucket{le="+Inf"} 2', text)
+        self.assertIn("telegram_request_duration_seconds_count 2", text)
+        self.assertIn('telegram_requests_total{status="429"} 1', text)
+
+    def test_endpoint_reports_views_and_reminders(self):
+        user = User.objects.create_user(email="metrics@mail.com", password="123")
+        UserTelegram.objects.create(user=user, chat_id="900")
+        Habit.objects.create(
+            user=user,
+            action="Отжимания",
+            time="06:00",
+            place="дом",
+            periodicity=1,
+            duration=10,
+            remind_at=now() - timedelta(minutes=1),
+        )
+        self.client.force_authenticate(user)
+        self.client.get(reverse("habits:habit-list"))
+        with patch("habits.tasks.deliver_reminders.delay"):
+            check_and_send_reminders()
+
+        response = self.client.get("/metrics")
+
+        self.assertEqual(response.status_code, 200)
+        text = response.content.decode()
+        self.assertIn(
+            'http_request_duration_seconds_count{view="habits:habit-list",'
+            'method="GET",status="200"} 1',
+            text,
+        )
+        self.assertIn("habits_reminders_enqueued_total 1", text)
+        self.assertIn("habits_reminder_tick_rows_total 1", text)
+        self.assertIn("habits_reminder_backlog 0", text)
+
+    @override_settings(METRICS_FLUSH_INTERVAL=60)
+    @patch("config.metrics._start_flusher")
+    def test_increments_are_buffered_until_flush(self, start_flusher):
+        metrics.TELEGRAM_REQUESTS.inc(status=200)
+        metrics.TELEGRAM_REQUESTS.inc(status=200)
+        key = metrics.TELEGRAM_REQUESTS.key
+
+        self.assertEqual(metrics.get_backend().read([key]), [{}])
+        self.assertTrue(metrics.flush())
+        self.assertEqual(metrics.get_backend().read([key]), [{'["200"]': 2}])
+        start_flusher.assert_called_with(60)
+
+    @override_settings(METRICS_FLUSH_INTERVAL=60)
+    @patch("config.metrics._start_flusher")
+    def test_failed_flush_backs_off_and_keeps_increments(self, start_flusher):
+        backend = Mock()
+        backend.increment.side_effect = ConnectionError
+        self.addCleanup(setattr, metrics, "_retry_at", 0.0)
+        metrics.TELEGRAM_REQUESTS.inc(status=200)
+        with patch("config.metrics.get_backend", return_value=backend):
+            with self.assertLogs("config.metrics", "WARNING"):
+                self.assertFalse(metrics.flush())
+                self.assertFalse(metrics.flush())
+        self.assertEqual(backend.increment.call_count, 1)
+
+        metrics._retry_at = 0.0
+        self.assertTrue(metrics.flush())
+        self.assertEqual(
+            metrics.get_backend().read([metrics.TELEGRAM_REQUESTS.key]),
+            [{'["200"]': 1}],
+        )
+
+    def test_write_through_skips_backend_after_failure(self):
+        backend = Mock()
+        backend.increment.side_effect = ConnectionError
+        self.addCleanup(setattr, metrics, "_retry_at", 0.0)
+        with patch("config.metrics.get_backend", return_value=backend):
+            with self.assertLogs("config.metrics", "WARNING") as logs:
+                for _ in range(3):
+                    metrics.TELEGRAM_REQUESTS.inc(status=200)
+        self.assertEqual(backend.increment.call_count, 1)
+        self.assertEqual(len(logs.records), 1)
@@ -1,11 +1,37 @@
-from rest_framework import permissions, viewsets
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
+
+from config.asyncviews import aget_object
 
+from .batch import batch_create, batch_delete, batch_update
+from .cache import (
+    PUBLIC_FEED_SURROGATE_KEY,
+    apublic_feed_key,
+    auser_habits_marker,
+    get_import_status,
+    public_feed_key,
+    set_import_status,
+    user_habits_marker,
+)
+from .export import EXPORT_FORMATS, export_response
+from .importer import import_format_for, import_habits, import_storage
 from .models import Habit
 from .paginators import HabitPagination
 from .permissions import IsOwnerOrReadOnly
-from .serializers import HabitSerializer
+from .serializers import CheckInSerializer, HabitSerializer, habit_row_encoder
+from .stats import habit_detail_stats, user_stats
+from .streaks import check_in, local_today, streak_data
 
 
 class HabitViewSet(viewsets.ModelViewSet):
@@ -16,10 +42,31 @@ class HabitViewSet(viewsets.ModelViewSet):
       - Получение, создание, обновление и удаление привычек текущего пользователя.
       - Отдельную публичную коллекцию привычек (action "public") для неаутентифицированных пользователей.
       - Поддержку индивидуальной пагинации и сериализации.
+      - Асинхронные варианты list, retrieve и public (alist, aretrieve, apublic)
+        для ASGI (config/asyncviews.py) с теми же ответами.
     """
 
     serializer_class = HabitSerializer
     pagination_class = HabitPagination
+    # Бюджеты SQL-запросов по действиям (config/querybudget.py), включая
+    # запрос пользователя при JWT-аутентификации; не зависят от числа привычек
+    query_budgets = {
+        "list": 3,
+        "retrieve": 2,
+        "create": 3,
+        "update": 4,
+        "partial_update": 4,
+        "destroy": 7,
+        "batch": 8,
+        "public": 2,
+        "export": 1,
+        "import_file": 4,
+        "import_status": 1,
+        "check_in": 6,
+        "streak": 2,
+        "stats": 5,
+        "habit_stats": 5,
+    }
 
     def get_permissions(self):
         """
@@ -34,6 +81,15 @@ class HabitViewSet(viewsets.ModelViewSet):
         """
         if self.action == "public":
             permission_classes = [permissions.AllowAny]
+        elif self.action in (
+            "batch",
+            "export",
+            "import_file",
+            "import_status",
+            "stats",
+        ):
+            # Пакетные операции и выгрузка не работают с отдельными объектами
+            permission_classes = [permissions.IsAuthenticated]
         else:
             permission_classes = [permissions.IsAuthenticated, IsOwnerOrReadOnly]
         return [permission() for permission in permission_classes]
@@ -46,15 +102,18 @@ class HabitViewSet(viewsets.ModelViewSet):
         - "public": только публичные привычки всех пользователей.
         - остальные: только привычки текущего пользователя.
 
+        Выборка упорядочена по id, чтобы страницы не пересекались.
+
         Returns:
             QuerySet: выборка привычек для текущего действия.
         """
         user = self.request.user
-        if self.action == "list":
-            return Habit.objects.filter(user=user)
         if self.action == "public":
-            return Habit.objects.filter(is_public=True)
-        return Habit.objects.filter(user=user)
+            queryset = Habit.objects.filter(is_public=True)
+        else:
+            queryset = Habit.objects.filter(user=user)
+        # owner_email в HabitSerializer читается из user
+        return queryset.select_related("user").order_by("id")
 
     def perform_create(self, serializer):
         """
@@ -65,12 +124,311 @@ class HabitViewSet(viewsets.ModelViewSet):
         """
         serializer.save(user=self.request.user)
 
+    @action(detail=False, methods=["post", "patch", "delete"])
+    def batch(self, request):
+        """
+        Пакетные операции с привычками текущего пользователя.
+
+        - POST: список привычек для создания (201, созданные привычки).
+        - PATCH: список частичных изменений, у каждого элемента обязателен id (200).
+        - DELETE: список идентификаторов привычек (204).
+
+        Пачка записывается целиком в одной транзакции. При ошибках ничего
+        не сохраняется, а ответ 400 содержит список ошибок по позициям элементов
+        (пустой словарь — элемент без ошибок).
+        """
+        if request.method == "DELETE":
+            batch_delete(request, request.data)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        if request.method == "POST":
+            habits = batch_create(request, request.data)
+            response_status = status.HTTP_201_CREATED
+        else:
+            habits = batch_update(request, request.data)
+            response_status = status.HTTP_200_OK
+        serializer = self.get_serializer(habits, many=True)
+        return Response(serializer.data, status=response_status)
+
+    @action(detail=True, methods=["post"], url_path="check-in", url_name="check-in")
+    def check_in(self, request, pk=None):
+        """
+        Отмечает выполнение привычки и возвращает её серию (см. habits.streaks).
+
+        Тело запроса: day — день выполнения по часовому поясу владельца
+        (по умолчанию сегодня, в будущем нельзя). Ответ 201 для новой отметки
+        и 200, если день уже был отмечен.
+        """
+        habit = self.get_object()
+        serializer = CheckInSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        today = local_today(habit.user)
+        day = serializer.validated_data.get("day", today)
+        if day > today:
+            raise ValidationError({"day": ["Нельзя отметить выполнение в будущем."]})
+        habit, created = check_in(habit, day)
+        return Response(
+            streak_data(habit, today),
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
+
+    @action(detail=True, methods=["get"])
+    def streak(self, request, pk=None):
+        """
+        Текущая и самая длинная серии выполнения привычки.
+
+        Читаются из счётчиков привычки, без обращения к журналу выполнений.
+        """
+        return Response(streak_data(self.get_object()))
+
+    @action(detail=False, methods=["get"])
+    def stats(self, request):
+        """
+        Статистика выполнения привычек текущего пользователя (см. habits.stats):
+        доли выполнения за 7, 30 и 365 дней, лучший день недели, тепловая карта
+        «день недели × час» и то же по каждой привычке.
+
+        Читает ночные сводки — по строке на привычку — а не журнал выполнений.
+        """
+        return Response(user_stats(self.get_queryset()))
+
+    @action(detail=True, methods=["get"], url_path="stats", url_name="stats-detail")
+    def habit_stats(self, request, pk=None):
+        """Статистика выполнения одной привычки (см. stats)."""
+        try:
+            data = habit_detail_stats(self.get_queryset().filter(pk=pk))
+        except (TypeError, ValueError):
+            data = None
+        if data is None:
+            raise NotFound()
+        return Response(data)
+
+    @action(detail=False, methods=["get"])
+    def export(self, request):
+        """
+        Потоковая выгрузка всех привычек текущего пользователя (см. habits.export).
+
+        Параметры запроса:
+          - export_format: "ndjson" (по умолчанию) или "csv";
+          - user: идентификаторы пользователей, чьи привычки выгружаются
+            (можно повторять; только для staff).
+        """
+        export_format = request.query_params.get("export_format", "ndjson")
+        if export_format not in EXPORT_FORMATS:
+            raise ValidationError(
+                {
+                    "export_format": [
+                        f"Допустимые значения: {', '.join(EXPORT_FORMATS)}."
+                    ]
+                }
+            )
+        user_ids = request.query_params.getlist("user")
+        if not user_ids:
+            return export_response([request.user.id], export_format)
+        if not request.user.is_staff:
+            raise PermissionDenied(
+                "Выгружать привычки других пользователей может только staff."
+            )
+        try:
+            user_ids = [int(user_id) for user_id in user_ids]
+        except ValueError:
+            raise ValidationError({"user": ["Ожидаются идентификаторы пользователей."]})
+        return export_response(user_ids, export_format)
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="import",
+        url_name="import",
+        parser_classes=[MultiPartParser],
+    )
+    def import_file(self, request):
+        """
+        Импорт привычек текущего пользователя из CSV или NDJSON (см. habits.importer).
+
+        Файл передаётся в поле file, формат — в import_format или по расширению
+        (.csv, .ndjson, .jsonl). Небольшие файлы (до HABIT_IMPORT_SYNC_MAX_BYTES)
+        импортируются сразу: ответ 200 с отчётом. Остальные — задачей Celery:
+        ответ 202 с адресом, по которому читается ход импорта.
+        """
+        upload = request.FILES.get("file")
+        if upload is None:
+            raise ValidationError({"file": ["Загрузите файл."]})
+        import_format = import_format_for(
+            upload.name, request.data.get("import_format")
+        )
+        if import_format is None:
+            raise ValidationError(
+                {"import_format": ["Допустимые значения: ndjson, csv."]}
+            )
+        if upload.size > settings.HABIT_IMPORT_MAX_BYTES:
+            raise ValidationError(
+                {"file": [f"Не больше {settings.HABIT_IMPORT_MAX_BYTES} байт."]}
+            )
+        if upload.size <= settings.HABIT_IMPORT_SYNC_MAX_BYTES:
+            return Response(import_habits(request.user, upload, import_format))
+
+        # Задачи и приложение Celery загружаются при первой отправке, а не при старте веб-процесса
+        from .tasks import import_habits_file
+
+        import_id = uuid.uuid4().hex
+        name = import_storage().save(f"{import_id}.{import_format}", upload)
+        set_import_status(import_id, {"user_id": request.user.id, "state": "pending"})
+        import_habits_file.delay(import_id, request.user.id, name, import_format)
+        return Response(
+            {
+                "import_id": import_id,
+                "status_url": reverse(
+                    "habits:habit-import-status", args=[import_id], request=request
+                ),
+            },
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path=r"import/(?P<import_id>[0-9a-f]{32})",
+        url_name="import-status",
+    )
+    def import_status(self, request, import_id):
+        """
+        Ход фонового импорта: state (pending, running, done, failed) и счётчики
+        processed, imported, rejected; по окончании — отклонённые строки rejects.
+        """
+        import_status = get_import_status(import_id)
+        if import_status is None or import_status["user_id"] != request.user.id:
+            raise NotFound()
+        return Response(
+            {key: value for key, value in import_status.items() if key != "user_id"}
+        )
+
     @action(detail=False, methods=["get"], permission_classes=[permissions.AllowAny])
     def public(self, request):
-        queryset = Habit.objects.filter(is_public=True)
+        """
+        Публичная лента привычек.
+
+        Страницы кэшируются в Redis (ключ — параметры страницы и поколение ленты,
+        см. habits.cache) и сбрасываются при изменении публичных привычек.
+        Заголовки Cache-Control и Surrogate-Key позволяют nginx/CDN
+        кратковременно кэшировать ответы.
+        """
+        key = public_feed_key(request)
+        data = cache.get(key)
+        if data is None:
+            data = self.public_page(request)
+            cache.set(key, data, settings.PUBLIC_FEED_CACHE_TIMEOUT)
+        return self.public_response(data)
+
+    async def apublic(self, request):
+        """Асинхронный вариант public."""
+        key = await apublic_feed_key(request)
+        data = await cache.aget(key)
+        if data is None:
+            data = await self.alist_data(request)
+            await cache.aset(key, data, settings.PUBLIC_FEED_CACHE_TIMEOUT)
+        return self.public_response(data)
+
+    def public_response(self, data):
+        response = Response(data)
+        patch_cache_control(response, public=True, max_age=settings.PUBLIC_FEED_MAX_AGE)
+        response["Surrogate-Key"] = PUBLIC_FEED_SURROGATE_KEY
+        return response
+
+    def list(self, request, *args, **kwargs):
+        not_modified = self.conditional_response(request)
+        if not_modified is not None:
+            return not_modified
+        return self.with_validators(Response(self.list_data(request)))
+
+    async def alist(self, request, *args, **kwargs):
+        """Асинхронный вариант list."""
+        marker = await auser_habits_marker(request.user.id)
+        not_modified = self.conditional_response(request, marker)
+        if not_modified is not None:
+            return not_modified
+        return self.with_validators(Response(await self.alist_data(request)))
+
+    def retrieve(self, request, *args, **kwargs):
+        not_modified = self.conditional_response(request)
+        if not_modified is not None:
+            return not_modified
+        return self.with_validators(super().retrieve(request, *args, **kwargs))
+
+    async def aretrieve(self, request, *args, **kwargs):
+        """Асинхронный вариант retrieve."""
+        marker = await auser_habits_marker(request.user.id)
+        not_modified = self.conditional_response(request, marker)
+        if not_modified is not None:
+            return not_modified
+        habit = await aget_object(self)
+        return self.with_validators(Response(self.get_serializer(habit).data))
+
+    def conditional_response(self, request, marker=None):
+        """
+        Проверяет условный запрос (If-None-Match / If-Modified-Since).
+
+        ETag и Last-Modified строятся из отметки изменения привычек пользователя
+        (habits.cache.user_habits_marker) и параметров запроса, поэтому ответ
+        304 отдаётся без обращения к таблице привычек и сериализатору.
+
+        Args:
+            request (Request): запрос DRF.
+            marker (int | None): уже прочитанная отметка изменения (асинхронные
+                варианты читают её сами).
+
+        Returns:
+            HttpResponse | None: ответ 304 или None, если нужен полный ответ.
+        """
+        if marker is None:
+            marker = user_habits_marker(request.user.id)
+        variant = hashlib.sha1(
+            f"{request.user.id}:{request.get_full_path()}".encode()
+        ).hexdigest()[:16]
+        self.etag = f'"{marker:x}-{variant}"'
+        self.last_modified = marker // 10**9
+        return get_conditional_response(
+            request, etag=self.etag, last_modified=self.last_modified
+        )
+
+    def with_validators(self, response):
+        """Добавляет ETag и Last-Modified, клиент должен перепроверять ответ."""
+        if response.status_code == 200:
+            response["ETag"] = self.etag
+            response["Last-Modified"] = http_date(self.last_modified)
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def public_page(self, request):
+        return self.list_data(request)
+
+    def list_data(self, request):
+        """
+        Данные страницы списка привычек (быстрый путь чтения).
+
+        Выбираются только нужные столбцы (values() с email владельца через join),
+        а строки кодируются habit_row_encoder — результат совпадает с HabitSerializer.
+
+        Returns:
+            dict | list: данные ответа.
+        """
+        queryset = self.list_values()
         page = self.paginate_queryset(queryset)
         if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+            data = habit_row_encoder.encode_many(page)
+            return self.get_paginated_response(data).data
+        return habit_row_encoder.encode_many(queryset)
+
+    async def alist_data(self, request):
+        """Асинхронный вариант list_data: те же запросы через асинхронный ORM."""
+        queryset = self.list_values()
+        if self.paginator is not None:
+            page = await self.paginator.apaginate_queryset(queryset, request, view=self)
+            if page is not None:
+                data = habit_row_encoder.encode_many(page)
+                return self.get_paginated_response(data).data
+        return habit_row_encoder.encode_many([row async for row in queryset])
+
+    def list_values(self):
+        return self.filter_queryset(self.get_queryset()).values(
+            *habit_row_encoder.lookups
+        )
@@ -1,9 +1,3 @@
-# flake8: noqa: E402
-
-import eventlet
-
-eventlet.monkey_patch()
-
 import os
 import sys
 
@@ -0,0 +1,197 @@
+"""
+Учёт последней активности пользователей (User.last_active) с отложенной записью.
+
+ActivityMiddleware на каждый запрос аутентифицированного пользователя
+запоминает время запроса в хеше Redis (поле на пользователя), а не пишет
+в базу. Каждый процесс записывает пользователя в Redis не чаще раза
+в ACTIVITY_RESOLUTION секунд. Задача Celery flush_user_activity забирает
+накопленные значения и записывает их в users_user одним UPDATE на пачку.
+
+Для тестов есть хранилище в памяти процесса (ACTIVITY_BACKEND = "local").
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime
+from datetime import timezone as dt_timezone
+
+import redis
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+
+from users.cache import LocalCache
+
+logger = logging.getLogger(__name__)
+
+ACTIVITY_KEY = "users:last_active"
+
+
+class LocalBackend:
+    """Хранилище активности в памяти текущего процесса."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.data = {}
+
+    def record(self, values):
+        with self.lock:
+            for user_id, ts in values.items():
+                self.data[user_id] = max(ts, self.data.get(user_id, 0))
+
+    def take(self):
+        with self.lock:
+            data, self.data = self.data, {}
+        return data
+
+
+class RedisBackend:
+    """Хранилище активности в Redis, общее для всех процессов."""
+
+    def __init__(self, url):
+        self.client = redis.Redis.from_url(
+            url, socket_timeout=0.2, socket_connect_timeout=0.2
+        )
+
+    def record(self, values):
+        self.client.hset(ACTIVITY_KEY, mapping=values)
+
+    def take(self):
+        # Чтение и удаление в одной транзакции: значения, записанные
+        # во время сброса, дождутся следующего
+        pipe = self.client.pipeline()
+        pipe.hgetall(ACTIVITY_KEY)
+        pipe.delete(ACTIVITY_KEY)
+        values, _ = pipe.execute()
+        return {int(user_id): int(ts) for user_id, ts in values.items()}
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if settings.ACTIVITY_BACKEND == "local":
+                    _backend = LocalBackend()
+                else:
+                    _backend = RedisBackend(settings.ACTIVITY_REDIS_URL)
+    return _backend
+
+
+# Пользователи, чья активность недавно записана этим процессом
+_recent = LocalCache(settings.ACTIVITY_LOCAL_CACHE_SIZE, settings.ACTIVITY_RESOLUTION)
+
+
+def record_activity(user_id, ts=None):
+    """
+    Запоминает активность пользователя (не чаще раза в ACTIVITY_RESOLUTION секунд).
+
+    Args:
+        user_id (int): идентификатор пользователя.
+        ts (int | None): время активности, unix timestamp (по умолчанию сейчас).
+    """
+    if _recent.get(user_id) is not None:
+        return
+    _recent.set(user_id, True)
+    # Учёт активности не должен ломать обработку запросов
+    try:
+        get_backend().record({user_id: int(ts or time.time())})
+    except Exception:
+        logger.warning("Failed to record activity of user %s", user_id, exc_info=True)
+
+
+async def arecord_activity(user_id):
+    """Асинхронный вариант record_activity: запись в хранилище — в пуле потоков."""
+    if _recent.get(user_id) is not None:
+        return
+    await sync_to_async(record_activity, thread_sensitive=False)(user_id)
+
+
+def bulk_set_last_active(values):
+    """
+    Записывает last_active пользователей одним запросом.
+
+    На PostgreSQL используется UPDATE ... FROM unnest(массивы), который
+    не уменьшает уже записанное время; на остальных базах — bulk_update.
+
+    Args:
+        values (dict[int, int]): время активности (unix timestamp) по пользователям.
+
+    Returns:
+        int: количество обновлённых пользователей.
+    """
+    if not values:
+        return 0
+    User = get_user_model()
+    if connection.vendor == "postgresql":
+        sql = (
+            f"UPDATE {connection.ops.quote_name(User._meta.db_table)} AS u "
+            "SET last_active = to_timestamp(v.ts) "
+            "FROM unnest(%s::bigint[], %s::bigint[]) AS v(id, ts) "
+            "WHERE u.id = v.id AND u.last_active < to_timestamp(v.ts)"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [list(values), list(values.values())])
+            return cursor.rowcount
+    users = [
+        User(pk=user_id, last_active=datetime.fromtimestamp(ts, dt_timezone.utc))
+        for user_id, ts in values.items()
+    ]
+    return User.objects.bulk_update(users, ["last_active"], batch_size=1000)
+
+
+def flush_activity():
+    """
+    Переносит накопленную активность пользователей в базу.
+
+    Если запись не удалась, значения возвращаются в хранилище.
+
+    Returns:
+        int: количество обновлённых пользователей.
+    """
+    backend = get_backend()
+    values = backend.take()
+    try:
+        return bulk_set_last_active(values)
+    except Exception:
+        backend.record(values)
+        raise
+
+
+class ActivityMiddleware:
+    """
+    Запоминает активность пользователя, выполнившего запрос.
+
+    Пользователь берётся после обработки запроса: DRF аутентифицирует
+    (в том числе по JWT) во view и передаёт пользователя в HttpRequest.
+    """
+
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            record_activity(user.pk)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            await arecord_activity(user.pk)
+        return response
@@ -0,0 +1,168 @@
+"""
+JWT-аутентификация с кэшем пользователей.
+
+JWTAuthentication из simplejwt на каждый запрос читает пользователя из базы.
+CachedJWTAuthentication берёт нужные для проверки поля (id, флаги и md5 хеша
+пароля) из кэша (users.cache): из памяти процесса, затем из Redis, и только
+при промахе — из базы. На каждый запрос собирается свой экземпляр User
+с остальными полями отложенными, поэтому изменения request.user в одном
+запросе не видны другим. Обновление access-токена (CachedTokenRefreshSerializer)
+проверяет пользователя через тот же кэш. Для асинхронных представлений
+(config/asyncviews.py) есть aauthenticate с тем же результатом.
+
+Кэш пользователя сбрасывается при любом его сохранении или удалении
+(users.signals): деактивации, смене пароля или флагов staff.
+"""
+
+from django.contrib.auth import get_user_model
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from users.cache import AUTH_USER_FIELDS, aget_auth_user_row, get_auth_user_row
+
+
+def _rows(user_id):
+    User = get_user_model()
+    return User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).values(
+        *AUTH_USER_FIELDS[:-1], "password"
+    )
+
+
+def _auth_row(row):
+    password = row.pop("password")
+    row["password_md5"] = get_md5_hash_password(password)
+    return row
+
+
+def _load_row(user_id):
+    row = _rows(user_id).first()
+    return None if row is None else _auth_row(row)
+
+
+async def _aload_row(user_id):
+    row = await _rows(user_id).afirst()
+    return None if row is None else _auth_row(row)
+
+
+def _build_user(row):
+    # Остальные поля отложенные: они читаются из базы при первом обращении
+    User = get_user_model()
+    # from_db ждёт значения в порядке полей модели
+    fields = [
+        field.attname
+        for field in User._meta.concrete_fields
+        if field.attname in AUTH_USER_FIELDS
+    ]
+    user = User.from_db(
+        router.db_for_read(User), fields, [row[field] for field in fields]
+    )
+    user._password_md5 = row["password_md5"]
+    return user
+
+
+def get_cached_user(user_id):
+    """
+    Пользователь по значению USER_ID_CLAIM токена через кэш аутентификации.
+
+    Args:
+        user_id (int): идентификатор пользователя из токена.
+
+    Returns:
+        User | None: новый экземпляр пользователя или None, если его нет.
+    """
+    row = get_auth_user_row(user_id, _load_row)
+    return None if row is None else _build_user(row)
+
+
+async def aget_cached_user(user_id):
+    """Асинхронный вариант get_cached_user."""
+    row = await aget_auth_user_row(user_id, _aload_row)
+    return None if row is None else _build_user(row)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication, которая читает пользователя через кэш (get_cached_user)."""
+
+    def get_user(self, validated_token):
+        user = get_cached_user(self.get_user_id(validated_token))
+        return self.check_user(user, validated_token)
+
+    async def aauthenticate(self, request):
+        """Асинхронный вариант authenticate: токен проверяется так же, пользователь — aget_cached_user."""
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        user = await aget_cached_user(self.get_user_id(validated_token))
+        return self.check_user(user, validated_token), validated_token
+
+    @staticmethod
+    def get_user_id(validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+    @staticmethod
+    def check_user(user, validated_token):
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != getattr(user, "_password_md5", None):
+            raise AuthenticationFailed(
+                _("The user's password has been changed."), code="password_changed"
+            )
+        return user
+
+
+class CachedTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    TokenRefreshSerializer, который проверяет владельца refresh-токена через
+    кэш аутентификации; удалённый пользователь — ошибка 401, а не 500.
+    """
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM)
+        if user_id and not api_settings.USER_AUTHENTICATION_RULE(
+            get_cached_user(user_id)
+        ):
+            raise AuthenticationFailed(
+                self.error_messages["no_active_account"], "no_active_account"
+            )
+
+        data = {"access": str(refresh.access_token)}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                try:
+                    refresh.blacklist()
+                except AttributeError:
+                    # Приложение blacklist не установлено
+                    pass
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+            data["refresh"] = str(refresh)
+        return data
+
+
+class CachedJWTScheme(SimpleJWTScheme):
+    """Описание схемы аутентификации для drf-spectacular."""
+
+    target_class = "users.authentication.CachedJWTAuthentication"
@@ -0,0 +1,138 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+class LocalCache:
+    """
+    LRU-кэш в памяти процесса с ограничением размера и временем жизни записей.
+
+    Потокобезопасен; значения не копируются, поэтому хранить в нём следует
+    неизменяемые объекты.
+
+    Args:
+        maxsize (int): максимальное количество записей.
+        timeout (float): время жизни записи в секундах.
+    """
+
+    def __init__(self, maxsize, timeout):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.timeout, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Пользователи для JWT-аутентификации: поля пользователя, нужные для проверки
+# токена, хранятся в памяти процесса (несколько секунд) и в общем кэше Redis
+# (до минуты). Сохранение пользователя удаляет обе записи в своём процессе
+# и запись в Redis; в памяти других процессов старые значения живут не дольше
+# AUTH_USER_LOCAL_TIMEOUT
+auth_users = LocalCache(
+    settings.AUTH_USER_LOCAL_CACHE_SIZE, settings.AUTH_USER_LOCAL_TIMEOUT
+)
+
+# Поля записи кэша: хеш пароля в кэш не попадает, только его md5 для
+# CHECK_REVOKE_TOKEN. Список полей входит в ключ, поэтому записи со старым
+# составом полей после его изменения не читаются
+AUTH_USER_FIELDS = ("id", "is_active", "is_staff", "is_superuser", "password_md5")
+AUTH_USER_SCHEMA = hashlib.md5(",".join(AUTH_USER_FIELDS).encode()).hexdigest()[:8]
+
+
+def auth_user_key(user_id):
+    return f"users:auth:{AUTH_USER_SCHEMA}:{user_id}"
+
+
+def get_auth_user_row(user_id, load):
+    """
+    Поля пользователя из кэша (памяти процесса, затем Redis) или из базы.
+
+    Args:
+        user_id (int): идентификатор пользователя.
+        load (callable): загружает поля AUTH_USER_FIELDS из базы по user_id
+            (None, если пользователя нет).
+
+    Returns:
+        dict | None: значения полей AUTH_USER_FIELDS.
+    """
+    # Ключ — строка: в токене идентификатор может быть строкой, в сигнале — числом
+    key = auth_user_key(user_id)
+    row = auth_users.get(key)
+    if row is not None:
+        return row
+    row = cache.get(key)
+    if row is None:
+        row = load(user_id)
+        if row is None:
+            return None
+        cache.set(key, row, settings.AUTH_USER_CACHE_TIMEOUT)
+    auth_users.set(key, row)
+    return row
+
+
+async def aget_auth_user_row(user_id, load):
+    """
+    Асинхронный вариант get_auth_user_row: Redis и база читаются без блокировки
+    цикла событий.
+
+    Args:
+        user_id (int): идентификатор пользователя.
+        load (callable): корутина, загружающая поля из базы по user_id.
+
+    Returns:
+        dict | None: значения полей AUTH_USER_FIELDS.
+    """
+    key = auth_user_key(user_id)
+    row = auth_users.get(key)
+    if row is not None:
+        return row
+    row = await cache.aget(key)
+    if row is None:
+        row = await load(user_id)
+        if row is None:
+            return None
+        await cache.aset(key, row, settings.AUTH_USER_CACHE_TIMEOUT)
+    auth_users.set(key, row)
+    return row
+
+
+def invalidate_auth_user(user_id):
+    """
+    Удаляет пользователя из кэша аутентификации.
+
+    Args:
+        user_id (int): идентификатор пользователя.
+    """
+    key = auth_user_key(user_id)
+    auth_users.delete(key)
+    cache.delete(key)
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0002_usertelegram"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="reminder_digest",
+            field=models.BooleanField(
+                default=False,
+                help_text="Присылать одновременные напоминания о привычках одним сообщением",
+                verbose_name="Сводка напоминаний",
+            ),
+        ),
+    ]
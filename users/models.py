@@ -78,6 +78,7 @@ class User(AbstractUser):
         motivation (TextField): Описание мотивации или цели пользования трекером.
         time_zone (CharField): Часовой пояс пользователя.
         last_active (DateTimeField): Последняя активность.
+        reminder_digest (BooleanField): Объединять одновременные напоминания в одно сообщение.
     """
 
     username = None
@@ -111,6 +112,12 @@ class User(AbstractUser):
         verbose_name="Последняя активность", default=timezone.now
     )
 
+    reminder_digest = models.BooleanField(
+        default=False,
+        verbose_name="Сводка напоминаний",
+        help_text="Присылать одновременные напоминания о привычках одним сообщением",
+    )
+
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
 
@@ -120,6 +127,17 @@ class User(AbstractUser):
         verbose_name = "Пользователь"
         verbose_name_plural = "Пользователи"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Запоминает загруженные из базы часовой пояс и email, чтобы при сохранении
+        определить их смену (см. habits.signals).
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_time_zone = instance.__dict__.get("time_zone")
+        instance._loaded_email = instance.__dict__.get("email")
+        return instance
+
     def __str__(self):
         """
         Строковое представление пользователя.
@@ -20,4 +20,4 @@ class IsOwner(permissions.BasePermission):
         Returns:
             bool: True, если объект принадлежит пользователю, иначе False.
         """
-        return obj.user == request.user
+        return obj.user_id == request.user.id
@@ -25,6 +25,7 @@ class UserSerializer(serializers.ModelSerializer):
             "motivation",
             "time_zone",
             "last_active",
+            "reminder_digest",
         ]
         read_only_fields = ["id", "last_active"]
 
@@ -33,12 +34,19 @@ class UserUpdateSerializer(serializers.ModelSerializer):
     """
     Сериализатор для обновления личных данных пользователя.
 
-    Позволяет обновлять аватар, телефон, город, мотивацию и часовой пояс.
+    Позволяет обновлять аватар, телефон, город, мотивацию, часовой пояс и режим сводки напоминаний.
     """
 
     class Meta:
         model = User
-        fields = ["avatar", "phone_number", "city", "motivation", "time_zone"]
+        fields = [
+            "avatar",
+            "phone_number",
+            "city",
+            "motivation",
+            "time_zone",
+            "reminder_digest",
+        ]
 
 
 class RegisterSerializer(serializers.ModelSerializer):
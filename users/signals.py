@@ -0,0 +1,20 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from users.cache import invalidate_auth_user
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def user_changed(sender, instance, **kwargs):
+    """
+    Сбрасывает кэш аутентификации пользователя (см. users.authentication).
+
+    Сброс повторяется после коммита: запрос, прочитавший пользователя из базы
+    до коммита, мог успеть снова положить в кэш старые данные.
+    """
+    user_id = instance.pk
+    invalidate_auth_user(user_id)
+    transaction.on_commit(lambda: invalidate_auth_user(user_id))
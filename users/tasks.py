@@ -0,0 +1,14 @@
+from config.celery import app
+from users.activity import flush_activity
+
+
+@app.task
+def flush_user_activity():
+    """
+    Переносит накопленную последнюю активность пользователей в users_user
+    (см. users.activity).
+
+    Returns:
+        int: количество обновлённых пользователей.
+    """
+    return flush_activity()
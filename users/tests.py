@@ -1,11 +1,32 @@
+import time
+from datetime import timedelta
+from unittest.mock import Mock, patch
+
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
 from django.test import TestCase
-from django.urls import reverse
-from rest_framework.test import APIRequestFactory, APITestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+from rest_framework.test import APIClient, APIRequestFactory, APITestCase
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken
 
+from users import activity
+from users import urls as user_urls
+from users.authentication import get_cached_user
+from users.cache import (
+    AUTH_USER_FIELDS,
+    AUTH_USER_SCHEMA,
+    LocalCache,
+    auth_user_key,
+    auth_users,
+)
 from users.models import UserTelegram
 from users.permissions import IsOwner
 from users.serializers import RegisterSerializer, UserTelegramSerializer
+from users.tasks import flush_user_activity
 
 # Тест модели User и UserTelegram
 User = get_user_model()
@@ -118,3 +139,260 @@ class UserTelegramPermissionTest(TestCase):
         self.assertFalse(perm.has_object_permission(req, None, tg))
         req.user = user1
         self.assertTrue(perm.has_object_permission(req, None, tg))
+
+
+# Кэш пользователей для JWT-аутентификации
+class CachedJWTAuthenticationTest(APITestCase):
+    def setUp(self):
+        auth_users.clear()
+        self.user = User.objects.create_user(
+            email="cached@mail.com", password="cached123", is_staff=True
+        )
+        self.refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {self.refresh.access_token}"
+        )
+
+    def test_user_is_read_from_cache(self):
+        # Профиль читается из базы, пользователь для аутентификации — из кэша
+        url = reverse("users:user_detail")
+        self.assertEqual(self.client.get(url)["X-Query-Count"], "2")
+        self.assertEqual(self.client.get(url)["X-Query-Count"], "1")
+        # Память процесса пуста — пользователь берётся из общего кэша
+        auth_users.clear()
+        response = self.client.get(url)
+
+        self.assertEqual(response["X-Query-Count"], "1")
+        self.assertEqual(response.data["email"], "cached@mail.com")
+
+    def test_each_request_gets_own_instance(self):
+        first = get_cached_user(self.user.id)
+        first.city = "Омск"
+        second = get_cached_user(str(self.user.id))
+
+        self.assertIsNot(first, second)
+        self.assertIsNone(second.city)
+        self.assertEqual(second.email, "cached@mail.com")
+
+    def test_cache_holds_only_auth_fields(self):
+        user = get_cached_user(self.user.id)
+        row = cache.get(auth_user_key(self.user.id))
+
+        self.assertEqual(set(row), set(AUTH_USER_FIELDS))
+        self.assertNotIn(self.user.password, row.values())
+        self.assertIn(AUTH_USER_SCHEMA, auth_user_key(self.user.id))
+        self.assertEqual((user.pk, user.is_staff), (self.user.pk, True))
+        self.assertIn("password", user.get_deferred_fields())
+
+    def test_password_change_revokes_tokens(self):
+        with patch.object(jwt_settings, "CHECK_REVOKE_TOKEN", True):
+            token = RefreshToken.for_user(self.user).access_token
+            self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+            url = reverse("users:user_detail")
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+            self.user.set_password("changed123")
+            self.user.save()
+
+            self.assertEqual(self.client.get(url).status_code, 401)
+
+    def test_deactivation_is_seen_immediately(self):
+        self.client.get(reverse("users:user_detail"))
+        self.client.delete(reverse("users:user-deactivate"))
+
+        response = self.client.get(reverse("users:user_detail"))
+        self.assertEqual(response.status_code, 401)
+        response = APIClient().post(
+            reverse("users:token_refresh"),
+            {"refresh": str(self.refresh)},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 401)
+
+    def test_flag_changes_invalidate_cache(self):
+        User.objects.create_user(email="other@mail.com", password="x")
+        url = reverse("users:user-list")
+        self.assertEqual(self.client.get(url).data["count"], 2)
+
+        self.user.is_staff = False
+        self.user.save(update_fields=["is_staff"])
+
+        self.assertEqual(self.client.get(url).data["count"], 1)
+
+    def test_deleted_user(self):
+        self.client.get(reverse("users:user_detail"))
+        self.user.delete()
+
+        self.assertEqual(self.client.get(reverse("users:user_detail")).status_code, 401)
+        response = APIClient().post(
+            reverse("users:token_refresh"),
+            {"refresh": str(self.refresh)},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 401)
+
+    def test_local_cache_lru_and_timeout(self):
+        local = LocalCache(maxsize=2, timeout=60)
+        local.set("a", 1)
+        local.set("b", 2)
+        local.get("a")
+        local.set("c", 3)
+        self.assertEqual((local.get("a"), local.get("b"), local.get("c")), (1, None, 3))
+
+        with patch("users.cache.time.monotonic", return_value=time.monotonic() + 61):
+            self.assertIsNone(local.get("a"))
+
+
+# Последняя активность пользователей (отложенная запись)
+class ActivityTest(APITestCase):
+    def setUp(self):
+        activity._recent.clear()
+        activity.get_backend().take()
+        self.user = User.objects.create_user(email="active@mail.com", password="x")
+        User.objects.filter(pk=self.user.pk).update(
+            last_active=timezone.now() - timedelta(days=30)
+        )
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_request_is_recorded_without_db_write(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse("users:user_detail"))
+            self.client.get(reverse("users:user_detail"))
+        APIClient().get(reverse("users:user-list"))
+
+        self.assertFalse(any("UPDATE" in q["sql"] for q in queries.captured_queries))
+        pending = activity.get_backend().take()
+        self.assertEqual(list(pending), [self.user.pk])
+        self.assertAlmostEqual(pending[self.user.pk], time.time(), delta=5)
+
+    def test_flush_writes_one_update(self):
+        users = User.objects.bulk_create(
+            User(email=f"active{i}@mail.com") for i in range(50)
+        )
+        for user in users:
+            activity.record_activity(user.pk, ts=1_700_000_000)
+        self.client.get(reverse("users:user_detail"))
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(flush_user_activity(), 51)
+
+        updates = [q for q in queries.captured_queries if "UPDATE" in q["sql"]]
+        self.assertEqual(len(updates), 1)
+        self.user.refresh_from_db()
+        self.assertLess(timezone.now() - self.user.last_active, timedelta(seconds=5))
+        users[0].refresh_from_db()
+        self.assertEqual(users[0].last_active.timestamp(), 1_700_000_000)
+        self.assertEqual(flush_user_activity(), 0)
+
+    def test_failed_flush_keeps_values(self):
+        activity.record_activity(self.user.pk, ts=1_700_000_000)
+        with patch("users.activity.bulk_set_last_active", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                flush_user_activity()
+
+        self.assertEqual(activity.get_backend().take(), {self.user.pk: 1_700_000_000})
+
+    def test_backend_error_is_logged(self):
+        backend = Mock()
+        backend.record.side_effect = ConnectionError
+        with patch("users.activity.get_backend", return_value=backend):
+            with self.assertLogs("users.activity", "WARNING") as logs:
+                response = self.client.get(reverse("users:user_detail"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(f"user {self.user.pk}", logs.output[0])
+
+
+# Бюджеты SQL-запросов (config/querybudget.py): число запросов не растёт с данными
+class QueryBudgetTest(APITestCase):
+    sizes = (1, 10, 100)
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="budget@mail.com", password="budget123", is_staff=True
+        )
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def query_counts(self, n):
+        """Выполняет запрос к каждому маршруту users/urls.py и собирает X-Query-Count."""
+        users = User.objects.bulk_create(
+            User(email=f"budget{i}@mail.com") for i in range(n)
+        )
+        UserTelegram.objects.bulk_create(
+            UserTelegram(user=user, chat_id=str(i)) for i, user in enumerate(users)
+        )
+        profile = UserTelegram.objects.create(user=self.user, chat_id="budget")
+        tg_detail = reverse("users:telegram-profile-detail", args=[profile.id])
+        anonymous = APIClient()
+        requests = {
+            "api-root": lambda: self.client.get(reverse("users:api-root")),
+            "user-list": lambda: self.client.get(reverse("users:user-list")),
+            "user-detail": lambda: self.client.get(
+                reverse("users:user-detail", args=[users[0].id])
+            ),
+            "telegram-profile-list": lambda: self.client.get(
+                reverse("users:telegram-profile-list")
+            ),
+            "telegram-profile-detail": lambda: self.client.patch(
+                tg_detail, {"telegram_username": "budget"}, format="json"
+            ),
+            "telegram-profile-delete": lambda: self.client.delete(tg_detail),
+            "telegram-profile-create": lambda: self.client.post(
+                reverse("users:telegram-profile-list"), {"chat_id": "new"}
+            ),
+            "register": lambda: anonymous.post(
+                reverse("users:register"),
+                {
+                    "email": "new@mail.com",
+                    "password": "123passQ",
+                    "password2": "123passQ",
+                },
+                format="json",
+            ),
+            "login": lambda: anonymous.post(
+                reverse("users:login"),
+                {"email": "budget@mail.com", "password": "budget123"},
+                format="json",
+            ),
+            "token_refresh": lambda: anonymous.post(
+                reverse("users:token_refresh"),
+                {"refresh": str(RefreshToken.for_user(self.user))},
+                format="json",
+            ),
+            "user_detail": lambda: self.client.patch(
+                reverse("users:user_detail"), {"city": "Томск"}, format="json"
+            ),
+            "user-deactivate": lambda: self.client.delete(
+                reverse("users:user-deactivate")
+            ),
+        }
+        counts = {}
+        for name, request in requests.items():
+            response = request()
+            self.assertLess(response.status_code, 300, name)
+            counts[name] = int(response["X-Query-Count"])
+        return counts
+
+    def test_query_counts_do_not_grow_with_rows(self):
+        counts = {}
+        for n in self.sizes:
+            with transaction.atomic():
+                counts[n] = self.query_counts(n)
+                transaction.set_rollback(True)
+        self.assertEqual(counts[1], counts[10])
+        self.assertEqual(counts[1], counts[100])
+
+    def test_every_route_has_budget(self):
+        urls = [url for url in user_urls.urlpatterns if isinstance(url, URLPattern)]
+        for url in urls + user_urls.router.urls:
+            if url.name == "api-root":
+                continue
+            view = url.callback
+            actions = getattr(view, "actions", None) or {
+                method.lower(): method.lower()
+                for method in view.cls().allowed_methods
+                if method != "OPTIONS"
+            }
+            for action in actions.values():
+                self.assertIn(action, view.cls.query_budgets, url.name)
@@ -1,11 +1,11 @@
 from django.urls import include, path
-from rest_framework.permissions import AllowAny
 from rest_framework.routers import DefaultRouter
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
 from .views import (
     DeactivateUserView,
+    LoginView,
     RegisterView,
+    TokenRefreshView,
     UserDetailView,
     UserTelegramViewSet,
     UserViewSet,
@@ -21,16 +21,8 @@ app_name = "users"
 urlpatterns = [
     path("", include(router.urls)),
     path("register/", RegisterView.as_view(), name="register"),
-    path(
-        "login/",
-        TokenObtainPairView.as_view(permission_classes=(AllowAny,)),
-        name="login",
-    ),
-    path(
-        "token/refresh/",
-        TokenRefreshView.as_view(permission_classes=(AllowAny,)),
-        name="token_refresh",
-    ),
+    path("login/", LoginView.as_view(), name="login"),
+    path("token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
     path("user/", UserDetailView.as_view(), name="user_detail"),
     path("deactivate/", DeactivateUserView.as_view(), name="user-deactivate"),
 ]
@@ -3,6 +3,7 @@ from rest_framework import generics, permissions, status, viewsets
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework_simplejwt import views as jwt_views
 
 from .models import UserTelegram
 from .permissions import IsOwner
@@ -21,6 +22,29 @@ class RegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
     permission_classes = [AllowAny]
     serializer_class = RegisterSerializer
+    query_budgets = {"post": 2}
+
+
+class LoginView(jwt_views.TokenObtainPairView):
+    """
+    Выдаёт пару JWT-токенов (access и refresh) по email и паролю.
+
+    Доступ публичный.
+    """
+
+    permission_classes = [AllowAny]
+    query_budgets = {"post": 1}
+
+
+class TokenRefreshView(jwt_views.TokenRefreshView):
+    """
+    Выдаёт новый access-токен по refresh-токену.
+
+    Доступ публичный.
+    """
+
+    permission_classes = [AllowAny]
+    query_budgets = {"post": 1}
 
 
 class UserViewSet(viewsets.ReadOnlyModelViewSet):
@@ -34,6 +58,7 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated]
+    query_budgets = {"list": 3, "retrieve": 2}
 
     def get_queryset(self):
         """
@@ -45,8 +70,8 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
         """
         user = self.request.user
         if user.is_staff or user.is_superuser:
-            return User.objects.all()
-        return User.objects.filter(pk=user.pk)
+            return User.objects.order_by("id")
+        return User.objects.filter(pk=user.pk).order_by("id")
 
 
 class UserDetailView(generics.RetrieveUpdateAPIView):
@@ -58,15 +83,24 @@ class UserDetailView(generics.RetrieveUpdateAPIView):
 
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated]
+    query_budgets = {"get": 2, "put": 3, "patch": 3}
 
     def get_object(self):
         """
         Возвращает объект — текущий пользователь.
 
+        Аутентификация из кэша даёт пользователя только с полями для проверки
+        токена, поэтому профиль читается из базы одним запросом.
+
         Returns:
             User: авторизованный пользователь.
         """
-        return self.request.user
+        return User.objects.get(pk=self.request.user.pk)
+
+    async def aget(self, request, *args, **kwargs):
+        """Асинхронный вариант get для ASGI (config/asyncviews.py)."""
+        user = await User.objects.aget(pk=request.user.pk)
+        return Response(self.get_serializer(user).data)
 
 
 class DeactivateUserView(APIView):
@@ -77,6 +111,7 @@ class DeactivateUserView(APIView):
     """
 
     permission_classes = [IsAuthenticated]
+    query_budgets = {"delete": 2}
 
     def delete(self, request):
         """
@@ -106,6 +141,14 @@ class UserTelegramViewSet(viewsets.ModelViewSet):
 
     serializer_class = UserTelegramSerializer
     permission_classes = [permissions.IsAuthenticated, IsOwner]
+    query_budgets = {
+        "list": 3,
+        "retrieve": 2,
+        "create": 3,
+        "update": 3,
+        "partial_update": 3,
+        "destroy": 3,
+    }
 
     def get_queryset(self):
         """
@@ -115,7 +158,7 @@ class UserTelegramViewSet(viewsets.ModelViewSet):
             QuerySet: профиль Telegram, связанный с пользователем.
         """
         user = self.request.user
-        return UserTelegram.objects.filter(user=user)
+        return UserTelegram.objects.filter(user=user).order_by("id")
 
     def perform_create(self, serializer):
         """